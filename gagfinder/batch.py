@@ -0,0 +1,354 @@
+#!/usr/bin/python
+
+#################################
+# Step 0: imports and functions #
+#################################
+
+import time # for timing the batch
+import os # for silencing workers
+import sys # for exiting on errors
+import shlex # for splitting the options column of the manifest
+import argparse # for getting user inputs
+import sqlite3 as sq # for accessing the database
+import multiprocessing as mp # for running rows in parallel
+
+# GAGfinder itself, by name, so that its stand-ins for modules it has not imported yet stay behind
+from gagfinder_v2 import (start_time, get_parser, check_args, find_gags, open_mzml, sum_scans, spectrum_key, memory_db, print_footprint,
+                          LRUCache, IsotopeCache, PrecursorIndex, write_result_to_file, write_result_to_npz, result_columns, result_meta)
+from results_db import ResultStore # for appending results to a results database
+
+### FUNCTIONS ###
+
+# function for reading a manifest of (mzML file, class, precursor m/z, precursor charge, options) rows
+def read_manifest(manifest_path):
+	parser = get_parser()
+	rows   = []
+	lines  = []
+	
+	f = open(manifest_path, 'r')
+	for n, line in enumerate(f):
+		line = line.rstrip('\r\n')
+		
+		# skip blank lines and comments
+		if not line.strip() or line.startswith('#'):
+			continue
+		
+		cols = line.split('\t')
+		if len(cols) < 4 or len(cols) > 5:
+			print "Manifest line %i must have 4 or 5 tab-separated columns: mzML file, class, m/z, charge, options" % (n+1)
+			sys.exit()
+		
+		# put the row into the same arguments as the command line
+		argv = ['-i', cols[0], '-c', cols[1], '-m', cols[2], '-z', cols[3]]
+		if len(cols) == 5:
+			argv += shlex.split(cols[4])
+		
+		args = parser.parse_args(argv)
+		rows.append([check_args(args), args.o, args.v])
+		lines.append(n+1)
+	
+	f.close()
+	
+	# give each row its own output file when a mzML file appears more than once
+	count = {}
+	for params, out, npz in rows:
+		count[params[0]] = count.get(params[0], 0) + 1
+	
+	taken = set()
+	for row, line in zip(rows, lines):
+		params = row[0]
+		if not row[1] and count[params[0]] > 1:
+			name = params[0][:-5] + '_' + str(params[8]) + '_' + str(params[9])
+			
+			# later rows for the same precursor, with other options, also get their manifest line number
+			if name in taken:
+				name += '_' + str(line)
+			
+			taken.add(name)
+			row[1] = name + '.tsv'
+	
+	# return
+	return rows
+
+# function for opening the connection and caches that rows share, keeping the fragments of at most
+# frag_size precursors and iso_size isotopic distributions in memory (no limit without them)
+def open_state(db_path, iso_path, read_only=False, in_memory=False, frag_size=None, iso_size=None):
+	if in_memory:
+		conn = memory_db(db_path) # already read-only
+	else:
+		conn = sq.connect(db_path)
+		if read_only:
+			conn.execute('PRAGMA query_only = ON;') # workers only ever read GAGfragDB
+	
+	if iso_path:
+		isotopes = IsotopeCache(iso_path, size=iso_size)
+	else:
+		isotopes = None
+	
+	state = {'db_path':    db_path,
+	         'conn':       conn,
+	         'isotopes':   isotopes,
+	         'precursors': PrecursorIndex(conn.cursor()), # precursor masses of each class
+	         'frags':      LRUCache(frag_size), # fragments of each precursor, by precursor and options
+	         'spectra':    {}} # summed scans of the current mzML file, by spectrum_key
+	
+	# return
+	return state
+
+# function for closing the connection and saving any new isotopic distributions
+def close_state(state):
+	if state['isotopes'] is not None:
+		state['isotopes'].close()
+	
+	state['conn'].close()
+
+# function for grouping manifest rows by mzML file, in order of first appearance, as (row number, row) pairs
+def group_rows(rows):
+	files = []
+	where = {}
+	for n, row in enumerate(rows):
+		path = row[0][0]
+		if path not in where:
+			where[path] = len(files)
+			files.append([])
+		
+		files[where[path]].append((n, row))
+	
+	# return
+	return files
+
+# function for summing the scans of one mzML file for all of its rows, in one pass per precision and noise setting
+def sum_file(params_list, spectra):
+	spectra.clear() # only keep the summed scans of one mzML file at a time
+	
+	# scan filters of the rows, by precision and noise setting
+	groups = {}
+	for params in params_list:
+		key = spectrum_key(params[0], params[11], params[12], params[14])
+		if key not in spectra:
+			groups.setdefault((params[11], params[12]), []).append(params[14])
+			spectra[key] = None
+	
+	for (precision, noise_gone), filters in groups.items():
+		specs = sum_scans(open_mzml(params_list[0][0]), precision, noise_gone, filters)
+		for f, spec in zip(filters, specs):
+			spectra[spectrum_key(params_list[0][0], precision, noise_gone, f)] = spec
+
+# function for running all rows of one mzML file against shared state, keeping every scored fragment of the rows in keep_all
+def run_file(params_list, state, keep_all=None):
+	sum_file(params_list, state['spectra'])
+	
+	if keep_all is None:
+		keep_all = [False] * len(params_list)
+	
+	results = []
+	for params, keep in zip(params_list, keep_all):
+		# run the guts of GAGfinder
+		precursor = {}
+		result    = find_gags(*params, db_path=state['db_path'], conn=state['conn'], isotopes=state['isotopes'], precursors=state['precursors'], frags=state['frags'], spectra=state['spectra'], precursor=precursor)
+		results.append(trim_result(result, keep) + [precursor])
+	
+	# return
+	return results
+
+# function for cutting a result down to what write_result_to_file needs, or to what write_result_to_npz needs with keep_all
+def trim_result(result, keep_all=False):
+	top, fids, m_int, m_mz, errs, all_dist, formulae = result
+	keys = [q[0] for q in top]
+	
+	if keep_all:
+		# every scored fragment, but only the isotopic distributions of the top ones
+		return [top,
+		        fids,
+		        m_int,
+		        m_mz,
+		        errs,
+		        dict((k, all_dist[k]) for k in keys),
+		        dict((k[0], formulae[k[0]]) for k in fids)]
+	
+	# return
+	return [top,
+	        dict((k, fids[k]) for k in keys),
+	        dict((k, m_int[k]) for k in keys),
+	        dict((k, m_mz[k]) for k in keys),
+	        dict((k, errs[k]) for k in keys),
+	        dict((k, all_dist[k]) for k in keys),
+	        dict((k[0], formulae[k[0]]) for k in keys)]
+
+# per-process state of a parallel batch worker
+worker = {}
+
+# function for setting up a batch worker with its own read-only connection and isotope store
+def init_worker(db_path, iso_path, in_memory=False):
+	sys.stdout = open(os.devnull, 'w') # the parent reports progress
+	worker.update(open_state(db_path, iso_path, read_only=True, in_memory=in_memory))
+
+# function for running all rows of one mzML file in a batch worker
+def work_file(job):
+	params_list, keep_all = job
+	
+	# workers are daemons, so they cannot score in their own pools
+	params_list = [params[:13] + [1] + params[14:] for params in params_list]
+	results     = run_file(params_list, worker, keep_all)
+	
+	# save new isotopic distributions as we go, since workers are never told to close
+	if worker['isotopes'] is not None:
+		worker['isotopes'].flush()
+	
+	# return
+	return results
+
+# why a row stopped before it was scored, as find_gags tells it
+failures = {'no_scans':     'had no MS2 scans to sum',
+            'no_precursor': 'matched no precursor in GAGfragDB'}
+
+# function for running every row of a manifest with one connection and shared caches
+def run_batch(rows, db_path='../lib/GAGfragDB.db', iso_path='../lib/GAGisoCache.db', n_proc=1, in_memory=False, results_path=None):
+	files = group_rows(rows)
+	jobs  = [[[row[0] for n, row in f], [results_path is not None or row[2] is not None for n, row in f]] for f in files]
+	
+	# append every scored fragment to the results database, one transaction per mzML file
+	store = None
+	if results_path:
+		store = ResultStore(results_path)
+	
+	if n_proc > 1:
+		# create the isotopic distribution store before the workers race to
+		if iso_path:
+			IsotopeCache(iso_path).close()
+		
+		# a SQLite connection cannot cross a fork, so every worker loads its own copy,
+		# which takes about what the file on disk does
+		if in_memory:
+			print "Warning: each of the %i workers loads its own copy of GAGfragDB into memory." % (n_proc)
+			disk = sq.connect(db_path)
+			print_footprint(disk, n_proc)
+			disk.close()
+		
+		# fan the files out to the workers, getting results back in order
+		pool    = mp.Pool(n_proc, init_worker, (db_path, iso_path, in_memory))
+		results = pool.imap(work_file, jobs)
+	else:
+		state   = open_state(db_path, iso_path, in_memory=in_memory)
+		results = (run_file(params_list, state, keep_all) for params_list, keep_all in jobs)
+		
+		if in_memory:
+			print_footprint(state['conn'])
+	
+	for f in files:
+		print "\n### Summing scans of %s for %i rows ###" % (f[0][1][0][0], len(f))
+		
+		for (n, row), result in zip(f, next(results)):
+			params, out, npz = row
+			
+			print "Row %i of %i: m/z %s, charge %s..." % (n+1, len(rows), params[8], params[9]),
+			
+			# write to file
+			write_result_to_file(params[0], result[0], result[1], result[3], result[2], result[5], result[6], result[4], out)
+			
+			# write every scored fragment too, if the row asks for them
+			if npz or store is not None:
+				columns = result_columns(result[1], result[3], result[2], result[6], result[4])
+				meta    = result_meta(params, result[7])
+				
+				if npz:
+					write_result_to_npz(npz, columns, meta)
+				
+				if store is not None:
+					# still record the run, so that failures show up in the results database
+					if meta['status'] != 'ok':
+						print "\nWarning: row %i (%s, m/z %s, charge %s) %s; storing it without a precursor..." % (n+1, params[0], params[8], params[9], failures[meta['status']]),
+					
+					store.add_run(meta, columns)
+			
+			print "Done!"
+		
+		if store is not None:
+			store.commit()
+	
+	if store is not None:
+		store.close()
+	
+	if n_proc > 1:
+		pool.close()
+		pool.join()
+	else:
+		close_state(state)
+
+# main function
+def main():
+	################################
+	# Step 1: check user arguments #
+	################################
+	
+	print "Checking user arguments...",
+	
+	# initiate parser
+	parser = argparse.ArgumentParser(description='Run GAGfinder on every row of a manifest in one process.')
+	
+	# add arguments
+	parser.add_argument('-f', required=True, help='Manifest file, tab-separated: mzML file, class, m/z, charge, options (required)')
+	parser.add_argument('-d', required=False, help='GAGfragDB file (optional, default ../lib/GAGfragDB.db)')
+	parser.add_argument('-k', required=False, help='Isotopic distribution store (optional, default ../lib/GAGisoCache.db)')
+	parser.add_argument('-j', type=int, required=False, help='Number of worker processes (optional, default 1)')
+	parser.add_argument('-u', required=False, help='Load GAGfragDB into memory before running, once per process with -j? (y/n, optional)')
+	parser.add_argument('-r', required=False, help='Results database to append every scored fragment to (optional)')
+	
+	# parse arguments
+	args = parser.parse_args()
+	
+	# get arguments into proper variables
+	mFile  = args.f
+	dbFile = args.d
+	isFile = args.k
+	nProc  = args.j
+	inMem  = args.u
+	resDB  = args.r
+	
+	# check to make sure the manifest exists
+	if not os.path.isfile(mFile):
+		print "Could not find " + mFile + ". Try 'python batch.py -h'"
+		sys.exit()
+	
+	if not dbFile:
+		dbFile = '../lib/GAGfragDB.db'
+	
+	if not isFile:
+		isFile = '../lib/GAGisoCache.db'
+	
+	# check to make sure a sensible number of workers was asked for
+	if not nProc:
+		nProc = 1
+	elif nProc < 1:
+		print "You must enter a positive integer for the number of worker processes. Try 'python batch.py -h'"
+		sys.exit()
+	
+	# check to see if the user wants GAGfragDB in memory
+	if inMem and inMem not in ['y', 'n']:
+		print "You must enter either 'y' or 'n' for whether to load GAGfragDB into memory. Try 'python batch.py -h'"
+		sys.exit()
+	
+	print "Done!"
+	
+	###################################
+	# Step 2: read and check manifest #
+	###################################
+	
+	print "Reading manifest...",
+	
+	rows = read_manifest(mFile)
+	
+	print "Done! Found " + str(len(rows)) + " rows"
+	
+	#########################
+	# Step 3: run every row #
+	#########################
+	
+	run_batch(rows, dbFile, isFile, nProc, inMem == 'y', resDB)
+	
+	print "Finished!"
+	print time.time() - start_time
+
+# run main
+if __name__ == '__main__':
+	main()
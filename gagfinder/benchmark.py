@@ -0,0 +1,144 @@
+#!/usr/bin/python
+
+#################################
+# Step 0: imports and functions #
+#################################
+
+import time # for timing fragment enumeration
+import sys # for exiting on errors
+import argparse # for getting user inputs
+import sqlite3 as sq # for accessing the database
+
+# GAGfinder itself, by name, so that its stand-ins for modules it has not imported yet stay behind
+from gagfinder_v2 import start_time, xmod, fmla2dict, class_number, get_ends, get_frags, IsotopeCache, PrecursorIndex
+
+### FUNCTIONS ###
+
+# function for picking the heaviest precursor of each length in a class
+def pick_precursors(rows):
+	picks = {}
+	for row in rows:
+		pDict = fmla2dict(row[2], 'composition')
+		dp    = pDict['D'] + pDict['U'] + pDict['X'] + pDict['N']
+		picks[dp] = row # rows are sorted by mass, so the last one is the heaviest
+	
+	# return
+	return [picks[dp] for dp in sorted(picks)]
+
+# function for timing how long a list and a set take to deduplicate the same compositions
+def time_dedup(labels):
+	start = time.time()
+	seen  = []
+	for q in labels:
+		if q not in seen:
+			seen.append(q)
+	
+	t_list = time.time() - start
+	
+	start = time.time()
+	seen  = set()
+	for q in labels:
+		if q not in seen:
+			seen.add(q)
+	
+	t_set = time.time() - start
+	
+	# return
+	return [t_list, t_set]
+
+# main function
+def main():
+	################################
+	# Step 1: check user arguments #
+	################################
+	
+	print "Checking user arguments...",
+	
+	# initiate parser
+	parser = argparse.ArgumentParser(description='Time fragment enumeration against precursor size.')
+	
+	# add arguments
+	parser.add_argument('-c', required=True, help='GAG class (required)')
+	parser.add_argument('-d', required=False, help='GAGfragDB file (optional, default ../lib/GAGfragDB.db)')
+	parser.add_argument('-z', type=int, required=False, help='Precursor charge (optional, default -3)')
+	parser.add_argument('-s', type=int, required=False, help='Maximum number of SO3 losses (optional, default 2)')
+	parser.add_argument('-a', required=False, help='Metal adduct, e.g. Na (optional)')
+	parser.add_argument('-t', type=int, required=False, help='Number of metal adducts (optional, default 1 with -a)')
+	
+	# parse arguments
+	args = parser.parse_args()
+	
+	# get arguments into proper variables
+	gClass = args.c
+	dbFile = args.d
+	chg    = args.z
+	sLoss  = args.s
+	metal  = args.a
+	nMetal = args.t
+	
+	# check to make sure a proper GAG class was inputted
+	if gClass not in ['HS', 'CS', 'KS']:
+		print "You must denote a GAG class, either HS, CS, or KS. Try 'python benchmark.py -h'"
+		sys.exit()
+	
+	cNum = class_number(gClass)
+	
+	if not dbFile:
+		dbFile = '../lib/GAGfragDB.db'
+	
+	if chg is None:
+		chg = -3
+	
+	if sLoss is None:
+		sLoss = 2
+	
+	if metal and not nMetal:
+		nMetal = 1
+	elif not metal:
+		nMetal = None
+	
+	print "Done!"
+	
+	###################################
+	# Step 2: pick precursors to time #
+	###################################
+	
+	print "Picking precursors...",
+	
+	conn = sq.connect(dbFile)
+	c    = conn.cursor()
+	
+	picks = pick_precursors(PrecursorIndex(c).load(cNum)[0])
+	
+	print "Done! Found " + str(len(picks)) + " lengths"
+	
+	#######################################
+	# Step 3: time each precursor's frags #
+	#######################################
+	
+	zero     = {'C':0, 'H':0, 'O':0, 'N':0, 'S':0}
+	isotopes = IsotopeCache(':memory:') # isotopic distributions are shared, so later lengths mostly time the enumeration
+	
+	print "\ndp\tcomposition\tcompositions\tformulae\tget_frags (s)\tper composition (us)\tlist dedup (s)\tset dedup (s)"
+	for cpid, pFmla, pComp, mass in picks:
+		pDict         = fmla2dict(pComp, 'composition')
+		NR, RE, n_pre = get_ends(pDict, cNum)
+		
+		start     = time.time()
+		IDs, frms = get_frags(pFmla, pDict, sLoss, zero, zero, 0, chg, n_pre, c, cpid, xmod, RE, gClass, metal, nMetal, isotopes)
+		t_frags   = time.time() - start
+		
+		labels        = [q for f in frms for q in frms[f]]
+		t_list, t_set = time_dedup(labels)
+		
+		print "%i\t%s\t%i\t%i\t%.3f\t%.2f\t%.3f\t%.3f" % (n_pre, pComp, len(labels), len(frms), t_frags, 1e6 * t_frags / max(len(labels), 1), t_list, t_set)
+	
+	isotopes.close()
+	conn.close()
+	
+	print "\nFinished!"
+	print time.time() - start_time
+
+# run main
+if __name__ == '__main__':
+	main()
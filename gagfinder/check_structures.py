@@ -0,0 +1,150 @@
+#!/usr/bin/python
+
+#################################
+# Step 0: imports and functions #
+#################################
+
+import sys # for exiting on errors
+import random # for making synthetic score tables
+import argparse # for parsing arguments
+
+from structures import * # the sulfation-placement search being checked
+
+### FUNCTIONS ###
+
+# function for getting the fragment keys of one placement, built straight from the chain rather than from fragment groups
+def placement_keys(gag_class, backbone, sulfated, acetylated, loss):
+	n = len(backbone)
+	sulf = {}
+	for r, pos in sulfated:
+		sulf.setdefault(r, set()).add(pos)
+	
+	keys = set()
+	for nn in range(1, n):
+		for i in range(n - nn + 1):
+			fml = {'D':0, 'U':0, 'X':0, 'N':0, 'A':0, 'S':0}
+			for r in range(i, i+nn):
+				fml[backbone[r]] += 1
+				fml['A'] += r in acetylated
+				fml['S'] += len(sulf.get(r, ()))
+			
+			## glycosidic fragments
+			for so in range(loss+1):
+				fc = dict(fml)
+				fc['S'] = max(0, fc['S'] - so)
+				keys.add((dict2fmla(fc, 'composition'), ''))
+			
+			## cross-ring fragments
+			if i == 0:
+				addto, end = nn, 'NR'
+			elif i == n - nn:
+				addto, end = i-1, 'RE'
+			else:
+				continue
+			
+			ms = backbone[addto]
+			for clv, kept in xloc[gag_class][ms].get(end, {}).items():
+				xc = dict(fml)
+				xc['S'] += len([pos for pos in sulf.get(addto, ()) if pos in kept])
+				xc['A'] += addto in acetylated and 2 in kept
+				for so in range(loss+1):
+					fc = dict(xc)
+					fc['S'] = max(0, fc['S'] - so)
+					keys.add((dict2fmla(fc, 'composition'), ms + end + clv))
+	
+	# return
+	return keys
+
+# function for scoring every placement of a chain by brute force, as (score, label) pairs
+def brute_force(gag_class, backbone, n_so3, n_ac, rows, loss):
+	ac_res = [r for r, ms in enumerate(backbone) if 'Ac' in modlocs[gag_class][ms]]
+	
+	labels = []
+	hits   = []
+	for acetylated in combinations(ac_res, n_ac):
+		sites = chain_sites(gag_class, backbone, acetylated)
+		for sulfated in combinations(sites, n_so3):
+			keys = placement_keys(gag_class, backbone, sulfated, acetylated, loss)
+			labels.append(structure_label(sulfated, acetylated))
+			hits.append([bool(row & keys) for row in rows])
+	
+	# every placement walks the table at once, with no rows skipped
+	scores = walk_scores(np.array(hits, dtype=bool).reshape(len(labels), len(rows)), np.zeros(len(rows), dtype=int))
+	
+	# return
+	return [(int(sc), label) for sc, label in zip(scores, labels)]
+
+# function for making a score table whose rows mostly come from one true placement
+def synthetic_rows(gag_class, backbone, n_so3, acetylated, loss, n_rows):
+	sites = chain_sites(gag_class, backbone, acetylated)
+	truth = list(placement_keys(gag_class, backbone, random.sample(sites, n_so3), acetylated, loss))
+	decoy = list(placement_keys(gag_class, backbone, random.sample(sites, random.randint(0, len(sites))), acetylated, loss))
+	
+	rows = []
+	for n in range(n_rows):
+		pool = truth if random.random() < 0.6 else decoy + [('X%i' % n, '')] # some rows no placement explains
+		rows.append(frozenset(random.sample(pool, min(len(pool), random.randint(1, 3)))))
+	
+	# return
+	return rows
+
+# main function
+def main():
+	# initiate parser
+	parser = argparse.ArgumentParser(description='Check the sulfation-placement search against brute-force enumeration on small synthetic chains.')
+	
+	# add arguments
+	parser.add_argument('-n', type=int, required=False, help='Number of synthetic chains to check (optional, default 50)')
+	parser.add_argument('-r', type=int, required=False, help='Random seed (optional, default 1)')
+	
+	# parse arguments
+	args   = parser.parse_args()
+	nTrial = args.n
+	seed   = args.r
+	
+	if not nTrial:
+		nTrial = 50
+	
+	if seed is None:
+		seed = 1
+	
+	random.seed(seed)
+	
+	failed = 0
+	for trial in range(nTrial):
+		# a chain of dp4 to dp6 of any class, starting with either of its monosaccharides
+		gClass   = random.choice(['HS', 'CS', 'KS'])
+		pair     = ['X', 'N'] if gClass == 'KS' else ['U', 'N']
+		n        = random.randint(4, 6)
+		first    = random.choice([0, 1])
+		backbone = ''.join(pair[(first + j) % 2] for j in range(n))
+		
+		ac_res     = [r for r, ms in enumerate(backbone) if ms == 'N']
+		n_ac       = random.randint(0, min(2, len(ac_res)))
+		acetylated = tuple(random.sample(ac_res, n_ac))
+		n_so3      = random.randint(0, len(chain_sites(gClass, backbone, acetylated)))
+		loss       = random.randint(0, 1)
+		top        = random.randint(1, 15)
+		rows       = synthetic_rows(gClass, backbone, n_so3, acetylated, loss, random.randint(5, 60))
+		
+		# the search has to find the same top scores, and score each placement it returns the same way
+		brute  = brute_force(gClass, backbone, n_so3, n_ac, rows, loss)
+		scored = dict((label, sc) for sc, label in brute)
+		ranked = rank_sulfation(gClass, backbone, n_so3, n_ac, rows, loss, top)
+		
+		expected = sorted([sc for sc, label in brute], reverse=True)[:top]
+		if [sc for sc, label in ranked] != expected or any(scored[label] != sc for sc, label in ranked):
+			failed += 1
+			print "Mismatch for %s %s with %i sulfates, %i acetyl groups, %i sulfate losses, top %i" % (gClass, backbone, n_so3, n_ac, loss, top)
+			print "    search:      " + str(ranked)
+			print "    brute force: " + str(expected)
+	
+	if failed:
+		print "%i of %i chains ranked differently from brute force." % (failed, nTrial)
+		sys.exit(1)
+	
+	print "All %i chains ranked the same as brute force." % (nTrial)
+
+# run main
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,140 @@
+#!/usr/bin/python
+
+#################################
+# Step 0: imports and functions #
+#################################
+
+import time # for timing the compilation
+import os # for finding compiled libraries
+import sys # for exiting on errors
+import argparse # for getting user inputs
+import sqlite3 as sq # for accessing the database
+
+# GAGfinder itself, by name, so that its stand-ins for modules it has not imported yet stay behind
+from gagfinder_v2 import (start_time, atom_wt, xmod, fmla2dict, formula_weight, parse_mods, class_number, get_ends, get_precursor, get_frags,
+                          db_stamp, FragmentLibrary, IsotopeCache)
+
+### FUNCTIONS ###
+
+# function for compiling the fragments of one precursor into a library folder, returning its path
+def compile_library(gag_class, re_form, metal, metal_ct, reagent, mz, chg, so3loss, lib_path, cursor, isotopes=None):
+	df, rf = parse_mods(re_form, reagent)
+	cNum   = class_number(gag_class)
+	dw     = formula_weight(df)
+	
+	# get info about precursor
+	id, pFmla, pComp, tMass = get_precursor(chg, mz, cursor, dw, atom_wt, cNum, metal, metal_ct)
+	
+	path = os.path.join(lib_path, FragmentLibrary.key(gag_class, pComp, pFmla, so3loss, rf, df, chg, metal, metal_ct, db_stamp(cursor)))
+	if os.path.isdir(path): # already compiled
+		return [path, pComp, False]
+	
+	# get all isotopic distributions
+	pDict         = fmla2dict(pComp, 'composition')
+	NR, RE, n_pre = get_ends(pDict, cNum)
+	IDs, forms    = get_frags(pFmla, pDict, so3loss, rf, df, dw, chg, n_pre, cursor, id, xmod, RE, gag_class, metal, metal_ct, isotopes)
+	
+	FragmentLibrary.from_frags(IDs, forms).save(path)
+	
+	# return
+	return [path, pComp, True]
+
+# main function
+def main():
+	################################
+	# Step 1: check user arguments #
+	################################
+	
+	print "Checking user arguments...",
+	
+	# initiate parser
+	parser = argparse.ArgumentParser(description='Compile the fragments of a GAG precursor into a library that GAGfinder memory-maps.')
+	
+	# add arguments
+	parser.add_argument('-c', required=True, help='GAG class (required)')
+	parser.add_argument('-m', type=float, required=True, help='Precursor m/z (required)')
+	parser.add_argument('-z', type=int, required=True, help='Precursor charge (required)')
+	parser.add_argument('-r', required=False, help='Reducing end derivatization (optional)')
+	parser.add_argument('-a', required=False, help='Which metal is adducted (optional)')
+	parser.add_argument('-t', type=int, required=False, help='Number of adducted metals (required if -a TRUE)')
+	parser.add_argument('-g', required=False, help='Reagent used (optional)')
+	parser.add_argument('-s', type=int, required=False, help='Number of sulfate losses to consider (optional, default 0)')
+	parser.add_argument('-l', required=False, help='Library folder (optional, default ../lib/GAGfragLib)')
+	parser.add_argument('-d', required=False, help='GAGfragDB file (optional, default ../lib/GAGfragDB.db)')
+	parser.add_argument('-k', required=False, help='Isotopic distribution store (optional, default ../lib/GAGisoCache.db)')
+	
+	# parse arguments
+	args = parser.parse_args()
+	
+	# get arguments into proper variables
+	gClass = args.c
+	pre_mz = args.m
+	pre_z  = args.z
+	fmla   = args.r
+	adduct = args.a
+	nMetal = args.t
+	reag   = args.g
+	s_loss = args.s
+	libDir = args.l
+	dbFile = args.d
+	isFile = args.k
+	
+	# check to make sure a proper GAG class was added
+	if gClass not in ['HS', 'CS', 'KS']:
+		print "You must denote a GAG class, either HS, CS, or KS. Try 'python compile_library.py --help'"
+		sys.exit()
+	
+	# check to make sure that metal adduct is appropriate
+	if adduct:
+		if adduct not in ['Na', 'K', 'Li', 'Ca', 'Mg']:
+			print "\nInvalid metal adduct entered. Only Na, K, Li, Ca, and Mg are accepted. Try 'python compile_library.py --help'"
+			sys.exit()
+		
+		if nMetal is None or nMetal < 1:
+			print "\nYou must enter a positive integer for the number of adducted metals. Try 'python compile_library.py --help'"
+			sys.exit()
+	else:
+		if nMetal:
+			print "\nYou did not select a metal adduct, only the number. Try 'python compile_library.py --help'"
+			sys.exit()
+	
+	# check to see if the user wants to consider sulfate loss
+	if not s_loss:
+		s_loss = 0
+	
+	if not libDir:
+		libDir = '../lib/GAGfragLib'
+	
+	if not dbFile:
+		dbFile = '../lib/GAGfragDB.db'
+	
+	if not isFile:
+		isFile = '../lib/GAGisoCache.db'
+	
+	print "Done!"
+	
+	#############################
+	# Step 2: compile fragments #
+	#############################
+	
+	print "Compiling fragments...",
+	
+	conn     = sq.connect(dbFile)
+	isotopes = IsotopeCache(isFile)
+	
+	path, pComp, made = compile_library(gClass, fmla, adduct, nMetal, reag, pre_mz, pre_z, s_loss, libDir, conn.cursor(), isotopes)
+	
+	isotopes.close()
+	conn.close()
+	
+	if made:
+		print "Done! Compiled " + pComp + " into " + path
+	else:
+		print "Done! " + pComp + " was already compiled in " + path
+	
+	print "Finished!"
+	print time.time() - start_time
+
+# run main
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,94 @@
+# chemical formula and composition codec shared by GAGfinder and the GAGfragDB scripts
+
+import re # for splitting formulae by symbol
+import sys # for exiting on invalid formulae
+from collections import OrderedDict # for the least recently used memo
+
+# symbols, in the order formula strings are written
+ELEMENTS = ['C', 'H', 'O', 'N', 'S', 'Na', 'K', 'Li', 'Ca', 'Mg'] # CHONS and the metals GAGfinder adducts
+MONOS    = ['D', 'U', 'X', 'N', 'A', 'S'] # dHexA, HexA, Hex, HexN, acetyl, sulfate
+
+SYMBOL  = re.compile(r'([A-Z][a-z]*)(\d*)') # one symbol and its count
+MEMO_SZ = 100000 # formulae remembered by fmla2dict and by dict2fmla
+
+memo  = OrderedDict() # parsed formulae, by (formula, type), least recently used first
+rmemo = OrderedDict() # written formulae, by (symbol counts, type), least recently used first
+
+# function for getting the symbols and starting dictionary of a formula type
+def symbols(type):
+	if type == 'formula':
+		return [ELEMENTS, {'C':0, 'H':0, 'O':0, 'N':0, 'S':0}]
+	elif type == 'composition':
+		return [MONOS, {'D':0, 'U':0, 'X':0, 'N':0, 'A':0, 'S':0}]
+	else:
+		print "Incorrect type entered. Please enter either 'formula' or 'composition'."
+		sys.exit()
+
+# function for converting dictionary to chemical formula or composition
+def dict2fmla (dt, type):
+	syms = symbols(type)[0]
+	
+	# check if this formula has been written recently
+	key = (tuple([dt.get(sym, 0) for sym in syms]), type)
+	if key in rmemo:
+		fs = rmemo.pop(key)
+		rmemo[key] = fs
+		
+		# return
+		return fs
+	
+	fs = '' # formula string
+	
+	for sym in syms:
+		if sym in dt:
+			if dt[sym] > 0:
+				if dt[sym] > 1:
+					fs += sym + str(dt[sym])
+				else:
+					fs += sym
+	
+	# remember the formula, forgetting the least recently used one when full
+	rmemo[key] = fs
+	if len(rmemo) > MEMO_SZ:
+		rmemo.popitem(last=False)
+	
+	# return
+	return fs
+
+# function for converting chemical formula or composition to dictionary
+def fmla2dict (fm, type):
+	# check if this formula has been parsed recently
+	key = (fm, type)
+	if key in memo:
+		dt = memo.pop(key)
+		memo[key] = dt
+		
+		# return a copy, since callers change their dictionaries
+		return dict(dt)
+	
+	syms, dt = symbols(type)
+	
+	# compositions are single letters, so they can be entered in any case
+	if type == 'composition':
+		fm = fm.upper()
+	
+	for q in SYMBOL.findall(fm): # split formula by symbol
+		if q[0] not in syms: # invalid symbol entered
+			print "Invalid chemical formula entered."
+			sys.exit()
+		
+		if q[0] not in dt:
+			dt[q[0]] = 0
+		
+		if q[1] == '': # only one of this atom
+			dt[q[0]] += 1
+		else:
+			dt[q[0]] += int(q[1])
+	
+	# remember the formula, forgetting the least recently used one when full
+	memo[key] = dt
+	if len(memo) > MEMO_SZ:
+		memo.popitem(last=False)
+	
+	# return
+	return dict(dt)
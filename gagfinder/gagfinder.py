@@ -9,7 +9,6 @@ print "Importing modules and functions...",
 import time # for timing functions
 start_time = time.time()
 
-import re # for converting chemical formulae to dictionaries and vice versa
 import sys # for getting user inputs
 import argparse # for getting user inputs
 import sqlite3 as sq # for accessing the database
@@ -19,13 +18,12 @@ import brainpy as bp # for generating theoretical isotopic distribution
 
 # get individual classes from brainpy
 iv    = bp.isotopic_variants
-pt    = bp.mass_dict.nist_mass
-elems = pt.keys()
 
 debug = False # variable for debugging
 
 # get local package
 from species import *
+from formula import * # for converting chemical formulae to dictionaries and vice versa
 
 print "Done!"
 
@@ -123,60 +121,6 @@ class TheoreticalIsotopicPattern(object):
             self.base_tid[0].charge,
             ', '.join("%0.3f" % p.intensity for p in self.truncated_tid))
 
-# function for converting dictionary to chemical formula or composition
-def dict2fmla (dt, type):
-	fs = '' # formula string
-	
-	# check whether chemical formula or composition
-	if type == 'formula':
-		symbols = elems
-	elif type == 'composition':
-		symbols = ['D', 'U', 'X', 'N', 'A', 'S']
-	else:
-		print "Incorrect type entered. Please enter either 'formula' or 'composition'."
-		sys.exit()
-	
-	for sym in symbols:
-		if sym in dt:
-			if dt[sym] > 0:
-				if dt[sym] > 1:
-					fs += sym + str(dt[sym])
-				else:
-					fs += sym
-	
-	# return
-	return fs
-
-# function for converting chemical formula or composition to dictionary
-def fmla2dict (fm, type):
-	# check whether chemical formula or composition
-	if type == 'formula':
-		symbols = elems
-		dt = {'C':0, 'H':0, 'O':0, 'N':0, 'S':0} #, 'Na':0, 'K':0, 'Li':0, 'Mg':0, 'Ca':0}
-	elif type == 'composition':
-		symbols = ['D', 'U', 'X', 'N', 'A', 'S']
-		dt = {'D':0, 'U':0, 'X':0, 'N':0, 'A':0, 'S':0}
-	else:
-		print "Incorrect type entered. Please enter either 'formula' or 'composition'."
-		sys.exit()
-	
-	parts = re.findall(r'([A-Z][a-z]*)(\d*)', fm.upper()) # split formula by symbol
-	for q in parts:
-		if q[0] not in dt: # invalid symbol entered
-			if q[0] not in symbols:
-				print "Invalid chemical formula entered."
-				sys.exit()
-			else:
-				dt[q[0]] = 0
-		
-		if q[1] == '': # only one of this atom
-			dt[q[0]] += 1
-		else:
-			dt[q[0]] += int(q[1])
-	
-	# return
-	return dt
-
 # function for summing the scans
 def sum_scans(data, spec, noise_removed):
 	counter = 0.0 # count the number of scans in the data file
@@ -635,7 +579,7 @@ def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz,
 	
 	# parse the reducing end derivatization formula
 	if re_form:
-		parts = re.findall(r'([A-Z][a-z]*)(\d*)', re_form.upper()) # split formula by symbol
+		parts = SYMBOL.findall(re_form.upper()) # split formula by symbol
 		for q in parts:
 			if q[0] not in atoms: # invalid symbol entered
 				print "Invalid chemical formula entered. Please enter only CHONS. Try 'python gagfinder.py --help'"
@@ -648,7 +592,7 @@ def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz,
 	
 	# parse the reagent formula
 	if reagent:
-		parts = re.findall(r'([A-Z][a-z]*)(\d*)', reagent.upper()) # split formula by symbol
+		parts = SYMBOL.findall(reagent.upper()) # split formula by symbol
 		for q in parts:
 			if q[0] not in atoms: # invalid symbol entered
 				print "Invalid chemical formula entered. Please enter only CHONS. Try 'python gagfinder.py --help'"
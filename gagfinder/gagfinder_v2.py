@@ -6,439 +6,86 @@
 
 print "Importing modules and functions...",
 
-# initialize dictionaries for weights and formulae
-wt = {}
-fm = {}
-
-# monoisotopic element weights
-wt['monoH'] = 1.00782504
-wt['monoC'] = 12.0
-wt['monoO'] = 15.99491461956
-wt['monoN'] = 14.0030740048
-wt['monoS'] = 31.97207100
-
-# monoisotopic compound weights
-wt['monoHex']   = 6*wt['monoC'] + 12*wt['monoH'] + 6*wt['monoO']
-wt['monoHexA']  = 6*wt['monoC'] + 10*wt['monoH'] + 7*wt['monoO']
-wt['monoHexN']  = 6*wt['monoC'] + 13*wt['monoH'] + wt['monoN'] + 5*wt['monoO']
-wt['monodHexA'] = 6*wt['monoC'] + 8*wt['monoH'] + 6*wt['monoO']
-wt['monoH2O']   = 2*wt['monoH'] + wt['monoO']
-wt['monoSO3']   = wt['monoS'] + 3*wt['monoO']
-wt['monoAc']    = 2*wt['monoC'] + 2*wt['monoH'] + wt['monoO']
-
-# formulae
-fm['Hex']   = {'C':6, 'H':12, 'O':6, 'N':0, 'S':0}
-fm['HexA']  = {'C':6, 'H':10, 'O':7, 'N':0, 'S':0}
-fm['HexN']  = {'C':6, 'H':13, 'O':5, 'N':1, 'S':0}
-fm['dHexA'] = {'C':6, 'H':8, 'O':6, 'N':0, 'S':0}
-fm['H2O']   = {'C':0, 'H':2, 'O':1, 'N':0, 'S':0}
-fm['SO3']   = {'C':0, 'H':0, 'O':3, 'N':0, 'S':1}
-fm['Ac']    = {'C':2, 'H':2, 'O':1, 'N':0, 'S':0}
-
-### modification locations
-# initialize dictionary
-modlocs       = {}
-modlocs['HS'] = {'D':{}, 'U':{}, 'N':{}}
-modlocs['CS'] = {'D':{}, 'U':{}, 'N':{}}
-modlocs['KS'] = {'X':{}, 'N':{}}
-
-# Acetyl
-modlocs['HS']['N'] = {'Ac': [2]}
-modlocs['CS']['N'] = {'Ac': [2]}
-modlocs['KS']['N'] = {'Ac': [2]}
-
-# Sulfate
-modlocs['HS']['D']['SO3'] = [2]
-modlocs['HS']['U']['SO3'] = [2]
-modlocs['HS']['N']['SO3'] = [2,3,6]
-modlocs['CS']['D']['SO3'] = [2]
-modlocs['CS']['U']['SO3'] = [2]
-modlocs['CS']['N']['SO3'] = [4,6]
-modlocs['KS']['X']['SO3'] = [6]
-modlocs['KS']['N']['SO3'] = [6]
-
-### cross-ring fragments ###
-# initialize dictionaries for weights and formulae
-xwt  = {}
-xfm  = {}
-xmod = {}
-
-### cross-ring formulae ###
-## HexA
-xfm['HexA'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xfm['HexA']['NR'] = {}
-xfm['HexA']['RE'] = {}
-
-# add fragments
-xfm['HexA']['NR']['0,2'] = {'C':4, 'H':6, 'O':5, 'N':0, 'S':0}
-xfm['HexA']['NR']['1,3'] = {'C':2, 'H':4, 'O':2, 'N':0, 'S':0}
-xfm['HexA']['NR']['1,5'] = {'C':5, 'H':8, 'O':5, 'N':0, 'S':0}
-xfm['HexA']['NR']['2,4'] = {'C':2, 'H':4, 'O':2, 'N':0, 'S':0}
-xfm['HexA']['NR']['3,5'] = {'C':3, 'H':4, 'O':3, 'N':0, 'S':0}
-xfm['HexA']['NR']['0,3'] = {'C':3, 'H':4, 'O':4, 'N':0, 'S':0}
-xfm['HexA']['NR']['1,4'] = {'C':3, 'H':6, 'O':3, 'N':0, 'S':0}
-xfm['HexA']['NR']['2,5'] = {'C':4, 'H':6, 'O':4, 'N':0, 'S':0}
-xfm['HexA']['RE']['0,2'] = {'C':2, 'H':4, 'O':2, 'N':0, 'S':0}
-xfm['HexA']['RE']['1,3'] = {'C':4, 'H':6, 'O':5, 'N':0, 'S':0}
-xfm['HexA']['RE']['1,5'] = {'C':1, 'H':2, 'O':2, 'N':0, 'S':0}
-xfm['HexA']['RE']['2,4'] = {'C':4, 'H':6, 'O':5, 'N':0, 'S':0}
-xfm['HexA']['RE']['3,5'] = {'C':3, 'H':6, 'O':4, 'N':0, 'S':0}
-xfm['HexA']['RE']['0,3'] = {'C':3, 'H':6, 'O':3, 'N':0, 'S':0}
-xfm['HexA']['RE']['1,4'] = {'C':3, 'H':4, 'O':4, 'N':0, 'S':0}
-xfm['HexA']['RE']['2,5'] = {'C':2, 'H':4, 'O':3, 'N':0, 'S':0}
-
-## HexA
-xfm['dHexA'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xfm['dHexA']['RE'] = {}
-
-# add fragments
-xfm['dHexA']['RE']['0,2'] = {'C':2, 'H':4, 'O':2, 'N':0, 'S':0}
-xfm['dHexA']['RE']['1,3'] = {'C':4, 'H':4, 'O':4, 'N':0, 'S':0}
-xfm['dHexA']['RE']['1,5'] = {'C':1, 'H':2, 'O':2, 'N':0, 'S':0}
-xfm['dHexA']['RE']['2,4'] = {'C':4, 'H':5, 'O':5, 'N':0, 'S':0}
-xfm['dHexA']['RE']['3,5'] = {'C':3, 'H':6, 'O':4, 'N':0, 'S':0}
-xfm['dHexA']['RE']['0,3'] = {'C':3, 'H':6, 'O':3, 'N':0, 'S':0}
-xfm['dHexA']['RE']['1,4'] = {'C':3, 'H':3, 'O':4, 'N':0, 'S':0}
-xfm['dHexA']['RE']['2,5'] = {'C':2, 'H':4, 'O':3, 'N':0, 'S':0}
-
-## HexN
-xfm['HexN'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xfm['HexN']['NR'] = {}
-xfm['HexN']['RE'] = {}
-
-# add fragments
-xfm['HexN']['NR']['0,2'] = {'C':4, 'H':8, 'O':4, 'N':0, 'S':0}
-xfm['HexN']['NR']['1,3'] = {'C':2, 'H':5, 'O':1, 'N':1, 'S':0}
-xfm['HexN']['NR']['1,5'] = {'C':5, 'H':11, 'O':3, 'N':1, 'S':0}
-xfm['HexN']['NR']['2,4'] = {'C':2, 'H':4, 'O':2, 'N':0, 'S':0}
-xfm['HexN']['NR']['3,5'] = {'C':3, 'H':6, 'O':2, 'N':0, 'S':0}
-xfm['HexN']['NR']['0,3'] = {'C':3, 'H':7, 'O':2, 'N':1, 'S':0}
-xfm['HexN']['NR']['1,4'] = {'C':3, 'H':7, 'O':2, 'N':1, 'S':0}
-xfm['HexN']['NR']['2,5'] = {'C':4, 'H':5, 'O':3, 'N':0, 'S':0}
-xfm['HexN']['RE']['0,2'] = {'C':2, 'H':5, 'O':1, 'N':1, 'S':0}
-xfm['HexN']['RE']['1,3'] = {'C':4, 'H':8, 'O':4, 'N':0, 'S':0}
-xfm['HexN']['RE']['1,5'] = {'C':1, 'H':2, 'O':2, 'N':0, 'S':0}
-xfm['HexN']['RE']['2,4'] = {'C':4, 'H':9, 'O':3, 'N':1, 'S':0}
-xfm['HexN']['RE']['3,5'] = {'C':3, 'H':7, 'O':3, 'N':1, 'S':0}
-xfm['HexN']['RE']['0,3'] = {'C':3, 'H':6, 'O':3, 'N':0, 'S':0}
-xfm['HexN']['RE']['1,4'] = {'C':3, 'H':6, 'O':3, 'N':0, 'S':0}
-xfm['HexN']['RE']['2,5'] = {'C':2, 'H':5, 'O':2, 'N':1, 'S':0}
-
-## Hex
-xfm['Hex'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xfm['Hex']['NR'] = {}
-xfm['Hex']['RE'] = {}
-
-# add fragments
-xfm['Hex']['NR']['0,2'] = {'C':4, 'H':8, 'O':4, 'N':0, 'S':0}
-xfm['Hex']['NR']['1,3'] = {'C':2, 'H':4, 'O':2, 'N':0, 'S':0}
-xfm['Hex']['NR']['1,5'] = {'C':5, 'H':10, 'O':4, 'N':0, 'S':0}
-xfm['Hex']['NR']['2,4'] = {'C':2, 'H':4, 'O':2, 'N':0, 'S':0}
-xfm['Hex']['NR']['1,4'] = {'C':3, 'H':6, 'O':3, 'N':0, 'S':0}
-xfm['Hex']['NR']['2,5'] = {'C':4, 'H':8, 'O':3, 'N':0, 'S':0}
-xfm['Hex']['RE']['0,2'] = {'C':2, 'H':4, 'O':2, 'N':0, 'S':0}
-xfm['Hex']['RE']['1,3'] = {'C':4, 'H':8, 'O':4, 'N':0, 'S':0}
-xfm['Hex']['RE']['1,5'] = {'C':1, 'H':2, 'O':2, 'N':0, 'S':0}
-xfm['Hex']['RE']['2,4'] = {'C':4, 'H':8, 'O':4, 'N':0, 'S':0}
-xfm['Hex']['RE']['1,4'] = {'C':3, 'H':6, 'O':3, 'N':0, 'S':0}
-xfm['Hex']['RE']['2,5'] = {'C':2, 'H':4, 'O':3, 'N':0, 'S':0}
-
-
-
-### cross-ring weights ###
-## HexA
-xwt['HexA'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xwt['HexA']['NR'] = {}
-xwt['HexA']['RE'] = {}
-
-# add weights
-xwt['HexA']['NR']['0,2'] = 4*wt['monoC'] + 6*wt['monoH'] + 5*wt['monoO']
-xwt['HexA']['NR']['1,3'] = 2*wt['monoC'] + 4*wt['monoH'] + 2*wt['monoO']
-xwt['HexA']['NR']['1,5'] = 5*wt['monoC'] + 8*wt['monoH'] + 5*wt['monoO']
-xwt['HexA']['NR']['2,4'] = 2*wt['monoC'] + 4*wt['monoH'] + 2*wt['monoO']
-xwt['HexA']['NR']['3,5'] = 3*wt['monoC'] + 4*wt['monoH'] + 3*wt['monoO']
-xwt['HexA']['NR']['0,3'] = 3*wt['monoC'] + 4*wt['monoH'] + 4*wt['monoO']
-xwt['HexA']['NR']['1,4'] = 3*wt['monoC'] + 6*wt['monoH'] + 3*wt['monoO']
-xwt['HexA']['NR']['2,5'] = 4*wt['monoC'] + 6*wt['monoH'] + 4*wt['monoO']
-xwt['HexA']['RE']['0,2'] = 2*wt['monoC'] + 4*wt['monoH'] + 2*wt['monoO']
-xwt['HexA']['RE']['1,3'] = 4*wt['monoC'] + 6*wt['monoH'] + 5*wt['monoO']
-xwt['HexA']['RE']['1,5'] = 1*wt['monoC'] + 2*wt['monoH'] + 2*wt['monoO']
-xwt['HexA']['RE']['2,4'] = 4*wt['monoC'] + 6*wt['monoH'] + 5*wt['monoO']
-xwt['HexA']['RE']['3,5'] = 3*wt['monoC'] + 6*wt['monoH'] + 4*wt['monoO']
-xwt['HexA']['RE']['0,3'] = 3*wt['monoC'] + 6*wt['monoH'] + 3*wt['monoO']
-xwt['HexA']['RE']['1,4'] = 3*wt['monoC'] + 4*wt['monoH'] + 4*wt['monoO']
-xwt['HexA']['RE']['2,5'] = 2*wt['monoC'] + 4*wt['monoH'] + 3*wt['monoO']
-
-## dHexA
-xwt['dHexA'] = {}
-
-# initialize dictionary for non-reducing end and reducing end
-xwt['dHexA']['RE']  = {}
-
-# add weights
-xwt['dHexA']['RE']['0,2'] = 2*wt['monoC'] + 4*wt['monoH'] + 2*wt['monoO']
-xwt['dHexA']['RE']['1,3'] = 4*wt['monoC'] + 4*wt['monoH'] + 4*wt['monoO']
-xwt['dHexA']['RE']['1,5'] = wt['monoC'] + 2*wt['monoH'] + 2*wt['monoO']
-xwt['dHexA']['RE']['2,4'] = 4*wt['monoC'] + 5*wt['monoH'] + 5*wt['monoO']
-xwt['dHexA']['RE']['3,5'] = 3*wt['monoC'] + 6*wt['monoH'] + 4*wt['monoO']
-xwt['dHexA']['RE']['0,3'] = 3*wt['monoC'] + 6*wt['monoH'] + 3*wt['monoO']
-xwt['dHexA']['RE']['1,4'] = 3*wt['monoC'] + 3*wt['monoH'] + 4*wt['monoO']
-xwt['dHexA']['RE']['2,5'] = 2*wt['monoC'] + 4*wt['monoH'] + 3*wt['monoO']
-
-## HexN
-xwt['HexN'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xwt['HexN']['NR'] = {}
-xwt['HexN']['RE']  = {}
-
-# add weights
-xwt['HexN']['NR']['0,2'] = 4*wt['monoC'] + 8*wt['monoH'] + 4*wt['monoO']
-xwt['HexN']['NR']['1,3'] = 2*wt['monoC'] + 5*wt['monoH'] + wt['monoO'] + wt['monoN']
-xwt['HexN']['NR']['1,5'] = 5*wt['monoC'] + 11*wt['monoH'] + 3*wt['monoO'] + wt['monoN']
-xwt['HexN']['NR']['2,4'] = 2*wt['monoC'] + 4*wt['monoH'] + 2*wt['monoO']
-xwt['HexN']['NR']['3,5'] = 3*wt['monoC'] + 6*wt['monoH'] + 2*wt['monoO']
-xwt['HexN']['NR']['0,3'] = 3*wt['monoC'] + 7*wt['monoH'] + 2*wt['monoO'] + wt['monoN']
-xwt['HexN']['NR']['1,4'] = 3*wt['monoC'] + 7*wt['monoH'] + 2*wt['monoO'] + wt['monoN']
-xwt['HexN']['NR']['2,5'] = 4*wt['monoC'] + 5*wt['monoH'] + 3*wt['monoO']
-xwt['HexN']['RE']['0,2'] = 2*wt['monoC'] + 5*wt['monoH'] + 1*wt['monoO'] + wt['monoN']
-xwt['HexN']['RE']['1,3'] = 4*wt['monoC'] + 8*wt['monoH'] + 4*wt['monoO']
-xwt['HexN']['RE']['1,5'] = 1*wt['monoC'] + 2*wt['monoH'] + 2*wt['monoO']
-xwt['HexN']['RE']['2,4'] = 4*wt['monoC'] + 9*wt['monoH'] + 3*wt['monoO'] + wt['monoN']
-xwt['HexN']['RE']['3,5'] = 3*wt['monoC'] + 7*wt['monoH'] + 3*wt['monoO'] + wt['monoN']
-xwt['HexN']['RE']['0,3'] = 3*wt['monoC'] + 6*wt['monoH'] + 3*wt['monoO']
-xwt['HexN']['RE']['1,4'] = 3*wt['monoC'] + 6*wt['monoH'] + 3*wt['monoO']
-xwt['HexN']['RE']['2,5'] = 2*wt['monoC'] + 5*wt['monoH'] + 2*wt['monoO'] + wt['monoN']
-
-## Hex
-xwt['Hex'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xwt['Hex']['NR'] = {}
-xwt['Hex']['RE'] = {}
-
-# add fragments
-xwt['Hex']['NR']['0,2'] = 4*wt['monoC'] + 8*wt['monoH'] + 4*wt['monoO']
-xwt['Hex']['NR']['1,3'] = 2*wt['monoC'] + 4*wt['monoH'] + 2*wt['monoO']
-xwt['Hex']['NR']['1,5'] = 5*wt['monoC'] + 10*wt['monoH'] + 4*wt['monoO']
-xwt['Hex']['NR']['2,4'] = 2*wt['monoC'] + 4*wt['monoH'] + 2*wt['monoO']
-xwt['Hex']['NR']['1,4'] = 3*wt['monoC'] + 6*wt['monoH'] + 3*wt['monoO']
-xwt['Hex']['NR']['2,5'] = 4*wt['monoC'] + 8*wt['monoH'] + 3*wt['monoO']
-xwt['Hex']['RE']['0,2'] = 2*wt['monoC'] + 4*wt['monoH'] + 2*wt['monoO']
-xwt['Hex']['RE']['1,3'] = 4*wt['monoC'] + 8*wt['monoH'] + 4*wt['monoO']
-xwt['Hex']['RE']['1,5'] = wt['monoC'] + 2*wt['monoH'] + 2*wt['monoO']
-xwt['Hex']['RE']['2,4'] = 4*wt['monoC'] + 8*wt['monoH'] + 4*wt['monoO']
-xwt['Hex']['RE']['1,4'] = 3*wt['monoC'] + 6*wt['monoH'] + 3*wt['monoO']
-xwt['Hex']['RE']['2,5'] = 2*wt['monoC'] + 4*wt['monoH'] + 3*wt['monoO']
-
-
-
-### cross-ring sulfation/acetylation/adduct possibilities, and COOH places
-## HS/Heparin
-xmod['HS'] = {}
-
-# HexA
-xmod['HS']['HexA'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xmod['HS']['HexA']['NR'] = {}
-xmod['HS']['HexA']['RE'] = {}
-
-# add modification possibilities
-xmod['HS']['HexA']['NR']['0,2'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['HS']['HexA']['NR']['1,5'] = {'SO3':1, 'Ac':0, 'COOH':1}
-xmod['HS']['HexA']['NR']['2,4'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['HS']['HexA']['NR']['3,5'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['HS']['HexA']['NR']['0,3'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['HS']['HexA']['NR']['1,4'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['HexA']['NR']['2,5'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['HS']['HexA']['RE']['0,2'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['HexA']['RE']['1,5'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['HS']['HexA']['RE']['2,4'] = {'SO3':1, 'Ac':0, 'COOH':1}
-xmod['HS']['HexA']['RE']['3,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['HexA']['RE']['0,3'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['HexA']['RE']['1,4'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['HS']['HexA']['RE']['2,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-
-# dHexA
-xmod['HS']['dHexA'] = {}
-
-# initialize dictionary for non-reducing end and reducing end
-xmod['HS']['dHexA']['RE']  = {}
-
-# add weights
-xmod['HS']['dHexA']['RE']['0,2'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['dHexA']['RE']['1,5'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['HS']['dHexA']['RE']['2,4'] = {'SO3':1, 'Ac':0, 'COOH':1}
-xmod['HS']['dHexA']['RE']['3,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['dHexA']['RE']['0,3'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['dHexA']['RE']['1,4'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['HS']['dHexA']['RE']['2,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-
-# HexN
-xmod['HS']['HexN'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xmod['HS']['HexN']['NR'] = {}
-xmod['HS']['HexN']['RE'] = {}
-
-# add modification possibilities
-xmod['HS']['HexN']['NR']['0,2'] = {'SO3':2, 'Ac':0, 'COOH':0}
-xmod['HS']['HexN']['NR']['1,5'] = {'SO3':3, 'Ac':1, 'COOH':0}
-xmod['HS']['HexN']['NR']['2,4'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['HexN']['NR']['3,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['HexN']['NR']['0,3'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['HexN']['NR']['1,4'] = {'SO3':2, 'Ac':1, 'COOH':0}
-xmod['HS']['HexN']['NR']['2,5'] = {'SO3':2, 'Ac':0, 'COOH':0}
-xmod['HS']['HexN']['RE']['0,2'] = {'SO3':1, 'Ac':1, 'COOH':0}
-xmod['HS']['HexN']['RE']['1,5'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['HS']['HexN']['RE']['2,4'] = {'SO3':2, 'Ac':1, 'COOH':0}
-xmod['HS']['HexN']['RE']['3,5'] = {'SO3':2, 'Ac':1, 'COOH':0}
-xmod['HS']['HexN']['RE']['0,3'] = {'SO3':2, 'Ac':1, 'COOH':0}
-xmod['HS']['HexN']['RE']['1,4'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['HS']['HexN']['RE']['2,5'] = {'SO3':1, 'Ac':1, 'COOH':0}
-
-
-## CS/DS
-xmod['CS'] = {}
-
-# HexA
-xmod['CS']['HexA'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xmod['CS']['HexA']['NR'] = {}
-xmod['CS']['HexA']['RE'] = {}
-
-# add modification possibilities
-xmod['CS']['HexA']['NR']['0,2'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['CS']['HexA']['NR']['1,5'] = {'SO3':1, 'Ac':0, 'COOH':1}
-xmod['CS']['HexA']['NR']['2,4'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['CS']['HexA']['NR']['3,5'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['CS']['HexA']['NR']['0,3'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['CS']['HexA']['NR']['1,4'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['CS']['HexA']['NR']['2,5'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['CS']['HexA']['RE']['0,2'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['CS']['HexA']['RE']['1,5'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['CS']['HexA']['RE']['2,4'] = {'SO3':1, 'Ac':0, 'COOH':1}
-xmod['CS']['HexA']['RE']['3,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['CS']['HexA']['RE']['0,3'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['CS']['HexA']['RE']['1,4'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['CS']['HexA']['RE']['2,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-
-# dHexA
-xmod['CS']['dHexA'] = {}
-
-# initialize dictionary for non-reducing end and reducing end
-xmod['CS']['dHexA']['RE']  = {}
-
-# add weights
-xmod['CS']['dHexA']['RE']['0,2'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['CS']['dHexA']['RE']['1,5'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['CS']['dHexA']['RE']['2,4'] = {'SO3':1, 'Ac':0, 'COOH':1}
-xmod['CS']['dHexA']['RE']['3,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['CS']['dHexA']['RE']['0,3'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['CS']['dHexA']['RE']['1,4'] = {'SO3':0, 'Ac':0, 'COOH':1}
-xmod['CS']['dHexA']['RE']['2,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-
-# HexN
-xmod['CS']['HexN'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xmod['CS']['HexN']['NR'] = {}
-xmod['CS']['HexN']['RE'] = {}
-
-# add modification possibilities
-xmod['CS']['HexN']['NR']['0,2'] = {'SO3':2, 'Ac':0, 'COOH':0}
-xmod['CS']['HexN']['NR']['1,3'] = {'SO3':2, 'Ac':0, 'COOH':0}
-xmod['CS']['HexN']['NR']['1,5'] = {'SO3':2, 'Ac':1, 'COOH':0}
-xmod['CS']['HexN']['NR']['2,4'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['CS']['HexN']['NR']['1,4'] = {'SO3':1, 'Ac':1, 'COOH':0}
-xmod['CS']['HexN']['NR']['2,5'] = {'SO3':2, 'Ac':0, 'COOH':0}
-xmod['CS']['HexN']['RE']['0,2'] = {'SO3':0, 'Ac':1, 'COOH':0}
-xmod['CS']['HexN']['RE']['1,3'] = {'SO3':0, 'Ac':1, 'COOH':0}
-xmod['CS']['HexN']['RE']['1,5'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['CS']['HexN']['RE']['2,4'] = {'SO3':1, 'Ac':1, 'COOH':0}
-xmod['CS']['HexN']['RE']['1,4'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['CS']['HexN']['RE']['2,5'] = {'SO3':0, 'Ac':1, 'COOH':0}
-
-
-## ks
-xmod['KS'] = {}
-
-# Hex
-xmod['KS']['Hex'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xmod['KS']['Hex']['NR'] = {}
-xmod['KS']['Hex']['RE'] = {}
-
-# add modification possibilities
-xmod['KS']['Hex']['NR']['0,2'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['NR']['1,3'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['NR']['1,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['NR']['2,4'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['NR']['1,4'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['NR']['2,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['RE']['0,2'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['RE']['1,3'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['RE']['1,5'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['RE']['2,4'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['RE']['1,4'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['Hex']['RE']['2,5'] = {'SO3':0, 'Ac':0, 'COOH':0}
-
-# HexN
-xmod['KS']['HexN'] = {}
-
-# initialize dictionaries for non-reducing end and reducing end
-xmod['KS']['HexN']['NR'] = {}
-xmod['KS']['HexN']['RE'] = {}
-
-# add modification possibilities
-xmod['KS']['HexN']['NR']['0,2'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['HexN']['NR']['1,5'] = {'SO3':1, 'Ac':1, 'COOH':0}
-xmod['KS']['HexN']['NR']['2,4'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['KS']['HexN']['NR']['3,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['HexN']['NR']['0,3'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['HexN']['NR']['1,4'] = {'SO3':0, 'Ac':1, 'COOH':0}
-xmod['KS']['HexN']['NR']['2,5'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['HexN']['RE']['0,2'] = {'SO3':0, 'Ac':1, 'COOH':0}
-xmod['KS']['HexN']['RE']['1,5'] = {'SO3':0, 'Ac':0, 'COOH':0}
-xmod['KS']['HexN']['RE']['2,4'] = {'SO3':1, 'Ac':1, 'COOH':0}
-xmod['KS']['HexN']['RE']['3,5'] = {'SO3':0, 'Ac':1, 'COOH':0}
-xmod['KS']['HexN']['NR']['0,3'] = {'SO3':0, 'Ac':1, 'COOH':0}
-xmod['KS']['HexN']['NR']['1,4'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['HexN']['NR']['2,5'] = {'SO3':0, 'Ac':1, 'COOH':0}
-
 import time # for timing functions
 start_time = time.time()
 
-import re # for converting chemical formulae to dictionaries and vice versa
+import math # for Gauss fitting peaks
+import os # for finding compiled fragment libraries
+import hashlib # for naming compiled fragment libraries
+import json # for loading the species tables
+import struct # for finding the columns of a result file
+import zipfile # for finding the columns of a result file
 import sys # for getting user inputs
 import argparse # for getting user inputs
 import sqlite3 as sq # for accessing the database
-import pymzml # for handling MS data
-import numpy as np # for handling numerical operations
-import brainpy as bp # for generating theoretical isotopic distribution
+import multiprocessing as mp # for scoring fragments in parallel
+from collections import OrderedDict # for caches that forget what was used least recently
+
+# stand-in for a slow module, or something in it, that is only imported the first time it is used,
+# so that checking arguments and printing help do not wait for numpy, pymzml and brainpy
+class Lazy(object):
+
+    # its own attributes are underscored so that they never hide one of the real thing's, like np.load
+    def __init__(self, namespace, name, load):
+        self._namespace = namespace
+        self._name = name
+        self._load = load
+
+    def _resolve(self):
+        obj = self._load()
+        self._namespace[self._name] = obj # later uses go straight to the real thing
+        return obj
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+pymzml = Lazy(globals(), 'pymzml', lambda: __import__('pymzml')) # for handling MS data
+np     = Lazy(globals(), 'np', lambda: __import__('numpy')) # for handling numerical operations
+bp     = Lazy(globals(), 'bp', lambda: __import__('brainpy')) # for generating theoretical isotopic distribution
 
 # get individual classes from brainpy
-iv    = bp.isotopic_variants
-pt    = bp.mass_dict.nist_mass
-elems = pt.keys()
+iv    = Lazy(globals(), 'iv', lambda: bp.isotopic_variants)
+Peak  = Lazy(globals(), 'Peak', lambda: type(iv({'H':2})[0])) # peak class that brainpy hands back, C or pure Python
 
 debug = False # variable for debugging
 
 # get local package
-#from gagfinder.species import *
+from formula import * # for converting chemical formulae to dictionaries and vice versa
+
+# function for loading the species tables from species.json, or from species.py if that has changed since
+def load_species():
+	here = os.path.dirname(os.path.abspath(__file__))
+	
+	f      = open(os.path.join(here, 'species.py'), 'rb')
+	digest = hashlib.sha1(f.read()).hexdigest()
+	f.close()
+	
+	path = os.path.join(here, 'species.json')
+	if os.path.isfile(path):
+		f     = open(path, 'r')
+		saved = json.load(f, object_hook=lambda d: dict((str(k), v) for k, v in d.items()))
+		f.close()
+		
+		if saved['digest'] == digest:
+			return saved['tables']
+	
+	import species
+	
+	# return
+	return species.species_tables()
+
+# weights, formulae, modification locations and cross-ring fragment tables
+tables  = load_species()
+wt      = tables['wt']
+fm      = tables['fm']
+modlocs = tables['modlocs']
+xwt     = tables['xwt']
+xfm     = tables['xfm']
+xmod    = tables['xmod']
+xloc    = tables['xloc']
 
 print "Done!"
 
@@ -501,6 +148,16 @@ class TheoreticalIsotopicPattern(object):
         self.truncated_tid = result
         return self
 	
+    def at_charge(self, charge, charge_carrier=None):
+        if charge_carrier is None:
+            charge_carrier = bp.PROTON
+
+        # peaks of a neutral (charge 0) pattern moved to the given charge state
+        mass_charge_ratio = bp.mass_charge_ratio
+        base_tid = [Peak(mass_charge_ratio(p.mz, charge, charge_carrier), p.intensity, charge)
+                    for p in self.base_tid]
+        return self.__class__(base_tid, base_tid[:len(self.truncated_tid)])
+	
     def ignore_below(self, ignore_below=0.0):
         total = 0
         kept_tid = []
@@ -536,6 +193,248 @@ class TheoreticalIsotopicPattern(object):
             self.base_tid[0].charge,
             ', '.join("%0.3f" % p.intensity for p in self.truncated_tid))
 
+# dictionary that forgets its least recently used entries once it holds more than size, or never with no size
+class LRUCache(object):
+
+    def __init__(self, size=None):
+        self.size = size
+        self.items = OrderedDict()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __getitem__(self, key):
+        value = self.items.pop(key)
+        self.items[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self.items.pop(key, None)
+        self.items[key] = value
+        if self.size and len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+# persistent store of truncated isotopic distributions, keyed by formula, charge and truncation;
+# only neutral distributions are stored and charge states are derived from them
+class IsotopeCache(object):
+
+    def __init__(self, path, threshold=0.95, size=None):
+        self.path = path
+        self.threshold = threshold
+        self.memory = LRUCache(size) # neutral distributions in memory, at most size of them
+        self.pending = []
+        self.stored = None
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sq.connect(path, timeout=60)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS IsotopePatterns (
+                             formula   TEXT    NOT NULL,
+                             charge    INTEGER NOT NULL,
+                             threshold REAL    NOT NULL,
+                             nTrunc    INTEGER NOT NULL,
+                             mz        BLOB    NOT NULL,
+                             intensity BLOB    NOT NULL,
+                             PRIMARY KEY (formula, charge, threshold));''')
+        self.conn.commit()
+
+    def __len__(self):
+        return len(self.memory)
+
+    def load(self):
+        # read every stored neutral distribution for this truncation in one pass
+        self.stored = {}
+        for row in self.conn.execute('''SELECT formula, nTrunc, mz, intensity
+                                       FROM   IsotopePatterns
+                                       WHERE  charge = 0
+                                       AND    threshold = ?;''', (self.threshold,)):
+            self.stored[row[0]] = row[1:]
+
+    def get(self, fmla, fdict, charge=0):
+        if fmla in self.memory:
+            self.hits += 1
+            dist = self.memory[fmla]
+        else:
+            if self.stored is None:
+                self.load()
+
+            if fmla in self.stored:
+                self.hits += 1
+                dist = self.unpack(0, *self.stored.pop(fmla))
+            else:
+                self.misses += 1
+                dist = TheoreticalIsotopicPattern(iv(fdict)).truncate_after(self.threshold)
+                self.pending.append((fmla, 0, self.threshold) + self.pack(dist))
+
+            self.memory[fmla] = dist
+
+        if charge:
+            return dist.at_charge(charge)
+        return dist
+
+    def pack(self, dist):
+        mz = np.array([p.mz for p in dist.base_tid], dtype=float)
+        intensity = np.array([p.intensity for p in dist.base_tid], dtype=float)
+        return (len(dist.truncated_tid), sq.Binary(mz.tostring()), sq.Binary(intensity.tostring()))
+
+    def unpack(self, charge, n_trunc, mz, intensity):
+        mz = np.frombuffer(mz, dtype=float).tolist()
+        intensity = np.frombuffer(intensity, dtype=float).tolist()
+        base_tid = [Peak(m, i, charge) for m, i in zip(mz, intensity)]
+        return TheoreticalIsotopicPattern(base_tid, base_tid[:n_trunc])
+
+    def flush(self):
+        if self.pending:
+            self.conn.executemany('''INSERT OR IGNORE INTO IsotopePatterns (formula, charge, threshold, nTrunc, mz, intensity)
+                                     VALUES (?,?,?,?,?,?);''', self.pending)
+            self.conn.commit()
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+# in-memory precursor masses of each GAG class, sorted so the nearest mass is a binary search
+class PrecursorIndex(object):
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.classes = {}
+        self.built = None
+
+    def load(self, gag_class):
+        # read every precursor of this class in one pass, ordered by mass
+        if gag_class not in self.classes:
+            self.cursor.execute('''SELECT   cpm.id, f.value, p.value, f.monoMass
+                                   FROM     Precursors p, ClassPrecursorMap cpm, Formulae f
+                                   WHERE    p.id = cpm.pId
+                                   AND      f.id = p.fmId
+                                   AND      cpm.cId = ?
+                                   ORDER BY f.monoMass ASC, cpm.id ASC;''', (gag_class,))
+            rows = self.cursor.fetchall()
+            self.classes[gag_class] = (rows, np.array([r[3] for r in rows], dtype=float))
+
+        return self.classes[gag_class]
+
+    def stamp(self):
+        # the db_stamp of this connection's GAGfragDB, read once
+        if self.built is None:
+            self.built = db_stamp(self.cursor)
+
+        return self.built
+
+    def nearest(self, gag_class, masses):
+        # get the row with the closest mass for each test mass (the lighter precursor wins a tie)
+        rows, mono = self.load(gag_class)
+        if not rows:
+            return [None] * len(masses)
+
+        masses = np.asarray(masses, dtype=float)
+        hi = np.minimum(np.searchsorted(mono, masses), len(mono)-1)
+        lo = np.maximum(hi - 1, 0)
+        pick = np.where(np.abs(mono[hi] - masses) < np.abs(mono[lo] - masses), hi, lo)
+
+        return [rows[i] for i in pick]
+
+# compiled fragments of one precursor and set of options: flattened isotope peaks plus the
+# compositions of each formula, saved as .npy files that are memory-mapped when loaded
+class FragmentLibrary(object):
+
+    version = 1 # bump when the layout or the enumeration changes
+
+    def __init__(self, keys, lengths, mz, intensity, forms):
+        self.keys = keys
+        self.lengths = lengths
+        self.mz = mz
+        self.intensity = intensity
+        self.forms = forms
+        self.start = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(int)
+        self.index = dict((j, q) for q, j in enumerate(keys))
+
+    @staticmethod
+    def key(gag_class, comp, fmla, so3loss, rf, df, chg, metal, metal_ct, db_stamp, threshold=0.95):
+        # hash of everything get_frags depends on, so a library is only reused for the same inputs;
+        # db_stamp is the db_stamp of GAGfragDB, so a rebuilt GAGfragDB gets new libraries
+        inputs = (FragmentLibrary.version, gag_class, comp, fmla, so3loss, tuple(sorted(rf.items())),
+                  tuple(sorted(df.items())), chg, metal, metal_ct, db_stamp, threshold)
+        return hashlib.sha1(repr(inputs)).hexdigest()
+
+    @classmethod
+    def from_frags(cls, IDs, forms):
+        keys, lengths, mz, intensity = flatten_patterns(IDs)
+        return cls(keys, lengths, mz, intensity, forms)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, j):
+        return j in self.index
+
+    def __getitem__(self, j):
+        q = self.index[j]
+        peaks = [Peak(float(m), float(i), j[1]) for m, i in zip(self.mz[self.start[q]:self.start[q]+self.lengths[q]],
+                                                              self.intensity[self.start[q]:self.start[q]+self.lengths[q]])]
+        return TheoreticalIsotopicPattern(peaks)
+
+    def flatten(self, keys=None):
+        # the whole library is already flat, in its own order
+        if keys is None or keys == self.keys:
+            return [self.keys, self.lengths, self.mz, self.intensity]
+
+        rows = np.array([self.index[j] for j in keys], dtype=int)
+        lengths = self.lengths[rows]
+        pos = np.repeat(self.start[rows], lengths) + (np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+        return [keys, lengths, self.mz[pos], self.intensity[pos]]
+
+    def save(self, path):
+        # write into a temporary folder first, so readers never see half a library
+        tmp = path + '.%i.tmp' % os.getpid()
+        if not os.path.isdir(tmp):
+            os.makedirs(tmp)
+
+        fmlas = list(self.forms)
+        where = dict((f, q) for q, f in enumerate(fmlas))
+        comps = [c for f in fmlas for c in self.forms[f]]
+
+        np.save(os.path.join(tmp, 'mz.npy'), np.asarray(self.mz, dtype=float))
+        np.save(os.path.join(tmp, 'intensity.npy'), np.asarray(self.intensity, dtype=float))
+        np.save(os.path.join(tmp, 'lengths.npy'), np.asarray(self.lengths, dtype=np.int32))
+        np.save(os.path.join(tmp, 'key_formula.npy'), np.array([where[j[0]] for j in self.keys], dtype=np.int32))
+        np.save(os.path.join(tmp, 'key_charge.npy'), np.array([j[1] for j in self.keys], dtype=np.int32))
+        np.save(os.path.join(tmp, 'formulae.npy'), np.array(fmlas, dtype=str))
+        np.save(os.path.join(tmp, 'compositions.npy'), np.array(comps, dtype=str))
+        np.save(os.path.join(tmp, 'comp_start.npy'), np.cumsum([0] + [len(self.forms[f]) for f in fmlas]).astype(np.int32))
+
+        try:
+            os.rename(tmp, path)
+        except OSError: # another process saved the same library first
+            for name in os.listdir(tmp):
+                os.remove(os.path.join(tmp, name))
+            os.rmdir(tmp)
+
+    @classmethod
+    def load(cls, path):
+        arrays = {}
+        for name in ['mz', 'intensity', 'lengths', 'key_formula', 'key_charge', 'formulae', 'compositions', 'comp_start']:
+            arrays[name] = np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+
+        fmlas = arrays['formulae'].tolist()
+        comps = arrays['compositions'].tolist()
+        cstart = arrays['comp_start'].tolist()
+        forms = dict((f, comps[cstart[q]:cstart[q+1]]) for q, f in enumerate(fmlas))
+        keys = [(fmlas[f], z) for f, z in zip(arrays['key_formula'].tolist(), arrays['key_charge'].tolist())]
+
+        return cls(keys, np.asarray(arrays['lengths'], dtype=int), arrays['mz'], arrays['intensity'], forms)
+
 def binsearch(array, x, hint=None):
     n = len(array)
     lo = 0
@@ -703,115 +602,526 @@ try:
 except ImportError:
 	has_c = False
 
+# function for getting means of values[lo:hi+1] from prefix sums, with a bound on how far they can be from ndarray.mean()
+def window_means(values, lo, hi):
+	csum = np.concatenate(([0.], np.cumsum(values)))
+	cabs = np.concatenate(([0.], np.cumsum(np.abs(values))))
+	n    = (hi - lo + 1).astype(float)
+	mean = (csum[hi + 1] - csum[lo]) / n
+	err  = 4 * np.finfo(float).eps * (len(values) + 2) * cabs[-1] / n
+	
+	# return
+	return [mean, err]
+
+# function for the truncated mean of a region's quietest window, the first one on ties, like NoiseRegion.noise_window;
+# r_lo and r_hi are the region's window boundaries in vals, and r_ok tells which windows hold data
+def region_noise(vals, r_lo, r_hi, r_ok, empty):
+	means = np.zeros(len(r_ok))
+	errs  = np.zeros(len(r_ok))
+	if r_ok.any():
+		means[r_ok], errs[r_ok] = window_means(vals, r_lo[r_ok], r_hi[r_ok])
+	
+	# only windows whose prefix-sum mean could be the smallest need an exact mean
+	cand = np.nonzero(means - errs <= (means + errs).min())[0]
+	best = None
+	for w in cand:
+		m = vals[r_lo[w]:r_hi[w] + 1].mean() if r_ok[w] else 0.0
+		if best is None or m < best[0]:
+			best = (m, w)
+	
+	w = best[1]
+	if not r_ok[w]:
+		return empty
+	
+	# return
+	return Window(None, vals[r_lo[w]:r_hi[w] + 1]).truncated_mean()
+
+# function for taking a noise level off every window of a region, so that points shared by k windows come off k times;
+# layers[k-1] holds the points that at least k windows hold
+def region_deduct(vals, layers, value):
+	for sel in layers:
+		tmp = vals[sel] - value
+		tmp.clip(min=0, out=tmp)
+		vals[sel] = tmp
+
+# function for removing the baseline exactly like the pure Python FTICRScan.denoise, with windows and regions in NumPy
+def denoise_arrays(mz_array, intensity_array, window_size=1., region_width=10, scale=5, maxiter=10):
+	mz_array = np.array(mz_array, dtype=float)
+	work     = np.array(intensity_array, dtype=float) # deducted in place, like the windows' shared views
+	if len(mz_array) == 0:
+		return [np.array([]), np.array([])]
+	
+	# window centres, added up one window at a time like windowed_spectrum does
+	mz_min    = mz_array.min()
+	mz_max    = mz_array.max()
+	step_size = window_size / 2.
+	n_win     = int((mz_max - mz_min) / window_size) + 3
+	centers   = np.cumsum(np.concatenate(([mz_min + step_size], np.repeat(window_size, n_win))))
+	while centers[-1] < mz_max:
+		centers = np.cumsum(np.concatenate((centers, np.repeat(window_size, n_win))))
+	
+	centers = centers[:np.argmax(centers >= mz_max)]
+	n_win   = len(centers)
+	
+	# all window boundaries with one searchsorted (binsearch gives the last index at or below the m/z)
+	lo_mz = centers - step_size
+	hi_mz = centers + step_size
+	bound = np.maximum(np.searchsorted(mz_array, np.concatenate((lo_mz, hi_mz)), side='right') - 1, 0)
+	lo    = bound[:n_win]
+	hi    = bound[n_win:]
+	
+	# windows whose mean m/z falls inside them hold data, the rest are empty placeholders
+	mean, err = window_means(mz_array, lo, hi)
+	real      = (lo_mz < mean) & (mean < hi_mz)
+	near      = (np.abs(mean - lo_mz) <= err) | (np.abs(mean - hi_mz) <= err)
+	for w in np.nonzero(near)[0]:
+		exact   = mz_array[lo[w]:hi[w] + 1].mean()
+		real[w] = lo_mz[w] < exact < hi_mz[w]
+	
+	# regions of region_width windows, centred every region_width windows
+	step    = int(region_width / 2)
+	r_start = np.arange(step, n_win, 2*step) - step
+	r_end   = np.minimum(r_start + 2*step, n_win)
+	if len(r_start) == 0:
+		return [np.array([]), np.array([])]
+	
+	# output layout: the data of every window of every region, with one point per placeholder
+	used  = np.arange(r_end[-1])
+	count = np.where(real[used], hi[used] - lo[used] + 1, 1)
+	first = np.cumsum(count) - count
+	owner = np.repeat(used, count)
+	gidx  = np.where(real[owner], lo[owner] + np.arange(count.sum()) - np.repeat(first, count), -1)
+	o_mz  = np.where(gidx >= 0, mz_array[gidx], centers[owner])
+	o_int = np.zeros(len(gidx))
+	o_cut = np.concatenate((first, [len(gidx)]))
+	
+	# noise level of an empty placeholder window
+	empty = Window(None, np.array([0.0])).truncated_mean()
+	
+	for r in range(len(r_start)):
+		wins  = slice(r_start[r], r_end[r])
+		r_ok  = real[wins]
+		if r_ok.any():
+			base = lo[wins][r_ok].min()
+			top  = hi[wins][r_ok].max() + 1
+		else:
+			base = top = 0
+		
+		vals = work[base:top] # view, like the windows' intensity arrays
+		r_lo = lo[wins] - base
+		r_hi = hi[wins] - base
+		
+		# how many of the region's windows hold each point, as the points held by at least 1, 2, ... windows
+		mult = np.zeros(top - base + 1, dtype=int)
+		np.add.at(mult, r_lo[r_ok], 1)
+		np.add.at(mult, r_hi[r_ok] + 1, -1)
+		mult   = np.cumsum(mult)[:-1]
+		layers = [np.nonzero(mult >= k)[0] for k in range(1, mult.max() + 1 if len(mult) else 1)]
+		
+		# same iterations as NoiseRegion.denoise
+		if scale != 0:
+			noise_mean = region_noise(vals, r_lo, r_hi, r_ok, empty) * scale
+			region_deduct(vals, layers, noise_mean)
+			last_mean  = noise_mean
+			noise_mean = region_noise(vals, r_lo, r_hi, r_ok, empty)
+			niter      = 1
+			while abs(last_mean - noise_mean) > 1e-3 and niter < maxiter:
+				niter += 1
+				noise_mean = region_noise(vals, r_lo, r_hi, r_ok, empty) * scale
+				region_deduct(vals, layers, noise_mean)
+				last_mean  = noise_mean
+		
+		# take the region's output before later regions change the points it shares with them
+		seg = slice(o_cut[r_start[r]], o_cut[r_end[r]])
+		o_int[seg] = np.where(gidx[seg] >= 0, work[gidx[seg]], 0.0)
+	
+	# return
+	return [o_mz, o_int]
+
 def denoise(mz_array, intensity_array, window_size=1., region_width=10, scale=5):
+    # without the C extension, the NumPy version gives the same arrays as the pure Python one, much faster
+    if not has_c:
+        return denoise_arrays(mz_array, intensity_array, window_size, region_width, scale)
+
     scan = FTICRScan(mz_array, intensity_array)
     denoised = scan.denoise(window_size, region_width, scale)
     return list(denoised)
 
-# function for converting dictionary to chemical formula or composition
-def dict2fmla (dt, type):
-	fs = '' # formula string
-	
-	# check whether chemical formula or composition
-	if type == 'formula':
-		symbols = elems
-	elif type == 'composition':
-		symbols = ['D', 'U', 'X', 'N', 'A', 'S']
-	else:
-		print "Incorrect type entered. Please enter either 'formula' or 'composition'."
-		sys.exit()
+# summed spectrum, with the parts of a pymzml Spectrum that GAGfinder uses
+class SummedSpectrum(object):
+
+    def __init__(self, peaks, measuredPrecision):
+        self.measuredPrecision = measuredPrecision
+        self.internalPrecision = int(round(50000.0 / (measuredPrecision * 1e6)))
+        self.peaks = peaks
+
+    @property
+    def peaks(self):
+        return self._peaks
+
+    @peaks.setter
+    def peaks(self, peaks):
+        self._peaks = peaks
+        self._transformed = None
+        self.mz = [p[0] for p in peaks]
+        self.i = [p[1] for p in peaks]
+
+    @property
+    def centroidedPeaks(self):
+        return self._peaks
+
+    def hasPeak(self, mz2find):
+        # same windows as pymzml: every peak within the measured precision, in internal precision units
+        if self._transformed is None:
+            self._transformed = {}
+            for mz, i in self._peaks:
+                for t in range(int(round((mz - (mz * self.measuredPrecision)) * self.internalPrecision)),
+                               int(round((mz + (mz * self.measuredPrecision)) * self.internalPrecision)) + 1):
+                    self._transformed.setdefault(t, []).append((mz, i))
+        return self._transformed.get(int(round(mz2find * self.internalPrecision)), [])
+
+# function for checking if a scan holds profile data, the way pymzml decides it
+def is_profile(scan):
+	for k in scan.keys():
+		if isinstance(k, str) and 'profile' in k:
+			return True
+	
+	return False
+
+# function for Gauss fitting one local maximum, exactly as pymzml does (including its widening for equal flanks)
+def fit_peak(mz_array, intensity_array, pos):
+	x1 = float(mz_array[pos - 1])
+	y1 = float(intensity_array[pos - 1])
+	x2 = float(mz_array[pos])
+	y2 = float(intensity_array[pos])
+	x3 = float(mz_array[pos + 1])
+	y3 = float(intensity_array[pos + 1])
+	
+	if y3 == y1:
+		before = 3
+		after  = 4
+		while y1 == y3 and after < 10:
+			lower_pos = max(pos - before, 0)
+			upper_pos = min(pos + after, len(mz_array) - 1)
+			x1 = float(mz_array[lower_pos])
+			y1 = float(intensity_array[lower_pos])
+			x3 = float(mz_array[upper_pos])
+			y3 = float(intensity_array[upper_pos])
+			if before % 2 == 0:
+				after += 1
+			else:
+				before += 1
+	
+	try:
+		doubleLog = math.log(y2 / y1) / math.log(y3 / y1)
+		mue       = (doubleLog * (x1 * x1 - x3 * x3) - x1 * x1 + x2 * x2) / (2 * (x2 - x1) - 2 * doubleLog * (x3 - x1))
+		cSquarred = (x2*x2 - x1*x1 - 2*x2*mue + 2*x1*mue) / (2 * math.log(y1/y2))
+		A         = y1 * math.exp((x1 - mue) * (x1 - mue) / (2 * cSquarred))
+	except:
+		return None
+	
+	return (mue, A)
+
+# function for centroiding profile data with a Gauss fit through each local maximum, as pymzml does
+def centroid_peaks(mz_array, intensity_array):
+	mz_array        = np.asarray(mz_array, dtype=float)
+	intensity_array = np.asarray(intensity_array, dtype=float)
+	
+	# local maxima with positive neighbours and no big jump in m/z spacing
+	pos = np.arange(2, len(mz_array) - 1)
+	x1, x2, x3 = mz_array[pos - 1], mz_array[pos], mz_array[pos + 1]
+	y1, y2, y3 = intensity_array[pos - 1], intensity_array[pos], intensity_array[pos + 1]
+	keep  = (0 < y1) & (y1 < y2) & (y2 > y3) & (y3 > 0)
+	keep &= ~((x2 - x1 > (x3 - x2) * 10) | ((x2 - x1) * 10 < x3 - x2))
+	
+	pos = pos[keep]
+	x1, x2, x3, y1, y2, y3 = [v[keep] for v in [x1, x2, x3, y1, y2, y3]]
+	
+	# Gauss fit of all maxima at once
+	with np.errstate(all='ignore'):
+		l21 = np.log(y2 / y1)
+		l31 = np.log(y3 / y1)
+		l12 = 2 * np.log(y1 / y2)
+		dl  = l21 / l31
+		den = 2 * (x2 - x1) - 2 * dl * (x3 - x1)
+		mue = (dl * (x1 * x1 - x3 * x3) - x1 * x1 + x2 * x2) / den
+		csq = (x2*x2 - x1*x1 - 2*x2*mue + 2*x1*mue) / l12
+		ex  = (x1 - mue) * (x1 - mue) / (2 * csq)
+		gs  = np.exp(ex)
+		A   = y1 * gs
+	
+	# maxima where Python would widen the fit or raise are fitted one at a time
+	odd = (y3 == y1) | (l31 == 0) | (den == 0) | (l12 == 0) | (csq == 0)
+	for v in [dl, mue, csq, ex, gs]:
+		odd |= ~np.isfinite(v)
+	
+	peaks = zip(mue.tolist(), A.tolist())
+	for q in np.nonzero(odd)[0]:
+		peaks[q] = fit_peak(mz_array, intensity_array, pos[q])
 	
-	for sym in symbols:
-		if sym in dt:
-			if dt[sym] > 0:
-				if dt[sym] > 1:
-					fs += sym + str(dt[sym])
-				else:
-					fs += sym
+	# return
+	return [p for p in peaks if p is not None]
+
+# function for spreading centroided peaks onto pymzml's Gauss grid, as (grid point, intensity) arrays in peak order
+def reprofile_peaks(mz_array, intensity_array, precision, internal):
+	# let the measured precision be 2 sigma of the signal width, and go out to 5 sigma on each side
+	s  = mz_array * precision * 2
+	s2 = s * s
+	ip = internal // 4
+	lo = pyround((mz_array - 5.0 * s) * ip).astype(int)
+	hi = pyround((mz_array + 5.0 * s) * ip).astype(int)
+	
+	# every fifth internal precision step in the window
+	lo    = lo + (-lo % 5)
+	n     = np.maximum((hi - lo) // 5 + 1, 0)
+	owner = np.repeat(np.arange(len(mz_array)), n)
+	k     = np.repeat(lo, n) + 5 * (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n))
+	
+	a = k.astype(float) / float(ip)
+	d = mz_array[owner] - a
+	y = intensity_array[owner] * np.exp(-1 * (d * d) / (2 * s2[owner]))
 	
 	# return
-	return fs
-
-# function for converting chemical formula or composition to dictionary
-def fmla2dict (fm, type):
-	# check whether chemical formula or composition
-	if type == 'formula':
-		symbols = elems
-		dt = {'C':0, 'H':0, 'O':0, 'N':0, 'S':0} #, 'Na':0, 'K':0, 'Li':0, 'Mg':0, 'Ca':0}
-	elif type == 'composition':
-		symbols = ['D', 'U', 'X', 'N', 'A', 'S']
-		dt = {'D':0, 'U':0, 'X':0, 'N':0, 'A':0, 'S':0}
-	else:
-		print "Incorrect type entered. Please enter either 'formula' or 'composition'."
-		sys.exit()
+	return [k // 5, y]
+
+# running sum of scans on pymzml's Gauss grid
+class ScanSum(object):
+
+    def __init__(self):
+        self.acc = np.zeros(0)
+        self.seen = np.zeros(0, dtype=bool)
+        self.count = 0
+        self.ip = None
+
+    def add(self, g, y, ip):
+        self.count += 1
+        self.ip = ip
+        if len(g) == 0:
+            return
+
+        # grow geometrically if the scan reaches past the end
+        lo = g.min()
+        hi = g.max() + 1
+        if hi > len(self.acc):
+            size = max(hi, 2*len(self.acc))
+            self.acc = np.concatenate((self.acc, np.zeros(size - len(self.acc))))
+            self.seen = np.concatenate((self.seen, np.zeros(size - len(self.seen), dtype=bool)))
+
+        self.acc[lo:hi] += np.bincount(g - lo, weights=y)
+        self.seen[g] = True
+
+    def peaks(self, n_scans):
+        # centroid the sum and scale it by the number of scans
+        if self.ip is None:
+            return []
+
+        pts = np.nonzero(self.seen)[0]
+        peaks = centroid_peaks((5 * pts).astype(float) / float(self.ip // 4), self.acc[pts])
+        return [(mz, i/n_scans) for mz, i in peaks]
+
+# which scans go into a sum: precursor isolation window, retention time range and precursor charge
+class ScanFilter(object):
+
+    def __init__(self, mz=None, width=None, rt=None, charge=None):
+        self.mz = mz
+        self.width = width
+        self.rt = rt
+        self.charge = charge
+
+    def key(self):
+        return (self.mz, self.width, self.rt, self.charge)
+
+    def matches(self, info):
+        target, lower, upper, rt, charge = info
+
+        # the precursor m/z has to be inside the scan's isolation window, widened by width on each side
+        if self.width is not None:
+            if target is None or not (target - lower - self.width <= self.mz <= target + upper + self.width):
+                return False
+
+        if self.rt is not None:
+            if rt is None or not (self.rt[0] <= rt <= self.rt[1]):
+                return False
+
+        # scans that do not report a charge are kept
+        if self.charge is not None and charge:
+            if abs(charge) != abs(self.charge):
+                return False
+
+        return True
+
+# function for opening an mzML file, with the isolation window read for scan filters
+def open_mzml(mzml_path):
+	return pymzml.run.Reader(mzml_path, MSn_Precision=5e-6, extraAccessions=[('MS:1000827', ['value']), # isolation window target m/z
+	                                                                          ('MS:1000828', ['value']), # isolation window lower offset
+	                                                                          ('MS:1000829', ['value'])]) # isolation window upper offset
+
+# function for getting the precursor information of a scan that scan filters look at
+def scan_info(scan):
+	precursors = scan.get('precursors') or [{}]
 	
-	parts = re.findall(r'([A-Z][a-z]*)(\d*)', fm.upper()) # split formula by symbol
-	for q in parts:
-		if q[0] not in dt: # invalid symbol entered
-			if q[0] not in symbols:
-				print "Invalid chemical formula entered."
-				sys.exit()
-			else:
-				dt[q[0]] = 0
-		
-		if q[1] == '': # only one of this atom
-			dt[q[0]] += 1
-		else:
-			dt[q[0]] += int(q[1])
+	# isolation window, or just the selected ion if the file has no window
+	target = scan.get('isolation window target m/z')
+	if target is None:
+		target = precursors[0].get('mz')
+	
+	lower  = scan.get('isolation window lower offset') or 0.0
+	upper  = scan.get('isolation window upper offset') or 0.0
+	rt     = scan.get('scan start time')
+	charge = scan.get('charge state') or precursors[0].get('charge')
 	
 	# return
-	return dt
+	return (target, lower, upper, rt, charge)
+
+# function for getting the key a summed spectrum is cached under
+def spectrum_key(mzml_path, precision, noise_gone, scan_filter=None):
+	if scan_filter is None:
+		return (mzml_path, precision, noise_gone, None)
+	
+	return (mzml_path, precision, noise_gone, scan_filter.key())
 
-# function for summing the scans
-def sum_scans(data, spec, noise_removed):
+# function for summing the scans, into one spectrum per scan filter if there are any
+def sum_scans(data, precision, noise_removed, filters=None):
 	counter = 0.0 # count the number of scans in the data file
 	
+	# a None filter sums every MS2 scan and scales by the number of scans in the file, like before there were filters
+	single = filters is None
+	if single:
+		filters = [None]
+	
+	sums  = [ScanSum() for f in filters]
+	check = [f is not None for f in filters]
+	
 	for t in data:
 		counter += 1
 		
-		if t['ms level'] == 2:
-			spec += t/sum(t.i)
-	
-	spec = spec/counter
-	
-	# noise not already removed by the user, we need to remove, using MasSPIKE
-	if not noise_removed:
-		backup  = spec.copy() # create a copy of the current metadata
-		cleaned = denoise(np.array(spec.mz), 1.e6*np.array(spec.i), 1.) # remove the baseline, after boosting signal
-		spec.clear() # remove all metadata and state
-		cleaned[1] = cleaned[1]/1.e6 # take signal back to where it was
+		if t['ms level'] != 2:
+			continue
+		
+		# sums this scan goes into
+		if any(check):
+			info = scan_info(t)
+			hit  = [sums[q] for q, f in enumerate(filters) if f is None or f.matches(info)]
+		else:
+			hit = sums
+		
+		if not hit or len(t.i) == 0:
+			continue
 		
-		# set the signal and peak information
-		spec.mz, spec.i = map(list, cleaned)
-		spec._peaks = list(zip(*map(list, cleaned)))
+		# scale the scan by its total intensity
+		mz_array        = np.array(t.mz, dtype=float)
+		intensity_array = np.array(t.i, dtype=float) / float(sum(t.i))
 		
-		spec.update(backup) # copy back the metadata
+		# centroid profile scans first
+		if is_profile(t):
+			peaks = centroid_peaks(mz_array, intensity_array)
+			mz_array        = np.array([p[0] for p in peaks], dtype=float)
+			intensity_array = np.array([p[1] for p in peaks], dtype=float)
+		
+		# add the scan to each sum, in the order pymzml adds it
+		g, y = reprofile_peaks(mz_array, intensity_array, t.measuredPrecision, t.internalPrecision)
+		for total in hit:
+			total.add(g, y, t.internalPrecision)
+	
+	specs = []
+	for f, total in zip(filters, sums):
+		if f is None:
+			spec = SummedSpectrum(total.peaks(counter), precision)
+		else:
+			spec = SummedSpectrum(total.peaks(float(total.count)), precision)
+		
+		# noise not already removed by the user, we need to remove, using MasSPIKE
+		if not noise_removed and spec.mz:
+			cleaned = denoise(np.array(spec.mz), 1.e6*np.array(spec.i), 1.) # remove the baseline, after boosting signal
+			cleaned[1] = cleaned[1]/1.e6 # take signal back to where it was
+			
+			# set the signal and peak information
+			spec.peaks = list(zip(*map(list, cleaned)))
+		
+		specs.append(spec)
+	
+	# return
+	if single:
+		return specs[0]
+	
+	return specs
+
+# function for copying GAGfragDB into a read-only, in-memory database
+def memory_db(db_path):
+	if not os.path.isfile(db_path):
+		print "Could not find " + db_path + " to load into memory."
+		sys.exit()
+	
+	conn = sq.connect(':memory:')
+	conn.execute('ATTACH DATABASE ? AS disk;', (db_path,))
+	
+	# copy the tables, then build their indexes once they are full
+	schema = conn.execute('''SELECT   type, name, sql
+	                           FROM     disk.sqlite_master
+	                           WHERE    sql IS NOT NULL
+	                           AND      name NOT LIKE 'sqlite_%'
+	                           ORDER BY type = 'index';''').fetchall()
+	for type, name, sql in schema:
+		conn.execute(sql)
+		if type == 'table':
+			conn.execute('INSERT INTO main.' + name + ' SELECT * FROM disk.' + name + ';')
+	
+	# keep the build stamp, so that compiled fragment libraries still match
+	conn.execute('PRAGMA main.user_version = %i;' % (conn.execute('PRAGMA disk.user_version;').fetchone()[0]))
+	
+	conn.commit()
+	conn.execute('DETACH DATABASE disk;')
+	conn.execute('PRAGMA query_only = ON;')
+	
+	# return
+	return conn
+
+# function for getting the bytes a database takes and the rows in each of its tables
+def db_footprint(conn):
+	size   = conn.execute('PRAGMA page_count;').fetchone()[0] * conn.execute('PRAGMA page_size;').fetchone()[0]
+	tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%';")]
+	rows   = dict((t, conn.execute('SELECT COUNT(*) FROM ' + t + ';').fetchone()[0]) for t in tables)
 	
-	return spec # return
+	# return
+	return [size, rows]
+
+# function for reporting how much memory an in-memory GAGfragDB takes, once for each of copies processes
+def print_footprint(conn, copies=1):
+	size, rows = db_footprint(conn)
+	counts     = ', '.join('%s: %i rows' % (t, rows[t]) for t in sorted(rows))
+	if copies > 1:
+		print "GAGfragDB takes %.1f MB in memory in each of %i processes, %.1f MB in all (%s)" % (size / 1048576., copies, copies * size / 1048576., counts)
+	else:
+		print "GAGfragDB takes %.1f MB in memory (%s)" % (size / 1048576., counts)
 
 # function for getting information about the precursor
-def get_precursor(charge, mz, cursor, deriv_wt, weights, gag_class, adct=None, n_adct=None):
+def get_precursor(charge, mz, cursor, deriv_wt, weights, gag_class, adct=None, n_adct=None, precursors=None):
+	return get_precursors([(mz, charge, adct, n_adct)], cursor, deriv_wt, weights, gag_class, precursors)[0]
+
+# function for getting the neutral mass to look up in the database for a precursor m/z
+def precursor_mass(charge, mz, deriv_wt, weights, adct=None, n_adct=None):
 	mass = (mz*abs(charge)) - (charge*weights['H'])
 	
 	# get proper precursor mass to test
 	if not adct:
-		n_adct    = 0
 		test_mass = mass - deriv_wt
 	else:
 		test_mass = mass - deriv_wt - (n_adct*weights[adct]) + (n_adct*weights['H'])
 	
-	# get precursor info from database
-	cursor.execute('''SELECT   cpm.id, f.value, p.value, f.monoMass
-   	       	 		  FROM     Precursors p, ClassPrecursorMap cpm, Formulae f
-	 	       	      WHERE    p.id = cpm.pId 
-    	       		  AND      f.id = p.fmId
-        	     	  AND      cpm.cId = ?
-   	        	 	  ORDER BY ABS(f.monoMass - ?) ASC
-	       	     	  LIMIT 1;''', (gag_class, test_mass))
-	row = cursor.fetchone()
+	# return
+	return test_mass
+
+# function for finding the precursor compositions of many (m/z, charge, adduct, # adducts) tuples at once
+def get_precursors(queries, cursor, deriv_wt, weights, gag_class, precursors=None):
+	if precursors is None:
+		precursors = PrecursorIndex(cursor)
+	
+	# get precursor info from the in-memory index
+	masses = [precursor_mass(chg, mz, deriv_wt, weights, adct, n_adct) for mz, chg, adct, n_adct in queries]
+	rows   = precursors.nearest(gag_class, masses)
 	
 	# return
-	return row
+	return rows
 
 # function for getting the reducing and non-reducing end info
 def get_ends(pd, gag_class):
@@ -850,12 +1160,89 @@ def get_ends(pd, gag_class):
 	# return
 	return [nonred, redend, n]
 
+# function for getting the stamp buildDB.py leaves on a GAGfragDB it builds; databases built
+# before it did so are told apart by the last row of each table instead
+def db_stamp(cursor):
+	stamp = cursor.execute('PRAGMA user_version;').fetchone()[0]
+	if stamp:
+		return stamp
+	
+	cursor.execute('''SELECT (SELECT MAX(rowid) FROM ChildFragments), (SELECT MAX(rowid) FROM Fragments),
+	                         (SELECT MAX(rowid) FROM Formulae), (SELECT MAX(rowid) FROM Precursors);''')
+	
+	# return
+	return cursor.fetchone()
+
+# function for getting the truncated neutral isotopic distribution of a formula
+def get_envelope(fmla, fdict, isotopes=None):
+	if isotopes is None:
+		return TheoreticalIsotopicPattern(iv(fdict)).truncate_after(0.95)
+	
+	return isotopes.get(fmla, fdict)
+
+# function for getting the formula symbols of some dictionaries, in the order dict2fmla writes them
+def fmla_columns(keys):
+	keys = set(keys)
+	
+	# return
+	return [sym for sym in ELEMENTS if sym in keys]
+
+# function for converting a formula dictionary to an integer vector over the given symbols
+def dict2vec(dt, syms):
+	return np.array([dt.get(sym, 0) for sym in syms], dtype=int)
+
+# function for converting an integer vector back to a formula dictionary, keeping the keys of the original dictionary
+def vec2dict(vec, dt, syms):
+	th = dict(dt)
+	for sym, n in zip(syms, vec.tolist()):
+		th[sym] = n
+	
+	# return
+	return th
+
+# function for converting integer vectors to formula strings, the same as dict2fmla, writing each distinct formula once
+def vec2fmla(vecs, syms):
+	if len(vecs) == 0:
+		return []
+	
+	# formula strings only depend on the positive counts
+	uniq, inv = np.unique(np.maximum(vecs, 0), axis=0, return_inverse=True)
+	
+	strs = []
+	for vec in uniq.tolist():
+		fs = ''
+		for sym, n in zip(syms, vec):
+			if n > 1:
+				fs += sym + str(n)
+			elif n == 1:
+				fs += sym
+		
+		strs.append(fs)
+	
+	# return
+	return [strs[q] for q in inv.ravel()]
+
+# function for applying every combination of modifications to a formula vector at once, in nested loop order
+def modification_grid(base, mods):
+	total = base.reshape((1,)*len(mods) + (-1,))
+	for ax, (delta, values) in enumerate(mods):
+		shape  = [1]*len(mods) + [1]
+		shape[ax] = len(values)
+		total  = total + np.array(values, dtype=int).reshape(shape) * delta
+	
+	# return
+	return total.reshape(-1, len(base))
+
+# function for labelling a number of losses, e.g. '', '-CO2', '-2CO2'
+def loss_labels(n, unit):
+	return [''] + ['-' + (str(q) if q > 1 else '') + unit for q in range(1, n)]
+
 # function for retrieving all fragment ions
-def get_frags(pf, pd, sl, reag, d_dict, d_wt, chrg, n_mono, cursor, cpid, crossmods, redend, adct=None, n_adct=None):
+def get_frags(pf, pd, sl, reag, d_dict, d_wt, chrg, n_mono, cursor, cpid, crossmods, redend, gag_class, adct=None, n_adct=None, isotopes=None):
 	# variables to store fragment info
 	IDs   = {}
 	forms = {}
-	comps = []
+	comps = set() # compositions already searched, by integer counts and alterations
 	
 	## first look through precursor-based fragments
 	ffDict = fmla2dict(pf, 'formula')
@@ -865,85 +1252,43 @@ def get_frags(pf, pd, sl, reag, d_dict, d_wt, chrg, n_mono, cursor, cpid, crossm
 		ffDict[adct] = n_adct
 		ffDict['H'] -= n_adct
 	
-	# ready to test fragments
-	for i in range(2): # determine how much water to lose
-		for j in range(2): # determine whether reducing end fragment or not
-			for k in range(3): # cycle through potential hydrogen losses
-				for l in range(pd['U'] + pd['D'] + 1): # cycle through potential CO2 losses
-					for m in range(min(sl, ffDict['S'])+1): # cycle through potential SO3 losses
-						for a in range(2): # cycle through reagent possibilities
-							thDict = dict(ffDict) # copy directory of fragment
-							
-							# add reagent
-							for q in reag:
-								thDict[q] += a*reag[q]
-							
-							# H2O loss
-							thDict['H'] -= 2*i
-							thDict['O'] -= i
-							
-							# reducing end
-							for q in d_dict:
-								thDict[q] += j*d_dict[q]
-							
-							# hydrogen loss
-							thDict['H'] -= k
-							
-							# CO2 loss
-							thDict['C'] -= l
-							thDict['O'] -= 2*l
-							
-							# SO3 loss
-							thDict['S'] -= m
-							thDict['O'] -= 3*m
-							
-							# turn new formula dict into string
-							thFmla = dict2fmla(thDict, 'formula')
-							
-							# append alterations onto fComp
-							thComp = 'M'
-							
-							# add RE info
-							if j == 0:
-								thComp += '-RE'
-							
-							# add water loss info
-							if i == 1:
-								thComp += '-H2O'
-							elif i == 2:
-								thComp += '-2H2O'
-							
-							# add hydrogen loss info
-							if k == 1:
-								thComp += '-H'
-							elif k == 2:
-								thComp += '-2H'
-							
-							# add CO2 loss info
-							if l == 1:
-								thComp += '-CO2'
-							elif l > 1:
-								thComp += '-' + str(l) + 'CO2'
-							
-							# add SO3 loss info
-							if m == 1:
-								thComp += '-SO3'
-							elif m > 1:
-								thComp += '-' + str(m) + 'SO3'
-							
-							# add reagent info
-							if a == 1:
-								thComp += '+A'
-							
-							# check if this formula already exists
-							if thFmla not in forms:
-								for z in range((chrg+1), 0):
-									dist             = TheoreticalIsotopicPattern(iv(thDict, charge=z)).truncate_after(0.95)
-									IDs[(thFmla, z)] = dist
-								
-								forms[thFmla] = [thComp]
-							else:
-								forms[thFmla].append(thComp)
+	# formula changes of each modification
+	syms = fmla_columns(list(ffDict) + list(reag) + list(d_dict))
+	base = dict2vec(ffDict, syms)
+	h2o  = dict2vec({'H':-2, 'O':-1}, syms)
+	re_d = dict2vec(d_dict, syms)
+	h    = dict2vec({'H':-1}, syms)
+	co2  = dict2vec({'C':-1, 'O':-2}, syms)
+	so3  = dict2vec({'S':-1, 'O':-3}, syms)
+	rg   = dict2vec(reag, syms)
+	
+	n_co2 = pd['U'] + pd['D'] + 1 # potential CO2 losses
+	n_so3 = min(sl, ffDict['S']) + 1 # potential SO3 losses
+	
+	# ready to test fragments: water, reducing end, hydrogen, CO2, SO3 and reagent, in that order
+	grid = modification_grid(base, [(h2o, range(2)), (re_d, range(2)), (h, range(3)), (co2, range(n_co2)), (so3, range(n_so3)), (rg, range(2))])
+	
+	# alterations, appended onto 'M' as RE, water, hydrogen, CO2, SO3 and reagent
+	labels = ['M' + r + w + hl + c + so + a for w in ['', '-H2O']
+	                                        for r in ['-RE', '']
+	                                        for hl in loss_labels(3, 'H')
+	                                        for c in loss_labels(n_co2, 'CO2')
+	                                        for so in loss_labels(n_so3, 'SO3')
+	                                        for a in ['', '+A']]
+	
+	fmlas = vec2fmla(grid, syms)
+	for n in range(len(grid)):
+		thFmla = fmlas[n]
+		
+		# check if this formula already exists
+		if thFmla not in forms:
+			env = get_envelope(thFmla, vec2dict(grid[n], ffDict, syms), isotopes)
+			for z in range((chrg+1), 0):
+				IDs[(thFmla, z)] = env.at_charge(z)
+			
+			forms[thFmla] = [labels[n]]
+		else:
+			forms[thFmla].append(labels[n])
 	
 	## get all child fragments
 	cursor.execute('''SELECT   fr.value, fm.value
@@ -1003,8 +1348,8 @@ def get_frags(pf, pd, sl, reag, d_dict, d_wt, chrg, n_mono, cursor, cpid, crossm
 			
 			# for adducted metals
 			if adct:
-				atleast += xmod[gClass][x_ms][x_end][x_clv]['COOH']
-				atmost  += xmod[gClass][x_ms][x_end][x_clv]['COOH']
+				atleast += crossmods[gag_class][x_ms][x_end][x_clv]['COOH']
+				atmost  += crossmods[gag_class][x_ms][x_end][x_clv]['COOH']
 		else:
 			xr = 0
 		
@@ -1038,203 +1383,317 @@ def get_frags(pf, pd, sl, reag, d_dict, d_wt, chrg, n_mono, cursor, cpid, crossm
 							reFrag = [0]
 		
 		## ready to test fragments
-		for i in range(2-xr): # determine how much water to lose
-			for j in reFrag: # determine whether reducing end fragment or not
-				for k in range(-2, 1): # cycle through potential hydrogen losses/gains
-					for m in range(max(0, atleast), (min(n_adct, atmost)+1)): # cycle through potential metal adduction
-						for so3 in range(min(sl, ffDict['S'])+1): # cycle through potential SO3 losses
-							thffDict = dict(ffDict) # copy directory of fragment formula
-							thfcDict = dict(fcDict) # copy directory of fragment composition
-							
-							# H2O loss
-							thffDict['H'] -= 2*i
-							thffDict['O'] -= i
-							
-							# reducing end
-							if j == 1:
-								for q in d_dict:
-									thffDict[q] += j*d_dict[q]
-							
-							# hydrogen loss/gain
-							thffDict['H'] += k
-							
-							# metal adduction
-							if adct is not None:
-								thffDict[adct] = m
-								thffDict['H'] -= m
-							
-							# sulfate loss
-							thffDict['S'] -= so3
-							thffDict['O'] -= 3*so3
-							
-							thfcDict['S'] -= so3
-							
-							# turn new formula dict into string
-							thffFmla = dict2fmla(thffDict, 'formula')
-							
-							# append alterations onto composition
-							thComp = dict2fmla(thfcDict, 'composition')
-							if xr_info != '':
-								thComp += '+' + xr_info
-							
-							# add RE info
-							if j == 1:
-								thComp += '+RE'
-							
-							# add water loss info
-							if i == 1:
-								thComp += '-H2O'
-							elif i == 2:
-								thComp += '-2H2O'
-							
-							# add hydrogen gain/loss info
-							if k < 0:
-								if k == -1:
-									thComp += '-H'
-								elif k == -2:
-									thComp += '-2H'
-							
-							# add metal adduction info
-							if m == 1:
-								thComp += '+' + adct
-							elif m > 1:
-								thComp += '+' + str(m) + adct
-							
-							# check to see if this one has already been searched
-							if thComp not in comps:
-								comps.append(thComp)
-							
-								# check if this formula already exists
-								if thffFmla not in forms:
-									for z in range((chrg+1), 0):
-										dist               = TheoreticalIsotopicPattern(iv(thffDict, charge=z)).truncate_after(0.95)
-										IDs[(thffFmla, z)] = dist
-									
-									forms[thffFmla] = [thComp]
-								else:
-									forms[thffFmla].append(thComp)
+		syms = fmla_columns(list(ffDict) + list(d_dict) + ([adct] if adct is not None else []))
+		base = dict2vec(ffDict, syms)
+		h2o  = dict2vec({'H':-2, 'O':-1}, syms)
+		re_d = dict2vec(d_dict, syms)
+		h    = dict2vec({'H':1}, syms)
+		so3  = dict2vec({'S':-1, 'O':-3}, syms)
+		
+		# metal adduction sets the metal count, replacing hydrogens
+		if adct is not None:
+			base[syms.index(adct)] = 0
+			metal = dict2vec({adct:1, 'H':-1}, syms)
+		else:
+			metal = np.zeros(len(syms), dtype=int)
+		
+		n_h2o   = 2 - xr
+		metals  = range(max(0, atleast), (min(n_adct, atmost)+1))
+		n_so3   = min(sl, ffDict['S']) + 1
+		
+		# water, reducing end, hydrogen, metal and SO3, in that order
+		grid = modification_grid(base, [(h2o, range(n_h2o)), (re_d, reFrag), (h, range(-2, 1)), (metal, metals), (so3, range(n_so3))])
+		
+		# composition after each SO3 loss, as integer counts and as a string
+		fc_key  = []
+		fc_comp = []
+		for so in range(n_so3):
+			thfcDict = dict(fcDict)
+			thfcDict['S'] -= so
+			fc_key.append((tuple(thfcDict.get(q, 0) for q in ['D', 'U', 'X', 'N', 'A', 'S']), xr_info))
+			fc_comp.append(dict2fmla(thfcDict, 'composition') + ('+' + xr_info if xr_info != '' else ''))
+		
+		# every alteration as (composition, water, RE, hydrogen, metal), in the same order as the formula grid
+		alts = [(so, i, j, k, m) for i in range(n_h2o)
+		                         for j in reFrag
+		                         for k in range(-2, 1)
+		                         for m in metals
+		                         for so in range(n_so3)]
+		
+		# check to see which ones have already been searched
+		new    = []
+		labels = {}
+		for n, (so, i, j, k, m) in enumerate(alts):
+			key = (fc_key[so], i, j, k, m)
+			if key not in comps:
+				comps.add(key)
+				new.append(n)
+				
+				# append alterations onto composition: RE, water, hydrogen and metal
+				labels[n] = fc_comp[so] + ['', '+RE'][j] + ['', '-H2O'][i] + ['-2H', '-H', ''][k+2] + (('+' + (str(m) if m > 1 else '') + adct) if m > 0 else '')
+		
+		fmlas = vec2fmla(grid[new], syms)
+		for n, thffFmla in zip(new, fmlas):
+			# check if this formula already exists
+			if thffFmla not in forms:
+				env = get_envelope(thffFmla, vec2dict(grid[n], ffDict, syms), isotopes)
+				for z in range((chrg+1), 0):
+					IDs[(thffFmla, z)] = env.at_charge(z)
+				
+				forms[thffFmla] = [labels[n]]
+			else:
+				forms[thffFmla].append(labels[n])
 	
 	# return
 	return [IDs, forms]
 
+# function for rounding the way pymzml does (half away from zero, for positive values)
+def pyround(x):
+	fl = np.floor(x)
+	return fl + ((x - fl) >= 0.5)
+
+# function for building a searchable peak table from a spectrum
+def index_spectrum(spec):
+	peaks = spec.centroidedPeaks # the peaks that hasPeak searches
+	
+	# m/z range of the spectrum
+	first = spec.mz[0]
+	last  = spec.mz[len(spec.mz)-1]
+	
+	# peak arrays, sorted by m/z (stable, so equal m/z keep their list order)
+	p_mz  = np.array([p[0] for p in peaks], dtype=float)
+	p_int = np.array([p[1] for p in peaks], dtype=float)
+	order = np.argsort(p_mz, kind='mergesort')
+	p_mz  = p_mz[order]
+	p_int = p_int[order]
+	
+	# integer window of each peak, exactly as pymzml keys them for hasPeak
+	prec = spec.measuredPrecision
+	ip   = spec.internalPrecision
+	lo   = pyround((p_mz - (p_mz * prec)) * ip)
+	hi   = pyround((p_mz + (p_mz * prec)) * ip)
+	
+	# monotone bounds for searchsorted (the windows themselves are checked exactly later)
+	lo_bound = np.minimum.accumulate(lo[::-1])[::-1]
+	hi_bound = np.maximum.accumulate(hi)
+	
+	return {'peaks': peaks, 'first': first, 'last': last, 'ip': ip, 'mz': p_mz, 'int': p_int, 'lo': lo,
+	        'hi': hi, 'lo_bound': lo_bound, 'hi_bound': hi_bound, 'order': order}
+
+# function for flattening isotopic distributions into arrays
+def flatten_patterns(IDs, keys=None):
+	if isinstance(IDs, FragmentLibrary):
+		return IDs.flatten(keys)
+	
+	if keys is None:
+		keys = list(IDs)
+	
+	lengths = np.array([len(IDs[j]) for j in keys], dtype=int)
+	mz      = np.array([peak.mz for j in keys for peak in IDs[j]], dtype=float)
+	inten   = np.array([peak.intensity for j in keys for peak in IDs[j]], dtype=float)
+	
+	return [keys, lengths, mz, inten]
+
+# function for finding every spectrum peak that hasPeak would return for each query
+def match_peaks(sp, query):
+	t = pyround(query * sp['ip']) # transformed m/z values
+	
+	# candidate ranges in the sorted peak table, one searchsorted pass each
+	a = np.searchsorted(sp['hi_bound'], t, side='left')
+	b = np.searchsorted(sp['lo_bound'], t, side='right')
+	w = max(int((b - a).max()), 0) if len(t) > 0 else 0
+	
+	# gather the ranges into a (queries x w) matrix and keep the real matches
+	idx   = a[:,None] + np.arange(w)
+	valid = idx < b[:,None]
+	idx   = np.where(valid, idx, 0)
+	if len(sp['mz']) > 0:
+		valid &= (sp['lo'][idx] <= t[:,None]) & (t[:,None] <= sp['hi'][idx])
+	
+	return [idx, valid]
+
+# function for picking one match per query, breaking ties by the spectrum's peak order
+def pick_peaks(sp, idx, valid, cost):
+	cost = np.where(valid, cost, np.inf)
+	best = cost.min(axis=1) if cost.shape[1] > 0 else np.full(len(cost), np.inf)
+	
+	# first peak in list order among the best ones, like the loops over hasPeak did
+	tied  = valid & (cost == best[:,None])
+	rank  = np.where(tied, sp['order'][idx], np.iinfo(int).max)
+	col   = rank.argmin(axis=1) if rank.shape[1] > 0 else np.zeros(len(rank), dtype=int)
+	pick  = idx[np.arange(len(idx)), col] if idx.shape[1] > 0 else np.zeros(len(idx), dtype=int)
+	found = tied.any(axis=1)
+	
+	return [pick, found]
+
 # function for scoring fragments
-def score_frags(IDs, spec, error):
+def score_frags(IDs, spec, error, n_proc=1):
 	# dictionaries for storing info
 	found = {}
 	m_int = {}
 	m_mz  = {}
 	errs  = {}
 	
-	# cycle through all fragments
-	for j in IDs:
-		t = []
-		e = []
-		
-		kill = False # variable to determine whether to kill or not
-		
-		peak = IDs[j][0] # get first peak to determine precision
-		exp  = ((error / 1e6) * peak.mz) + peak.mz # get expected peak position based on precursor error
-		
-		if exp < spec.mz[0] or exp > spec.mz[len(spec.mz)-1]: # out of the m/z range
-			continue
-		else: # first peak is in m/z range
-			near = spec.hasPeak(exp)
-			
-			val  = 0
-			for k in near:
-				if k[1] > val:
-					loc = k[0]
-					val = k[1]
-			
-			if val == 0:
-				kill = True
-			else:
-				diff = exp - loc
-				ppm  = 1e6 * ((loc - exp)/exp)
-			
-			t.append(peak.intensity)
-			e.append(val)
+	# put the spectrum into arrays
+	sp   = index_spectrum(spec)
+	keys = list(IDs)
+	
+	if n_proc > 1 and len(keys) > n_proc:
+		# split the fragments into chunks for the workers, which all get the same spectrum
+		size   = -(-len(keys) // (4*n_proc))
+		chunks = [keys[q:q+size] for q in range(0, len(keys), size)]
+		pool   = mp.Pool(n_proc, init_scoring, (IDs, sp, error))
+		hits   = [h for part in pool.map(score_chunk, chunks) for h in part]
+		pool.close()
+		pool.join()
 		
-		if kill:
-			continue
+		# store results in the order a serial run stores them
+		pos     = dict((j, q) for q, j in enumerate(keys))
+		n_peaks = dict(zip(keys, flatten_patterns(IDs, keys)[1]))
+		hits.sort(key=lambda h: (n_peaks[h[0]], pos[h[0]]))
+	else:
+		hits = score_patterns(IDs, keys, sp, error)
+	
+	for j, g, i, mz, e in hits:
+		found[j] = g
+		m_int[j] = i
+		m_mz [j] = mz
+		errs[j]  = e
+	
+	return [found, m_int, m_mz, errs]
+
+# spectrum and fragments shared by the scoring workers (copy-on-write where processes fork)
+scoring = {}
+
+# function for handing the spectrum and fragments to a scoring worker
+def init_scoring(IDs, sp, error):
+	scoring['IDs']   = IDs
+	scoring['sp']    = sp
+	scoring['error'] = error
+
+# function for scoring one chunk of fragments in a worker
+def score_chunk(keys):
+	return score_patterns(scoring['IDs'], keys, scoring['sp'], scoring['error'])
+
+# function for scoring the given fragments against an indexed spectrum, as (fragment, G-score, intensity, m/z, error) tuples
+def score_patterns(IDs, keys, sp, error):
+	hits = []
+	
+	# put the theoretical peaks into arrays
+	keys, lengths, t_mz, t_int = flatten_patterns(IDs, keys)
+	start = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(int)
+	
+	# only distributions with at least two peaks can be tested
+	cand = np.nonzero(lengths > 1)[0]
+	
+	## first peak: most intense peak near the expected position
+	mz0  = t_mz[start[cand]]
+	exp0 = ((error / 1e6) * mz0) + mz0 # expected peak position based on precursor error
+	
+	keep  = (exp0 >= sp['first']) & (exp0 <= sp['last']) # in the m/z range
+	cand  = cand[keep]
+	exp0  = exp0[keep]
+	
+	idx, valid   = match_peaks(sp, exp0)
+	valid       &= sp['int'][idx] > 0
+	first, found0 = pick_peaks(sp, idx, valid, -sp['int'][idx])
+	
+	cand  = cand[found0]
+	exp0  = exp0[found0]
+	first = first[found0]
+	loc   = sp['mz'][first]
+	diff  = exp0 - loc
+	
+	## second peak: closest peak to the theoretical position, shifted like the first
+	mz1  = t_mz[start[cand]+1]
+	keep = (mz1 >= sp['first']) & (mz1 <= sp['last'])
+	
+	idx, valid = match_peaks(sp, mz1[keep])
+	second, found1 = pick_peaks(sp, idx, valid, np.abs(mz1[keep][:,None] - sp['mz'][idx] - diff[keep][:,None]))
+	val1 = np.where(found1, sp['int'][second], 0)
+	
+	ok    = val1 != 0
+	cand  = cand[keep][ok]
+	first = first[keep][ok]
+	diff  = diff[keep][ok]
+	val1  = val1[ok]
+	
+	## remaining peaks: all have to be in range, missing ones get a tiny intensity
+	n_rest = lengths[cand] - 2
+	owner  = np.repeat(np.arange(len(cand)), n_rest)
+	pos    = np.repeat(start[cand] + 2, n_rest) + (np.arange(n_rest.sum()) - np.repeat(np.cumsum(n_rest) - n_rest, n_rest))
+	
+	mzr  = t_mz[pos]
+	expr = ((error / 1e6) * mzr) + mzr
+	out  = (expr < sp['first']) | (expr > sp['last'])
+	kill = np.bincount(owner[out], minlength=len(cand)) > 0
+	
+	idx, valid = match_peaks(sp, expr)
+	rest, foundr = pick_peaks(sp, idx, valid, np.abs(expr[:,None] - sp['mz'][idx] - diff[owner][:,None]))
+	valr = np.where(foundr, sp['int'][rest], 0)
+	valr[valr == 0] = 1e-100
+	
+	## G-scores, computed together for all distributions with the same number of peaks
+	for n in np.unique(lengths[cand[~kill]]):
+		rows = np.nonzero((lengths[cand] == n) & ~kill)[0]
 		
-		# get second peak to make certain the hit is "real"
-		peak = IDs[j][1]
-		if peak.mz < spec.mz[0] or peak.mz > spec.mz[len(spec.mz)-1]: # out of the m/z range
-			continue
-		else: # second peak is in m/z range
-			near = spec.hasPeak(peak.mz)
-			
-			val  = 0
-			prec = 1000000
-			for k in near:
-				if abs(peak.mz - k[0] - diff) < prec:
-					val  = k[1]
-					prec = abs(peak.mz - k[0] - diff)
-			
-			if val == 0:
-				kill = True
-			
-			t.append(peak.intensity)
-			e.append(val)
+		# experimental and theoretical intensities
+		E = np.empty((len(rows), n))
+		E[:,0] = sp['int'][first[rows]]
+		E[:,1] = val1[rows]
+		if n > 2:
+			E[:,2:] = valr[np.searchsorted(owner, rows)[:,None] + np.arange(n-2)]
+		T = t_int[start[cand[rows]][:,None] + np.arange(n)]
 		
-		if kill:
-			continue
+		# running sum, in the same order as sum()
+		total = E[:,0] * 0
+		for q in range(n):
+			total = total + E[:,q]
 		
-		# cycle through remaining peaks
-		for peak in IDs[j][2:len(IDs[j])]:
-			exp = ((error / 1e6) * peak.mz) + peak.mz # get expected peak position based on precursor error
-			
-			if exp < spec.mz[0] or exp > spec.mz[len(spec.mz)-1]: # out of the m/z range
-				kill = True
-				break
-				
-			near = spec.hasPeak(exp)
-			
-			val  = 0
-			prec = 1000000
-			for k in near:
-				if abs(exp - k[0] - diff) < prec:
-					val  = k[1]
-					prec = abs(exp - k[0] - diff)
-			
-			if val == 0:
-				val = 1e-100
-			
-			e.append(val)
-			t.append(peak.intensity)
+		EI = E/total[:,None]
+		g  = 2 * np.sum(EI * np.log(EI/T), axis=1)
 		
-		if not kill:
-			EI = np.array(e)/sum(e)
-			TI = np.array(t)
-			
-			g  = 2 * np.sum(EI * np.log(EI/TI))
+		# store results, using the spectrum's own peak values
+		for r, row in enumerate(rows):
+			j    = keys[cand[row]]
+			peak = sp['peaks'][sp['order'][first[row]]]
+			mz0  = float(t_mz[start[cand[row]]])
+			exp  = ((error / 1e6) * mz0) + mz0
 			
-			found[j] = g
-			m_int[j] = e[0]
-			m_mz [j] = loc
-			errs[j]  = ppm
-	
-	return [found, m_int, m_mz, errs]
+			hits.append((j, g[r], peak[1], peak[0], 1e6 * ((peak[0] - exp)/exp)))
+	
+	return hits
+
+# monoisotopic weights of the atoms in derivatizations, reagents and metal adducts
+atom_wt = {'C':  12.0,
+           'H':  1.0078250322,
+           'O':  15.994914620,
+           'N':  14.003074004,
+           'S':  31.972071174,
+           'Na': 22.98976928,
+           'K':  38.96370649,
+           'Li': 7.01600344,
+           'Ca': 39.9625909,
+           'Mg': 23.98504170}
+
+# function for getting the class number of a GAG class
+def class_number(gag_class):
+	if gag_class == 'HS':
+		return 3
+	elif gag_class == 'CS':
+		return 1
+	else:
+		return 4
 
-# function for running the guts of GAGfinder
-def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz, chg, so3loss, precision, noise_gone, db_path='../lib/GAGfragDB.db'):
-	# get values ready for reducing end derivatization and reagent
+# function for parsing the reducing end derivatization and reagent formulae into dictionaries
+def parse_mods(re_form, reagent):
 	df    = {'C':0, 'H':0, 'O':0, 'N':0, 'S':0}
 	rf    = {'C':0, 'H':0, 'O':0, 'N':0, 'S':0}
 	atoms = ['C','H','O','N','S']
 	
-	# pick a proper class number
-	if gag_class == 'HS':
-		cNum = 3
-	elif gag_class == 'CS':
-		cNum = 1
-	else:
-		cNum = 4
-	
 	# parse the reducing end derivatization formula
 	if re_form:
-		parts = re.findall(r'([A-Z][a-z]*)(\d*)', re_form.upper()) # split formula by symbol
+		parts = SYMBOL.findall(re_form.upper()) # split formula by symbol
 		for q in parts:
 			if q[0] not in atoms: # invalid symbol entered
 				print "Invalid chemical formula entered. Please enter only CHONS. Try 'python gagfinder.py --help'"
@@ -1247,7 +1706,7 @@ def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz,
 	
 	# parse the reagent formula
 	if reagent:
-		parts = re.findall(r'([A-Z][a-z]*)(\d*)', reagent.upper()) # split formula by symbol
+		parts = SYMBOL.findall(reagent.upper()) # split formula by symbol
 		for q in parts:
 			if q[0] not in atoms: # invalid symbol entered
 				print "Invalid chemical formula entered. Please enter only CHONS. Try 'python gagfinder.py --help'"
@@ -1258,27 +1717,34 @@ def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz,
 				else:
 					rf[q[0]] += int(q[1])
 	
+	# return
+	return [df, rf]
+
+# function for getting the weight of a formula dictionary
+def formula_weight(dt):
+	w = 0
+	for q in dt:
+		w += dt[q] * atom_wt[q]
+	
+	# return
+	return w
+
+# function for running the guts of GAGfinder
+def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz, chg, so3loss, precision, noise_gone, n_proc=1, scan_filter=None, lib_path=None, in_memory=False, db_path='../lib/GAGfragDB.db', iso_path='../lib/GAGisoCache.db', conn=None, isotopes=None, precursors=None, frags=None, spectra=None, precursor=None):
+	# get values ready for reducing end derivatization and reagent
+	df, rf = parse_mods(re_form, reagent)
+	
+	# pick a proper class number
+	cNum = class_number(gag_class)
+	
 	# weights
-	wt = {'C':  12.0,
-	      'H':  1.0078250322,
-	      'O':  15.994914620,
-	      'N':  14.003074004,
-	      'S':  31.972071174,
-	      'Na': 22.98976928,
-	      'K':  38.96370649,
-	      'Li': 7.01600344,
-	      'Ca': 39.9625909,
-	      'Mg': 23.98504170}
+	wt = atom_wt
 	
 	# get derivatization weight
-	dw = 0
-	for q in df:
-		dw += df[q] * wt[q]
+	dw = formula_weight(df)
 	
 	# get reagent weight
-	rw = 0
-	for q in rf:
-		rw += rf[q] * wt[q]
+	rw = formula_weight(rf)
 	
 	############################################
 	# Step 2: Load mzml file and connect to DB #
@@ -1286,23 +1752,59 @@ def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz,
 	
 	print "Loading mzml file and connecting to GAGfragDB...",
 	
-	# from user, under construction
-	d = pymzml.run.Reader(mzml_path, MSn_Precision=5e-6) # get mzML file into object
-	s = pymzml.spec.Spectrum(measuredPrecision=precision) # initialize new Spectrum object
+	# check if these scans were already summed by an earlier run
+	s_key = spectrum_key(mzml_path, precision, noise_gone, scan_filter)
+	if spectra is None or s_key not in spectra:
+		# from user, under construction
+		d = open_mzml(mzml_path) # get mzML file into object
+	
+	# connect to GAGfragDB, or load it into memory, unless the caller already has a connection
+	loaded = conn is None and in_memory
+	if conn is None:
+		if in_memory:
+			conn = memory_db(db_path)
+		else:
+			conn = sq.connect(db_path)
+	
+	c = conn.cursor()
+	
+	# open the isotopic distribution store, unless the caller already has one
+	own_iso = isotopes is None
+	if own_iso and iso_path:
+		isotopes = IsotopeCache(iso_path)
 	
-	# connect to GAGfragDB
-	conn = sq.connect(db_path)
-	c    = conn.cursor()
+	# in-memory precursor masses
+	if precursors is None:
+		precursors = PrecursorIndex(c)
 	
 	print "Done!"
 	
+	if loaded:
+		print_footprint(conn)
+	
 	######################
 	# Step 3a: Sum scans #
 	######################
 	
 	print "Summing scans...",
 	
-	s = sum_scans(d, s, noise_gone) # sum scans
+	if spectra is None or s_key not in spectra:
+		if scan_filter is None:
+			s = sum_scans(d, precision, noise_gone) # sum scans
+		else:
+			s = sum_scans(d, precision, noise_gone, [scan_filter])[0] # sum the scans that pass the filter
+		
+		if spectra is not None:
+			spectra[s_key] = s
+	else:
+		s = spectra[s_key]
+	
+	# check to make sure there was something to sum
+	if not s.mz:
+		print "No MS2 scans were summed. Check the scan filters."
+		if precursor is not None:
+			precursor['status'] = 'no_scans'
+		return [[], {}, {}, {}, {}, {}, {}]
 	
 	print "Done!"
 
@@ -1312,7 +1814,16 @@ def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz,
 	
 	print "Finding precursor composition...",
 	
-	id, pFmla, pComp, tMass = get_precursor(chg, mz, c, dw, wt, cNum, metal, metal_ct) # get info about precursor
+	pInfo = get_precursor(chg, mz, c, dw, wt, cNum, metal, metal_ct, precursors) # get info about precursor
+	
+	# check to make sure GAGfragDB has a precursor to match
+	if pInfo is None:
+		print "No " + gag_class + " precursors were found in GAGfragDB."
+		if precursor is not None:
+			precursor['status'] = 'no_precursor'
+		return [[], {}, {}, {}, {}, {}, {}]
+	
+	id, pFmla, pComp, tMass = pInfo
 	
 	print "Done!"
 
@@ -1337,6 +1848,10 @@ def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz,
 	pDict         = fmla2dict(pComp, 'composition')
 	NR, RE, n_pre = get_ends(pDict, cNum)
 	
+	# tell the caller which precursor this is
+	if precursor is not None:
+		precursor.update({'formula': pFmla, 'composition': pComp, 'error': err, 'status': 'ok'})
+	
 	print "Done!"
 	
 	#######################################################################
@@ -1345,8 +1860,29 @@ def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz,
 	
 	print "Retrieving all potential fragment ions for precursor with composition " + pComp + "...",
 	
-	# get all isotopic distributions
-	all_IDs, all_forms = get_frags(pFmla, pDict, so3loss, rf, df, dw, chg, n_pre, c, id, xmod, RE, metal, metal_ct)
+	# check if an earlier run already retrieved the fragments for this precursor
+	f_key = (id, so3loss, tuple(sorted(rf.items())), tuple(sorted(df.items())), chg, metal, metal_ct)
+	if frags is not None and f_key in frags:
+		all_IDs, all_forms = frags[f_key]
+	else:
+		# check for a compiled library of these fragments
+		l_path = None
+		if lib_path:
+			l_path = os.path.join(lib_path, FragmentLibrary.key(gag_class, pComp, pFmla, so3loss, rf, df, chg, metal, metal_ct, precursors.stamp()))
+		
+		if l_path and os.path.isdir(l_path):
+			all_IDs   = FragmentLibrary.load(l_path) # memory-mapped isotopic distributions
+			all_forms = all_IDs.forms
+		else:
+			# get all isotopic distributions
+			all_IDs, all_forms = get_frags(pFmla, pDict, so3loss, rf, df, dw, chg, n_pre, c, id, xmod, RE, gag_class, metal, metal_ct, isotopes)
+		
+		if frags is not None:
+			frags[f_key] = [all_IDs, all_forms]
+	
+	# save any new isotopic distributions for the next run
+	if own_iso and isotopes is not None:
+		isotopes.close()
 	
 	print "Done!"
 	
@@ -1357,7 +1893,7 @@ def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz,
 	print "Scoring all potential fragment ions for precursor with composition " + pComp + "...",
 	
 	# score all fragments
-	found_IDs, mono_int, mono_mz, errors = score_frags(all_IDs, s, err)
+	found_IDs, mono_int, mono_mz, errors = score_frags(all_IDs, s, err, n_proc)
 	
 	print "Tested " + str(len(found_IDs)) + " out of " + str(len(all_IDs)) + " fragments"
 	
@@ -1376,35 +1912,116 @@ def find_gags(mzml_path, gag_class, re_form, N, P, metal, metal_ct, reagent, mz,
 	# return
 	return [top, found_IDs, mono_int, mono_mz, errors, all_IDs, all_forms]
 
+# function for getting the rows of a result, as (m/z, intensity, charge, fragments, G-score, error) lists
+def result_rows(scores, fids, m_mz, m_int, formulae, errs):
+	# return
+	return [[m_mz[q[0]], m_int[q[0]], q[0][1], formulae[q[0][0]], fids[q[0]], errs[q[0]]] for q in scores]
+
+# function for putting the rows of a result into the lines of a TSV file
+def result_tsv(rows):
+	lines = ["m/z\tIntensity\tCharge\tFragments\tG-score\tError (ppm)\n"]
+	for mz, intensity, charge, ions, score, error in rows:
+		lines.append(str(mz)+'\t'+str(intensity)+'\t'+str(charge)+'\t'+'; '.join(ions)+'\t'+str(score)+'\t'+str(error)+'\n')
+	
+	# return
+	return lines
+
 # function for writing to file
-def write_result_to_file(mzml_path, scores, fids, m_mz, m_int, all_dist, formulae, errs):
+def write_result_to_file(mzml_path, scores, fids, m_mz, m_int, all_dist, formulae, errs, out_path=None):
 	print "Done!"
 	print "Printing output to file...",
 	
 	# write to file
-	oFile = mzml_path[:-5] + '.tsv'
+	if out_path:
+		oFile = out_path
+	else:
+		oFile = mzml_path[:-5] + '.tsv'
 	f     = open(oFile, 'w')
-	f.write("m/z\tIntensity\tCharge\tFragments\tG-score\tError (ppm)\n")
+	f.writelines(result_tsv(result_rows(scores, fids, m_mz, m_int, formulae, errs)))
+	f.close()
+
+# function for putting every scored fragment of a result into columns, best G-score first
+def result_columns(fids, m_mz, m_int, formulae, errs):
+	keys  = [q[0] for q in sorted(fids.items(), key=lambda x: x[1], reverse=False)]
+	fmlas = sorted(set(k[0] for k in keys))
+	where = dict((f, q) for q, f in enumerate(fmlas))
+	comps = [c for f in fmlas for c in formulae[f]]
 	
-	for q in scores:
-		out = str(m_mz[q[0]])+'\t'+str(m_int[q[0]])+'\t'+str(all_dist[q[0]][0].charge)+'\t'
-		for ions in formulae[q[0][0]]:
-			out += ions + '; '
-		
-		out = out[:-2] + '\t'
-		out += str(fids[q[0]]) + '\t' + str(errs[q[0]]) + '\n'
-		f.write(out)
+	# return
+	return {'mz':           np.array([m_mz[k] for k in keys], dtype=float),
+	        'intensity':    np.array([m_int[k] for k in keys], dtype=float),
+	        'charge':       np.array([k[1] for k in keys], dtype=np.int32),
+	        'gscore':       np.array([fids[k] for k in keys], dtype=float),
+	        'error':        np.array([errs[k] for k in keys], dtype=float),
+	        'formula':      np.array([where[k[0]] for k in keys], dtype=np.int32), # row of formulae
+	        'formulae':     np.array(fmlas, dtype=str),
+	        'compositions': np.array(comps, dtype=str), # compositions of formula q are comp_start[q] to comp_start[q+1]
+	        'comp_start':   np.cumsum([0] + [len(formulae[f]) for f in fmlas]).astype(np.int32)}
+
+# function for getting the metadata of a run, from its arguments and what find_gags found out about the precursor
+def result_meta(params, precursor):
+	scan_filter = params[14]
 	
+	# return
+	return {'mzML':           params[0],
+	        'class':          params[1],
+	        'reducing_end':   params[2],
+	        'metal':          params[5],
+	        'metal_count':    params[6],
+	        'reagent':        params[7],
+	        'mz':             params[8],
+	        'charge':         params[9],
+	        'sulfate_losses': params[10],
+	        'precision':      params[11],
+	        'noise_removed':  params[12],
+	        'scan_filter':    list(scan_filter.key()) if scan_filter is not None else None,
+	        'formula':        precursor.get('formula'),
+	        'composition':    precursor.get('composition'),
+	        'error':          precursor.get('error'),
+	        'status':         precursor.get('status'), # ok, no_scans or no_precursor
+	        'created':        time.time()}
+
+# function for writing every scored fragment of a result, with the run metadata, to an uncompressed .npz file
+def write_result_to_npz(out_path, columns, meta):
+	f = open(out_path, 'wb') # a file object keeps numpy from adding its own extension
+	np.savez(f, meta=np.array(json.dumps(meta)), **columns)
 	f.close()
 
-# main function
-def main():
-	################################
-	# Step 1: check user arguments #
-	################################
+# function for reading a result file back, memory-mapping each column
+def load_result_npz(npz_path):
+	z = zipfile.ZipFile(npz_path)
+	f = open(npz_path, 'rb')
 	
-	print "Checking user arguments...",
+	arrays = {}
+	for info in z.infolist():
+		name = info.filename[:-4] # drop .npy
+		
+		# find where the column's data starts: past the zip entry header, then past the .npy header
+		f.seek(info.header_offset)
+		n_name, n_extra = struct.unpack('<HH', f.read(30)[26:30])
+		f.seek(info.header_offset + 30 + n_name + n_extra)
+		version = np.lib.format.read_magic(f)
+		if version == (1, 0):
+			shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+		else:
+			shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+		
+		# compressed, empty and 0-d columns cannot be mapped, so read them
+		if info.compress_type != zipfile.ZIP_STORED or dtype.hasobject or not shape or 0 in shape:
+			arrays[name] = np.lib.format.read_array(z.open(info.filename))
+		else:
+			arrays[name] = np.memmap(npz_path, dtype=dtype, mode='r', offset=f.tell(), shape=shape, order='F' if fortran else 'C')
+	
+	f.close()
+	z.close()
+	
+	meta = json.loads(str(arrays.pop('meta')))
 	
+	# return
+	return [arrays, meta]
+
+# function for building the argument parser
+def get_parser():
 	# initiate parser
 	parser = argparse.ArgumentParser(description='Find isotopic clusters in GAG tandem mass spectra.')
 	
@@ -1422,10 +2039,20 @@ def main():
 	parser.add_argument('-s', type=int, required=False, help='Number of sulfate losses to consider (optional, default 0)')
 	parser.add_argument('-e', type=float, required=False, help='Precision, in ppm (optional, default 20)')
 	parser.add_argument('-x', required=False, help='Has the noise already been removed? (y/n)')
+	parser.add_argument('-j', type=int, required=False, help='Number of processes for scoring fragments (optional, default 1)')
+	parser.add_argument('-w', type=float, required=False, help='Only sum scans whose isolation window, widened by this many m/z, holds the precursor m/z (optional)')
+	parser.add_argument('-b', required=False, help='Only sum scans in this retention time range, as start,end (optional)')
+	parser.add_argument('-q', required=False, help='Only sum scans with the precursor charge? (y/n, optional)')
+	parser.add_argument('-o', required=False, help='Output file (optional, default input file with .tsv extension)')
+	parser.add_argument('-l', required=False, help='Folder of fragment libraries made by compile_library.py (optional)')
+	parser.add_argument('-u', required=False, help='Load GAGfragDB into memory before searching? (y/n, optional)')
+	parser.add_argument('-v', required=False, help='Also write every scored fragment, with run metadata, to this .npz file (optional)')
 	
-	# parse arguments
-	args = parser.parse_args()
-	
+	# return
+	return parser
+
+# function for checking user arguments and putting them into the order find_gags takes
+def check_args(args):
 	# get arguments into proper variables
 	gClass  = args.c
 	dFile   = args.i
@@ -1440,6 +2067,12 @@ def main():
 	s_loss  = args.s
 	mPrec   = args.e
 	removed = args.x
+	n_proc  = args.j
+	window  = args.w
+	rt_span = args.b
+	z_only  = args.q
+	lib_dir = args.l
+	in_mem  = args.u
 	
 	# check to make sure a proper GAG class was added
 	if gClass not in ['HS', 'CS', 'KS']:
@@ -1495,6 +2128,58 @@ def main():
 			print "You must enter either 'y' or 'n' for whether the noise has been removed or not. Try 'python gagfinder.py -h'"
 			sys.exit()
 	
+	# check to see if the user wants to score fragments in parallel
+	if not n_proc:
+		n_proc = 1
+	elif n_proc < 1:
+		print "You must enter a positive integer for the number of processes. Try 'python gagfinder.py -h'"
+		sys.exit()
+	
+	# check to see if the user wants GAGfragDB in memory
+	if in_mem and in_mem not in ['y', 'n']:
+		print "You must enter either 'y' or 'n' for whether to load GAGfragDB into memory. Try 'python gagfinder.py -h'"
+		sys.exit()
+	
+	in_mem = in_mem == 'y'
+	
+	# check to make sure the isolation window is sensible
+	if window is not None:
+		if window < 0:
+			print "You must enter a non-negative isolation window width. Try 'python gagfinder.py -h'"
+			sys.exit()
+		
+		if pre_mz is None:
+			print "You must enter the precursor m/z to filter scans by isolation window. Try 'python gagfinder.py -h'"
+			sys.exit()
+	
+	# check to make sure the retention time range is two numbers
+	if rt_span:
+		try:
+			rt_span = tuple(float(q) for q in rt_span.split(','))
+		except ValueError:
+			rt_span = ()
+		
+		if len(rt_span) != 2 or rt_span[0] > rt_span[1]:
+			print "You must enter the retention time range as start,end. Try 'python gagfinder.py -h'"
+			sys.exit()
+	else:
+		rt_span = None
+	
+	# check to see if the user only wants scans with the precursor charge
+	if z_only and z_only not in ['y', 'n']:
+		print "You must enter either 'y' or 'n' for whether to filter scans by charge. Try 'python gagfinder.py -h'"
+		sys.exit()
+	
+	if z_only == 'y' and pre_z is None:
+		print "You must enter the precursor charge to filter scans by charge. Try 'python gagfinder.py -h'"
+		sys.exit()
+	
+	# put the scan filters together
+	if window is not None or rt_span or z_only == 'y':
+		scan_filter = ScanFilter(pre_mz, window, rt_span, pre_z if z_only == 'y' else None)
+	else:
+		scan_filter = None
+	
 	# print the system arguments back out to the user
 	if debug:
 		print "class: %s" % (gClass)
@@ -1513,10 +2198,27 @@ def main():
 					formula += str(val)
 		print "atoms in reducing end derivatization: %s" % (formula)
 	
+	# return
+	return [dFile, gClass, fmla, top_n, top_p, adduct, nMetal, reag, pre_mz, pre_z, s_loss, mPrec, removed, n_proc, scan_filter, lib_dir, in_mem]
+
+# main function
+def main():
+	################################
+	# Step 1: check user arguments #
+	################################
+	
+	print "Checking user arguments...",
+	
+	# parse and check arguments
+	args   = get_parser().parse_args()
+	params = check_args(args)
+	
 	print "Done!"
 	
 	# run the guts of GAGfinder
-	result = find_gags(dFile, gClass, fmla, top_n, top_p, adduct, nMetal, reag, pre_mz, pre_z, s_loss, mPrec, removed)
+	precursor = {}
+	result    = find_gags(*params, precursor=precursor)
+	dFile     = params[0]
 	
 	# get individual stuff into variables
 	output   = result[0]
@@ -1528,7 +2230,14 @@ def main():
 	a_forms  = result[6]
 	
 	# write to file
-	write_result_to_file(dFile, output, f_IDs, monmz, monint, a_IDs, a_forms, mistakes)
+	write_result_to_file(dFile, output, f_IDs, monmz, monint, a_IDs, a_forms, mistakes, args.o)
+	
+	# write every scored fragment too, if the user wants them
+	if args.v:
+		print "Done!"
+		print "Printing all scored fragments to " + args.v + "...",
+		
+		write_result_to_npz(args.v, result_columns(f_IDs, monmz, monint, a_forms, mistakes), result_meta(params, precursor))
 	
 	print "Finished!"
 	print time.time() - start_time
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+
+#################################
+# Step 0: imports and functions #
+#################################
+
+import os # for finding GAGfinder
+import sys # for running the same Python
+import time # for timing commands
+import argparse # for getting user inputs
+import subprocess # for starting fresh interpreters
+
+### FUNCTIONS ###
+
+# function for timing a command over several runs, returning the fastest and median times
+def time_command(argv, repeats):
+	devnull = open(os.devnull, 'w')
+	times   = []
+	for q in range(repeats):
+		start = time.time()
+		subprocess.call(argv, stdout=devnull, stderr=devnull)
+		times.append(time.time() - start)
+	
+	devnull.close()
+	times.sort()
+	
+	# return
+	return [times[0], times[len(times)//2]]
+
+# function for timing how long the species tables take to build and to load from species.json
+def time_species(repeats):
+	import species
+	import gagfinder_v2
+	
+	source = os.path.splitext(os.path.abspath(species.__file__))[0] + '.py'
+	
+	start = time.time()
+	for q in range(repeats):
+		execfile(source, {'__file__': source})
+	t_build = (time.time() - start) / repeats
+	
+	start = time.time()
+	for q in range(repeats):
+		gagfinder_v2.load_species()
+	t_load = (time.time() - start) / repeats
+	
+	# return
+	return [t_build, t_load]
+
+# main function
+def main():
+	################################
+	# Step 1: check user arguments #
+	################################
+	
+	print "Checking user arguments...",
+	
+	# initiate parser
+	parser = argparse.ArgumentParser(description='Time how long GAGfinder takes to start up.')
+	
+	# add arguments
+	parser.add_argument('-r', type=int, required=False, help='Number of runs of each command (optional, default 10)')
+	
+	# parse arguments
+	args    = parser.parse_args()
+	repeats = args.r
+	
+	if not repeats:
+		repeats = 10
+	elif repeats < 1:
+		print "You must enter a positive integer for the number of runs. Try 'python import_benchmark.py -h'"
+		sys.exit()
+	
+	print "Done!"
+	
+	############################
+	# Step 2: time the startup #
+	############################
+	
+	here = os.path.dirname(os.path.abspath(__file__))
+	gf   = os.path.join(here, 'gagfinder_v2.py')
+	
+	commands = [('interpreter only',              [sys.executable, '-c', 'pass']),
+	            ('numpy, pymzml and brainpy',     [sys.executable, '-c', 'import numpy, pymzml, brainpy']),
+	            ('import gagfinder_v2',           [sys.executable, '-c', 'import sys; sys.path.insert(0, %r); import gagfinder_v2' % here]),
+	            ('gagfinder_v2.py -h',            [sys.executable, gf, '-h']),
+	            ('gagfinder_v2.py, bad arguments', [sys.executable, gf, '-c', 'XX', '-i', 'none.mzML'])]
+	
+	print "\ncommand\tfastest (ms)\tmedian (ms)"
+	for name, argv in commands:
+		fastest, median = time_command(argv, repeats)
+		print "%s\t%.1f\t%.1f" % (name, 1000. * fastest, 1000. * median)
+	
+	t_build, t_load = time_species(repeats)
+	
+	print "\nspecies tables\tbuild (ms)\tload from species.json (ms)"
+	print "\t%.2f\t%.2f" % (1000. * t_build, 1000. * t_load)
+	
+	print "\nFinished!"
+
+# run main
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,139 @@
+#!/usr/bin/python
+
+#################################
+# Step 0: imports and functions #
+#################################
+
+import time # for timing the ranking
+import sys # for exiting on errors
+
+# GAGfinder itself, by name, so that its stand-ins for modules it has not imported yet stay behind
+from gagfinder_v2 import start_time, get_parser, check_args, find_gags, write_result_to_file, fmla2dict, class_number, get_ends
+from structures import * # for ranking sulfate placements
+
+### FUNCTIONS ###
+
+# function for getting the backbones a precursor composition can have, from the non-reducing end
+def chain_backbones(pComp, gag_class):
+	pDict     = fmla2dict(pComp, 'composition')
+	NR, RE, n = get_ends(pDict, class_number(gag_class))
+	
+	# the two monosaccharides that alternate along the chain
+	if gag_class == 'KS':
+		pair = ['X', 'N']
+	else:
+		pair = ['U', 'N']
+	
+	# when the ends are unknown, the chain can start with either one
+	if NR == '?':
+		starts = pair
+	else:
+		starts = [NR]
+	
+	backbones = []
+	for start in starts:
+		first = 'U' if start == 'D' else start
+		other = pair[1] if first == pair[0] else pair[0]
+		chain = [first if j % 2 == 0 else other for j in range(n)]
+		if start == 'D': # dHexA can only sit at the non-reducing end
+			chain[0] = 'D'
+		
+		# only keep backbones that add up to the composition
+		if all(chain.count(ms) == pDict[ms] for ms in ['D', 'U', 'X', 'N']):
+			backbones.append(''.join(chain))
+	
+	# return
+	return backbones
+
+# function for ranking the sulfate placements of a precursor straight from the found fragments of find_gags
+def rank_structures(found_IDs, all_forms, pComp, gag_class, so3loss=0, top=10):
+	# rows of fragment keys, best G-score first
+	rows = score_rows([(all_forms[q[0]], G) for q, G in found_IDs.items()])
+	
+	pDict = fmla2dict(pComp, 'composition')
+	
+	# every backbone competes for one list of the best placements
+	best = TopList(top)
+	for backbone in chain_backbones(pComp, gag_class):
+		rank_sulfation(gag_class, backbone, pDict['S'], pDict['A'], rows, so3loss, best=best)
+	
+	# return
+	return [(score, search.backbone, search.label(placed)) for score, (search, placed) in best.items()]
+
+# function for writing ranked structures to file
+def write_structures_to_file(ranked, out_path):
+	f = open(out_path, 'w')
+	f.write("Rank\tBackbone\tStructure\tScore\n")
+	for n, (score, backbone, label) in enumerate(ranked):
+		f.write(str(n+1)+'\t'+backbone+'\t'+label+'\t'+str(score)+'\n')
+	f.close()
+
+# main function
+def main():
+	################################
+	# Step 1: check user arguments #
+	################################
+	
+	print "Checking user arguments...",
+	
+	# GAGfinder's arguments, plus the number of structures and where to put them
+	parser = get_parser()
+	parser.description = 'Rank the sulfate placements of a GAG precursor from its tandem mass spectrum.'
+	parser.add_argument('-k', type=int, required=False, help='Number of ranked structures to return (optional, default 10)')
+	parser.add_argument('-f', required=False, help='Ranked structure output file (optional, default input file with _structures.tsv ending)')
+	
+	# parse and check arguments
+	args   = parser.parse_args()
+	params = check_args(args)
+	top_k  = args.k
+	sFile  = args.f
+	
+	if top_k is None:
+		top_k = 10
+	
+	if top_k < 1:
+		print "You must enter a positive integer for the number of ranked structures. Try 'python rank_structures.py -h'"
+		sys.exit()
+	
+	if not sFile:
+		sFile = params[0][:-5] + '_structures.tsv'
+	
+	print "Done!"
+	
+	# run the guts of GAGfinder
+	precursor = {}
+	result    = find_gags(*params, precursor=precursor)
+	
+	if precursor.get('status') != 'ok':
+		print "No precursor to rank structures for."
+		sys.exit()
+	
+	# write the fragments too when the user asks for them
+	if args.o:
+		write_result_to_file(params[0], result[0], result[1], result[3], result[2], result[5], result[6], result[4], args.o)
+		print "Done!"
+	
+	###################################
+	# Step 4: Rank sulfate placements #
+	###################################
+	
+	print "Ranking sulfate placements for precursor with composition " + precursor['composition'] + "...",
+	
+	ranked = rank_structures(result[1], result[6], precursor['composition'], params[1], params[10], top_k)
+	
+	print "Done!"
+	
+	for n, (score, backbone, label) in enumerate(ranked):
+		print "%i\t%s\t%s\t%i" % (n+1, backbone, label, score)
+	
+	print "Printing output to file...",
+	
+	write_structures_to_file(ranked, sFile)
+	
+	print "Done!"
+	print "Finished!"
+	print time.time() - start_time
+
+# run main
+if __name__ == '__main__':
+	main()
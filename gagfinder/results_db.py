@@ -0,0 +1,238 @@
+#!/usr/bin/python
+
+#################################
+# Step 0: imports and functions #
+#################################
+
+import time # for timing queries
+import json # for storing run metadata
+import os # for checking that the results database exists
+import sys # for exiting on errors
+import argparse # for parsing arguments
+import sqlite3 as sq # for accessing the results database
+
+### FUNCTIONS ###
+
+# tables of the results database
+tables = ['''CREATE TABLE IF NOT EXISTS Precursors (
+             id          INTEGER PRIMARY KEY,
+             formula     TEXT NOT NULL,
+             composition TEXT NOT NULL);''',
+          '''CREATE TABLE IF NOT EXISTS Runs (
+             id      INTEGER PRIMARY KEY,
+             pId     INTEGER,
+             mzML    TEXT    NOT NULL,
+             class   TEXT    NOT NULL,
+             mz      REAL,
+             charge  INTEGER,
+             error   REAL,
+             status  TEXT,
+             created REAL,
+             meta    TEXT);''',
+          '''CREATE TABLE IF NOT EXISTS Compositions (
+             id    INTEGER PRIMARY KEY,
+             value TEXT NOT NULL);''',
+          '''CREATE TABLE IF NOT EXISTS Fragments (
+             id        INTEGER PRIMARY KEY,
+             rId       INTEGER NOT NULL,
+             cId       INTEGER NOT NULL,
+             mz        REAL    NOT NULL,
+             intensity REAL    NOT NULL,
+             charge    INTEGER NOT NULL,
+             gscore    REAL    NOT NULL,
+             error     REAL    NOT NULL);''']
+
+# indexes of the results database, as (name, statement)
+indexes = [('Precursors_formula',            'CREATE UNIQUE INDEX IF NOT EXISTS Precursors_formula ON Precursors (formula);'), # precursors by formula
+           ('Precursors_composition',        'CREATE INDEX IF NOT EXISTS Precursors_composition ON Precursors (composition);'), # precursors by composition
+           ('Runs_pId',                      'CREATE INDEX IF NOT EXISTS Runs_pId ON Runs (pId);'), # runs of a precursor
+           ('Compositions_value',            'CREATE UNIQUE INDEX IF NOT EXISTS Compositions_value ON Compositions (value);'), # fragment compositions by string
+           ('Fragments_cId_gscore',          'CREATE INDEX IF NOT EXISTS Fragments_cId_gscore ON Fragments (cId, gscore);'), # scores of a fragment composition
+           ('Fragments_cId_charge_gscore',   'CREATE INDEX IF NOT EXISTS Fragments_cId_charge_gscore ON Fragments (cId, charge, gscore);'), # scores of a fragment composition at a charge
+           ('Fragments_rId',                 'CREATE INDEX IF NOT EXISTS Fragments_rId ON Fragments (rId);')] # fragments of a run
+
+# store of the scored fragments of many GAGfinder runs, appended to in one transaction per commit
+class ResultStore(object):
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sq.connect(path, timeout=60)
+        for sql in tables:
+            self.conn.execute(sql)
+        for name, sql in indexes:
+            self.conn.execute(sql)
+        self.conn.commit()
+
+        # IDs of what is already stored, so appending only looks up what is new
+        self.labels = dict(self.conn.execute('SELECT value, id FROM Compositions;').fetchall())
+        self.precursors = dict(self.conn.execute('SELECT formula, id FROM Precursors;').fetchall())
+
+    def label_id(self, label):
+        if label not in self.labels:
+            self.labels[label] = self.conn.execute('INSERT INTO Compositions (value) VALUES (?);', (label,)).lastrowid
+        return self.labels[label]
+
+    def precursor_id(self, formula, composition):
+        if formula not in self.precursors:
+            self.precursors[formula] = self.conn.execute('INSERT INTO Precursors (formula, composition) VALUES (?,?);', (formula, composition)).lastrowid
+        return self.precursors[formula]
+
+    def add_run(self, meta, columns):
+        # one run, with every scored fragment of it, as given by result_meta and result_columns;
+        # the mzML path is made absolute so that runs from manifests in other folders stay apart
+        meta = dict(meta, mzML=os.path.abspath(meta['mzML']))
+        # runs whose precursor was not found are kept with no precursor, so that they can be listed
+        pId = None
+        if meta.get('formula'):
+            pId = self.precursor_id(meta['formula'], meta.get('composition') or '')
+        rId = self.conn.execute('''INSERT INTO Runs (pId, mzML, class, mz, charge, error, status, created, meta)
+                                   VALUES (?,?,?,?,?,?,?,?,?);''', (pId, meta['mzML'], meta['class'], meta.get('mz'), meta.get('charge'),
+                                                                    meta.get('error'), meta.get('status'), meta.get('created'), json.dumps(meta))).lastrowid
+
+        # one row for each composition a fragment could be
+        fmlas = columns['formulae'].tolist()
+        comps = columns['compositions'].tolist()
+        cstart = columns['comp_start'].tolist()
+        cIds = [[self.label_id(c) for c in comps[cstart[q]:cstart[q+1]]] for q in range(len(fmlas))]
+
+        rows = []
+        for mz, intensity, charge, gscore, error, f in zip(columns['mz'].tolist(), columns['intensity'].tolist(), columns['charge'].tolist(),
+                                                           columns['gscore'].tolist(), columns['error'].tolist(), columns['formula'].tolist()):
+            for cId in cIds[f]:
+                rows.append((rId, cId, mz, intensity, charge, gscore, error))
+
+        self.conn.executemany('''INSERT INTO Fragments (rId, cId, mz, intensity, charge, gscore, error)
+                                 VALUES (?,?,?,?,?,?,?);''', rows)
+
+        return rId
+
+    def commit(self):
+        self.conn.commit()
+
+    def query(self, label=None, charge=None, max_g=None, composition=None, gag_class=None, limit=None):
+        # scored fragments across runs, best G-score first; a label with * matches like a wildcard
+        where = []
+        args = []
+        if label is not None:
+            if '*' in label:
+                where.append('c.value LIKE ?')
+                args.append(label.replace('*', '%'))
+            else:
+                where.append('c.value = ?')
+                args.append(label)
+        if charge is not None:
+            where.append('f.charge = ?')
+            args.append(charge)
+        if max_g is not None:
+            where.append('f.gscore < ?')
+            args.append(max_g)
+        if composition is not None:
+            where.append('p.composition = ?')
+            args.append(composition)
+        if gag_class is not None:
+            where.append('r.class = ?')
+            args.append(gag_class)
+
+        sql = '''SELECT   r.id, r.mzML, r.class, r.mz, r.charge, p.composition, c.value, f.charge, f.mz, f.intensity, f.gscore, f.error
+                 FROM     Fragments f, Compositions c, Runs r, Precursors p
+                 WHERE    f.cId = c.id
+                 AND      f.rId = r.id
+                 AND      r.pId = p.id'''
+        for w in where:
+            sql += '\n                 AND      ' + w
+        sql += '\n                 ORDER BY f.gscore ASC'
+        if limit:
+            sql += '\n                 LIMIT ?'
+            args.append(limit)
+
+        return self.conn.execute(sql + ';', args).fetchall()
+
+    def failed_runs(self, gag_class=None):
+        # runs that stopped before scoring, with why: no_scans or no_precursor
+        sql = 'SELECT id, mzML, class, mz, charge, status, meta FROM Runs WHERE pId IS NULL'
+        args = []
+        if gag_class is not None:
+            sql += ' AND class = ?'
+            args.append(gag_class)
+
+        return self.conn.execute(sql + ' ORDER BY id;', args).fetchall()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+# main function
+def main():
+	################################
+	# Step 1: check user arguments #
+	################################
+	
+	# initiate parser
+	parser = argparse.ArgumentParser(description='Query the scored fragments that batch runs stored in a results database.')
+	
+	# add arguments
+	parser.add_argument('-d', required=False, help='Results database (optional, default ../lib/GAGresults.db)')
+	parser.add_argument('-f', required=False, help='Fragment composition, as GAGfinder writes it, with * as a wildcard (optional)')
+	parser.add_argument('-z', type=int, required=False, help='Fragment charge (optional)')
+	parser.add_argument('-g', type=float, required=False, help='Only fragments that scored below this G-score (optional)')
+	parser.add_argument('-p', required=False, help='Precursor composition (optional)')
+	parser.add_argument('-c', required=False, help='GAG class (optional)')
+	parser.add_argument('-n', type=int, required=False, help='Number of rows to return (optional, default all)')
+	parser.add_argument('-e', required=False, help='List the runs that stopped before scoring, and why, instead? (y/n, optional)')
+	
+	# parse arguments
+	args   = parser.parse_args()
+	dbFile = args.d
+	gClass = args.c
+	
+	if not dbFile:
+		dbFile = '../lib/GAGresults.db'
+	
+	if not os.path.isfile(dbFile):
+		print "Could not find " + dbFile + ". Try 'python results_db.py -h'"
+		sys.exit()
+	
+	if gClass and gClass not in ['HS', 'CS', 'KS']:
+		print "You must denote a GAG class, either HS, CS, or KS. Try 'python results_db.py -h'"
+		sys.exit()
+	
+	if args.e and args.e not in ['y', 'n']:
+		print "You must enter either 'y' or 'n' for whether to list runs that stopped before scoring. Try 'python results_db.py -h'"
+		sys.exit()
+	
+	if args.n is not None and args.n < 1:
+		print "You must enter a positive integer for the number of rows. Try 'python results_db.py -h'"
+		sys.exit()
+	
+	#########################
+	# Step 2: run the query #
+	#########################
+	
+	store = ResultStore(dbFile)
+	
+	if args.e == 'y':
+		rows = store.failed_runs(gClass)
+		store.close()
+		
+		print "Run\tmzML\tClass\tPrecursor m/z\tPrecursor charge\tStatus\tMetadata"
+		for row in rows:
+			print '\t'.join(str(q) for q in row)
+		
+		print "%i runs stopped before scoring" % (len(rows))
+		return
+	
+	start = time.time()
+	rows  = store.query(args.f, args.z, args.g, args.p, gClass, args.n)
+	took  = 1000. * (time.time() - start)
+	
+	store.close()
+	
+	print "Run\tmzML\tClass\tPrecursor m/z\tPrecursor charge\tPrecursor\tFragment\tCharge\tm/z\tIntensity\tG-score\tError (ppm)"
+	for row in rows:
+		print '\t'.join(str(q) for q in row)
+	
+	print "%i rows in %.1f ms" % (len(rows), took)
+
+# run main
+if __name__ == '__main__':
+	main()
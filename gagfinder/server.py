@@ -0,0 +1,286 @@
+#!/usr/bin/python
+
+#################################
+# Step 0: imports and functions #
+#################################
+
+import json # for reading jobs and writing results
+import socket # for serving on a Unix socket
+import urlparse # for reading jobs from query strings
+import BaseHTTPServer # for serving jobs over HTTP
+import SocketServer # for binding to a Unix socket
+from cStringIO import StringIO # for catching what GAGfinder prints during a job
+
+import time # for timing jobs
+import os # for checking mzML files and removing stale sockets
+import sys # for catching what GAGfinder prints during a job
+import argparse # for getting user inputs
+
+from batch import open_state, close_state # shared state
+from gagfinder_v2 import start_time, get_parser, check_args, find_gags, print_footprint, result_rows, result_tsv # GAGfinder itself
+
+### FUNCTIONS ###
+
+# command line flags a job can give, which are GAGfinder's own
+job_flags = set(o.lstrip('-') for a in get_parser()._actions for o in a.option_strings) - set(['h', 'help'])
+
+# function for turning a job, as a dictionary of command line flags and values, into arguments
+def job_args(job):
+	argv = []
+	for flag in sorted(job):
+		if flag in ['format', 'o']: # results are sent back rather than written
+			continue
+		
+		argv += ['-' + flag, str(job[flag])]
+	
+	# return
+	return argv
+
+# function for running one job against the server's warm state, returning its result rows
+def run_job(argv, state):
+	params = check_args(get_parser().parse_args(argv))
+	
+	# a missing or unreadable mzML file is the client's mistake, not the server's
+	if not os.path.isfile(params[0]) or not os.access(params[0], os.R_OK):
+		print "Could not read " + params[0] + "."
+		sys.exit()
+	
+	# only keep the summed scans of one mzML file at a time, and sum them again if the file changes
+	stamp = (params[0], os.path.getmtime(params[0]))
+	if state.get('stamp') != stamp:
+		state['spectra'].clear()
+		state['stamp'] = stamp
+	
+	# run the guts of GAGfinder
+	result = find_gags(*params, db_path=state['db_path'], conn=state['conn'], isotopes=state['isotopes'], precursors=state['precursors'], frags=state['frags'], spectra=state['spectra'])
+	
+	# save new isotopic distributions as we go, since the server is never told to close
+	if state['isotopes'] is not None:
+		state['isotopes'].flush()
+	
+	top, fids, m_int, m_mz, errs, all_dist, formulae = result
+	
+	# return
+	return [params, result_rows(top, fids, m_mz, m_int, formulae, errs)]
+
+# function for putting the result rows of a job into a JSON document
+def result_json(mzml_path, rows):
+	results = [{'mz':        float(mz),
+	            'intensity': float(intensity),
+	            'charge':    int(charge),
+	            'fragments': list(ions),
+	            'score':     float(score),
+	            'error':     float(error)} for mz, intensity, charge, ions, score, error in rows]
+	
+	# return
+	return json.dumps({'mzML': mzml_path, 'results': results})
+
+# state shared by every request
+server_state = {'jobs': 0}
+
+# handler for GAGfinder jobs, given as a query string or a JSON object of command line flags
+class JobHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        if url.path == '/status':
+            state = server_state['state']
+            self.send(200, 'application/json', json.dumps({'jobs':       server_state['jobs'],
+                                                           'precursors': len(state['frags']),
+                                                           'spectra':    len(state['spectra']),
+                                                           'isotopes':   len(state['isotopes']) if state['isotopes'] is not None else 0}))
+        elif url.path == '/run':
+            self.run(dict((k, v[-1]) for k, v in urlparse.parse_qs(url.query).items()))
+        else:
+            self.send(404, 'text/plain', 'Unknown path ' + url.path + '\n')
+
+    def do_POST(self):
+        url = urlparse.urlparse(self.path)
+        if url.path != '/run':
+            self.send(404, 'text/plain', 'Unknown path ' + url.path + '\n')
+            return
+
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.getheader('Content-Length', 0))))
+        except ValueError:
+            job = None
+
+        if not isinstance(job, dict):
+            self.send(400, 'text/plain', 'Jobs must be a JSON object of command line flags and values\n')
+            return
+
+        self.run(job)
+
+    def run(self, job):
+        fmt = job.get('format', 'json')
+        if fmt not in ['json', 'tsv']:
+            self.send(400, 'text/plain', 'You must ask for either json or tsv results\n')
+            return
+
+        # unknown flags would otherwise be split up by argparse into confusing errors
+        unknown = sorted(k for k in job if k != 'format' and k not in job_flags)
+        if unknown:
+            self.send(400, 'text/plain', 'Unknown flag ' + ', '.join(unknown) + '. Jobs take the flags of gagfinder.py\n')
+            return
+
+        # GAGfinder reports its progress and argument errors by printing, so keep what it prints for error messages
+        log = StringIO()
+        sys.stdout, sys.stderr = log, log
+        start = time.time()
+        failed = None
+        try:
+            params, rows = run_job(job_args(job), server_state['state'])
+        except SystemExit:
+            params = None
+        except Exception as e:
+            params = None
+            failed = e
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+
+        if failed is not None:
+            self.send(500, 'text/plain', 'Job failed: ' + repr(failed) + '\n')
+            return
+
+        if params is None:
+            lines = [q for q in log.getvalue().splitlines() if q.strip()]
+            self.send(400, 'text/plain', (lines[-1] if lines else 'Invalid job') + '\n')
+            return
+
+        server_state['jobs'] += 1
+        print "Job %i: %s, m/z %s, charge %s, %i results in %.1f ms" % (server_state['jobs'], params[0], params[8], params[9], len(rows), 1000. * (time.time() - start))
+
+        if fmt == 'tsv':
+            self.send(200, 'text/tab-separated-values', ''.join(result_tsv(rows)))
+        else:
+            self.send(200, 'application/json', result_json(params[0], rows))
+
+    def send(self, code, content_type, body):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'unix' # Unix socket clients have no address
+
+    def log_message(self, format, *args):
+        pass # jobs are reported by run
+
+# HTTP server on a Unix socket rather than a TCP port
+class UnixHTTPServer(BaseHTTPServer.HTTPServer):
+
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        SocketServer.TCPServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+# main function
+def main():
+	################################
+	# Step 1: check user arguments #
+	################################
+	
+	print "Checking user arguments...",
+	
+	# initiate parser
+	parser = argparse.ArgumentParser(description='Serve GAGfinder jobs over HTTP, keeping GAGfragDB and the isotope caches warm between them.')
+	
+	# add arguments
+	parser.add_argument('-p', type=int, required=False, help='Port to listen on, on localhost (optional, default 8642)')
+	parser.add_argument('-s', required=False, help='Unix socket to listen on instead of a port (optional)')
+	parser.add_argument('-d', required=False, help='GAGfragDB file (optional, default ../lib/GAGfragDB.db)')
+	parser.add_argument('-k', required=False, help='Isotopic distribution store (optional, default ../lib/GAGisoCache.db)')
+	parser.add_argument('-u', required=False, help='Load GAGfragDB into memory before serving? (y/n, optional)')
+	parser.add_argument('-f', type=int, required=False, help='Number of precursors whose fragments stay in memory (optional, default 200)')
+	parser.add_argument('-i', type=int, required=False, help='Number of isotopic distributions that stay in memory (optional, default 100000)')
+	
+	# parse arguments
+	args = parser.parse_args()
+	
+	# get arguments into proper variables
+	port   = args.p
+	sock   = args.s
+	dbFile = args.d
+	isFile = args.k
+	inMem  = args.u
+	fSize  = args.f
+	iSize  = args.i
+	
+	if not port:
+		port = 8642
+	
+	if not dbFile:
+		dbFile = '../lib/GAGfragDB.db'
+	
+	if not isFile:
+		isFile = '../lib/GAGisoCache.db'
+	
+	# check to see if the user wants GAGfragDB in memory
+	if inMem and inMem not in ['y', 'n']:
+		print "You must enter either 'y' or 'n' for whether to load GAGfragDB into memory. Try 'python server.py -h'"
+		sys.exit()
+	
+	# the server runs for a long time, so its caches forget what was used least recently
+	if fSize is None:
+		fSize = 200
+	
+	if iSize is None:
+		iSize = 100000
+	
+	if fSize < 1 or iSize < 1:
+		print "You must enter positive integers for how much to keep in memory. Try 'python server.py -h'"
+		sys.exit()
+	
+	print "Done!"
+	
+	#########################
+	# Step 2: warm up state #
+	#########################
+	
+	print "Connecting to GAGfragDB and the isotopic distribution store...",
+	
+	state = open_state(dbFile, isFile, in_memory=inMem == 'y', frag_size=fSize, iso_size=iSize)
+	server_state['state'] = state
+	
+	print "Done!"
+	
+	if inMem == 'y':
+		print_footprint(state['conn'])
+	
+	######################
+	# Step 3: serve jobs #
+	######################
+	
+	if sock:
+		# clear out a socket left behind by an earlier server
+		if os.path.exists(sock):
+			os.remove(sock)
+		
+		server = UnixHTTPServer(sock, JobHandler)
+		print "Serving jobs on " + sock
+	else:
+		server = BaseHTTPServer.HTTPServer(('127.0.0.1', port), JobHandler)
+		print "Serving jobs on http://127.0.0.1:" + str(port)
+	
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	
+	server.server_close()
+	close_state(state)
+	
+	if sock:
+		os.remove(sock)
+	
+	print "\nFinished!"
+
+# run main
+if __name__ == '__main__':
+	main()
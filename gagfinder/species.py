@@ -1,3 +1,10 @@
+# weights, formulae, modification locations and cross-ring fragment tables of GAG species;
+# run this file to rebuild species.json, which GAGfinder loads instead of importing it
+
+import os # for finding species.json
+import json # for writing species.json
+import hashlib # for telling whether species.json is stale
+
 # initialize dictionaries for weights and formulae
 wt = {}
 fm = {}
@@ -409,4 +416,70 @@ xmod['KS']['HexN']['RE']['2,4'] = {'SO3':1, 'Ac':1, 'COOH':0}
 xmod['KS']['HexN']['RE']['3,5'] = {'SO3':0, 'Ac':1, 'COOH':0}
 xmod['KS']['HexN']['NR']['0,3'] = {'SO3':0, 'Ac':1, 'COOH':0}
 xmod['KS']['HexN']['NR']['1,4'] = {'SO3':1, 'Ac':0, 'COOH':0}
-xmod['KS']['HexN']['NR']['2,5'] = {'SO3':0, 'Ac':1, 'COOH':0}
\ No newline at end of file
+xmod['KS']['HexN']['NR']['2,5'] = {'SO3':0, 'Ac':1, 'COOH':0}
+
+### cross-ring modification positions ###
+# carbon that the glycosidic bond from the non-reducing side lands on, for each class and monosaccharide
+xlink = {}
+xlink['HS'] = {'D':4, 'U':4, 'N':4} # GlcA b1-4 GlcN, GlcN a1-4 GlcA
+xlink['CS'] = {'D':4, 'U':4, 'N':3} # GlcA b1-3 GalNAc, GalNAc b1-4 GlcA
+xlink['KS'] = {'X':3, 'N':4} # Gal b1-4 GlcNAc, GlcNAc b1-3 Gal
+
+# names of the monosaccharides in the cross-ring tables
+xname = {'D':'dHexA', 'U':'HexA', 'X':'Hex', 'N':'HexN'}
+
+# function for getting the positions that one portion of an a,b cross-ring cleavage keeps; ring atoms run from
+# O5 (0) to C5 (5), with C6 on C5, and the NR portion holds the linked carbon while the RE portion holds C1
+def xkept(clv, end, link, positions):
+	a, b  = [int(q) for q in clv.split(',')]
+	inner = range(a+1, b+1) # ring atoms between the two cleaved bonds
+	hold  = link if end == 'NR' else 1
+	
+	if hold in inner:
+		piece = inner
+	else:
+		piece = [q for q in range(6) if q not in inner]
+	
+	# return
+	return [pos for pos in positions if min(pos, 5) in piece]
+
+# positions of each cross-ring portion that keep their modifications, for the cleavages GAGfinder looks for
+xloc = {}
+for gc in xlink:
+	xloc[gc] = {}
+	for ms in xlink[gc]:
+		positions = sorted(set(pos for locs in modlocs[gc][ms].values() for pos in locs))
+		cleaves   = xmod[gc][xname[ms]]
+		
+		xloc[gc][ms] = {}
+		for end in cleaves:
+			xloc[gc][ms][end] = dict((clv, xkept(clv, end, xlink[gc][ms], positions)) for clv in cleaves[end])
+
+# names of the tables that species.json holds
+TABLES = ['wt', 'fm', 'modlocs', 'xwt', 'xfm', 'xmod', 'xloc']
+
+# function for getting the digest of this file, which species.json is only good for
+def source_digest():
+	f      = open(os.path.splitext(os.path.abspath(__file__))[0] + '.py', 'rb')
+	digest = hashlib.sha1(f.read()).hexdigest()
+	f.close()
+	
+	# return
+	return digest
+
+# function for getting the tables by name
+def species_tables():
+	# return
+	return dict((name, globals()[name]) for name in TABLES)
+
+# function for writing the tables to species.json
+def save_tables(path):
+	f = open(path, 'w')
+	json.dump({'digest': source_digest(), 'tables': species_tables()}, f, sort_keys=True)
+	f.close()
+
+# write species.json next to this file
+if __name__ == '__main__':
+	path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'species.json')
+	save_tables(path)
+	print "Wrote " + path
@@ -0,0 +1,365 @@
+#!/usr/bin/python
+
+# ranks where the sulfates of a GAG chain sit, by how well the fragments each placement predicts
+# walk down a GAGfinder result ordered by G-score; placements are searched site by site,
+# branches that cannot beat the best ones found so far are pruned, and the rows each placement
+# hits are kept as bitsets so that small branches are scored all at once
+
+import re # for parsing fragment labels
+import sys # for exiting on errors
+import heapq # for keeping the best placements
+from itertools import combinations # for placing acetyl groups
+
+# import numpy
+try:
+	import numpy as np
+except:
+	print "You need to install the numpy module to use this script. Please install and try again."
+	sys.exit()
+
+from formula import * # for converting compositions to strings
+from species import modlocs, xloc # sulfatable positions of each monosaccharide and of its cross-ring portions, by class
+
+# GAGfinder fragment label: composition, cross-ring cleavage, then RE, water, hydrogen and metal alterations
+LABEL = re.compile(r'^([DUXNAS0-9]*)(?:\+([DUXN](?:NR|RE)\d,\d))?(?:\+RE)?(?:-H2O)?(?:-2?H)?(?:\+\d*[A-Z][a-z]?)?$')
+
+# function for getting the (composition, cross-ring cleavage) a fragment label tells about sulfate placement
+def fragment_key(label):
+	m = LABEL.match(label)
+	if m is None or not m.group(1): # precursor ions and unknown labels say nothing about placement
+		return None
+	
+	# return
+	return (m.group(1), m.group(2) or '')
+
+# function for turning (fragment labels, G-score) pairs into rows of fragment keys, best G-score first
+def score_rows(results):
+	# keep the best G-score of each set of fragments
+	best = {}
+	for labels, G in results:
+		keys = frozenset(k for k in (fragment_key(q) for q in labels) if k is not None)
+		if keys and (keys not in best or G < best[keys]):
+			best[keys] = G
+	
+	# return
+	return [keys for keys, G in sorted(best.items(), key=lambda x: x[1])]
+
+# function for reading (fragment labels, G-score) pairs from a GAGfinder TSV file
+def read_scores(tsv_path):
+	f = open(tsv_path, 'r')
+	f.readline() # header
+	
+	results = []
+	for line in f:
+		cells = line.rstrip('\r\n').split('\t')
+		if len(cells) < 5:
+			continue
+		
+		results.append((cells[3].split('; '), float(cells[4])))
+	
+	f.close()
+	
+	# return
+	return score_rows(results)
+
+# function for getting the sulfatable (residue, position) sites of a backbone, from the non-reducing end
+def chain_sites(gag_class, backbone, acetylated=()):
+	sites = []
+	for r, ms in enumerate(backbone):
+		for pos in modlocs[gag_class][ms].get('SO3', []):
+			# an acetylated HexN has no room for a sulfate at its acetyl position
+			if r in acetylated and pos in modlocs[gag_class][ms].get('Ac', []):
+				continue
+			
+			sites.append((r, pos))
+	
+	# return
+	return sites
+
+# function for the enrichment walk of many placements at once: the longest run up the table,
+# +1 for each row a placement hits and -1 for each row it misses or that was skipped before it
+def walk_scores(hits, gaps):
+	steps = np.where(hits, 1, -1) - gaps
+	
+	# return
+	return np.maximum(np.cumsum(steps, axis=1).max(axis=1), 0) if steps.shape[1] else np.zeros(len(hits), dtype=int)
+
+# function for the number of ways of picking k of n
+def n_choose(n, k):
+	c = 1
+	for j in range(min(k, n-k)):
+		c = c * (n-j) / (j+1)
+	
+	# return
+	return c
+
+# function for labeling a placement as residue-position pairs, counting residues from 1 at the non-reducing end
+def structure_label(sulfated, acetylated):
+	marks = [(r, str(pos) + 'S') for r, pos in sulfated] + [(r, 'Ac') for r in acetylated]
+	
+	# return
+	return ','.join(str(r+1) + '-' + m for r, m in sorted(marks))
+
+# the best scoring items seen so far, kept in a bounded heap
+class TopList(object):
+
+    def __init__(self, top):
+        self.top = top
+        self.heap = [] # (score, -order, item), so that ties go to the item seen first
+        self.order = 0
+
+    def push(self, score, item):
+        entry = (score, -self.order, item)
+        self.order += 1
+        if len(self.heap) < self.top:
+            heapq.heappush(self.heap, entry)
+        elif self.heap and entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def full(self):
+        return len(self.heap) >= self.top
+
+    def floor(self):
+        # lowest score an item needs to beat to get on the list
+        return self.heap[0][0] if self.heap else None
+
+    def items(self):
+        return [(score, item) for score, order, item in sorted(self.heap, reverse=True)]
+
+# fragments of one part of a chain whose composition only depends on how many of its sites are sulfated
+class FragmentGroup(object):
+
+    def __init__(self, deps, keys):
+        self.deps = deps # indices of the sites that decide the sulfate count
+        self.keys = keys # fragment keys at each sulfate count
+
+# search for the sulfate placements of a chain whose predicted fragments walk furthest down a G-score table
+class SulfationSearch(object):
+
+    def __init__(self, gag_class, backbone, n_so3, rows, loss=0, acetylated=()):
+        self.backbone = backbone
+        self.n_so3 = n_so3
+        self.acetylated = tuple(sorted(acetylated))
+        self.sites = chain_sites(gag_class, backbone, self.acetylated)
+        self.groups = self.make_groups(gag_class, loss)
+
+        # fragment keys as integer IDs
+        self.key_ids = {}
+        group_ids = [[[self.key_ids.setdefault(k, len(self.key_ids)) for k in keys] for keys in g.keys] for g in self.groups]
+
+        # only rows that some placement could hit change the walk; the rest just cost a step each
+        gaps = []
+        hit_rows = []
+        gap = 0
+        for keys in rows:
+            ids = [self.key_ids[k] for k in keys if k in self.key_ids]
+            if ids:
+                gaps.append(gap)
+                hit_rows.append(ids)
+                gap = 0
+            else:
+                gap += 1
+
+        self.gaps = np.array(gaps, dtype=int)
+        n_steps = len(gaps)
+
+        # which rows each fragment key shows up in
+        key_rows = np.zeros((len(self.key_ids), n_steps), dtype=bool)
+        for n, ids in enumerate(hit_rows):
+            key_rows[ids, n] = True
+
+        # rows hit by each group at each sulfate count, as bitsets of eight rows a byte
+        self.hits = [np.packbits(np.array([key_rows[ids].any(axis=0) for ids in g_ids], dtype=bool).reshape(len(g_ids), n_steps), axis=1) for g_ids in group_ids]
+
+        # sites that decide the sulfate count of each group
+        self.deps = np.zeros((len(self.sites), len(self.groups)), dtype=int)
+        for n, g in enumerate(self.groups):
+            self.deps[g.deps, n] = 1
+
+        # groups that every site belongs to, and the groups each site is the last undecided one of
+        self.site_groups = [[] for s in self.sites]
+        self.done_at = [[] for s in self.sites]
+        self.fixed = [] # groups with no sites, whose fragments every placement predicts
+        for n, g in enumerate(self.groups):
+            for s in g.deps:
+                self.site_groups[s].append(n)
+
+            if g.deps:
+                self.done_at[max(g.deps)].append(n)
+            else:
+                self.fixed.append(n)
+
+        self.spans = {} # rows hit by each group over a range of sulfate counts
+
+    def make_groups(self, gag_class, loss):
+        n = len(self.backbone)
+        site_at = {}
+        for s, site in enumerate(self.sites):
+            site_at.setdefault(site[0], []).append(s)
+
+        groups = []
+        for nn in range(1, n):
+            for i in range(n - nn + 1):
+                residues = range(i, i+nn)
+                comp = {'D':0, 'U':0, 'X':0, 'N':0, 'A':0, 'S':0}
+                for r in residues:
+                    comp[self.backbone[r]] += 1
+                    comp['A'] += r in self.acetylated
+
+                deps = [s for r in residues for s in site_at.get(r, [])]
+
+                ## glycosidic fragments
+                groups.append(FragmentGroup(deps, self.group_keys(comp, len(deps), '', loss)))
+
+                ## cross-ring fragments, cleaved in the residue next to the non-reducing or reducing end piece
+                if i == 0:
+                    addto, end = nn, 'NR'
+                elif i == n - nn:
+                    addto, end = i-1, 'RE'
+                else:
+                    continue
+
+                ms = self.backbone[addto]
+                cleaves = xloc[gag_class][ms].get(end, {})
+                for clv in sorted(cleaves):
+                    kept = cleaves[clv]
+                    x_comp = dict(comp)
+                    x_comp['A'] += addto in self.acetylated and 2 in kept
+                    x_deps = deps + [s for s in site_at.get(addto, []) if self.sites[s][1] in kept]
+
+                    groups.append(FragmentGroup(x_deps, self.group_keys(x_comp, len(x_deps), ms + end + clv, loss)))
+
+        return groups
+
+    def group_keys(self, comp, n_deps, xr_info, loss):
+        keys = []
+        for c in range(n_deps+1):
+            ks = set()
+            for so in range(loss+1):
+                fc = dict(comp)
+                fc['S'] = max(0, c - so)
+                ks.add((dict2fmla(fc, 'composition'), xr_info))
+            keys.append(frozenset(ks))
+
+        return keys
+
+    def walk(self, bits):
+        # enrichment walk of each placement from the bitsets of the rows it hits
+        return walk_scores(np.unpackbits(np.atleast_2d(bits), axis=1)[:, :len(self.gaps)].astype(bool), self.gaps)
+
+    def span(self, g, lo, hi):
+        key = (g, lo, hi)
+        if key not in self.spans:
+            self.spans[key] = np.bitwise_or.reduce(self.hits[g][lo:hi+1], axis=0)
+
+        return self.spans[key]
+
+    def bound(self, depth, left, hit, count):
+        # every row that any way of placing the remaining sulfates could still hit
+        free = len(self.sites) - depth
+        rows = [hit]
+        for g, c in enumerate(count):
+            if c is not None:
+                k, u = c
+                rows.append(self.span(g, k + max(0, left - (free - u)), k + min(u, left)))
+
+        return self.walk(np.bitwise_or.reduce(rows, axis=0))[0]
+
+    def score(self, placements):
+        # sulfate count of every group under each placement, then every row each placement hits
+        chosen = np.zeros((len(placements), len(self.sites)), dtype=int)
+        for n, placed in enumerate(placements):
+            chosen[n, list(placed)] = 1
+
+        counts = chosen.dot(self.deps)
+        bits = np.zeros((len(placements), (len(self.gaps) + 7) // 8), dtype=np.uint8)
+        for g, m in enumerate(self.hits):
+            bits |= m[counts[:, g]]
+
+        return self.walk(bits)
+
+    def keep(self, placements):
+        # score a batch of finished placements at once and keep the best ones
+        for placed, sc in zip(placements, self.score(placements)):
+            self.best.push(int(sc), (self, placed))
+
+    def label(self, placed):
+        return structure_label([self.sites[s] for s in placed], self.acetylated)
+
+    def rank(self, best, batch=16):
+        # best is a TopList of (search, sulfated sites), which can be shared with the searches of other chains
+        self.best = best
+        self.chosen = []
+        self.batch = batch
+        if self.n_so3 > len(self.sites) or best.top < 1:
+            return
+
+        # (sulfates decided so far, sites still undecided) of each group, or None once it is decided
+        self.count = [[0, len(g.deps)] for g in self.groups]
+        hit = np.zeros((len(self.gaps) + 7) // 8, dtype=np.uint8)
+        for g in self.fixed:
+            hit = hit | self.hits[g][0]
+            self.count[g] = None
+
+        self.place(0, self.n_so3, hit)
+
+    def place(self, depth, left, hit):
+        n_sites = len(self.sites)
+        free = n_sites - depth
+        if left == 0 or left == free:
+            # the rest of the sites are forced, so the placement is done
+            fill = range(depth, n_sites) if left else []
+            self.keep([tuple(self.chosen + fill)])
+            return
+
+        # prune when even the best completion cannot make the list
+        if self.best.full() and self.bound(depth, left, hit, self.count) <= self.best.floor():
+            return
+
+        # score every completion of a small enough branch at once
+        if n_choose(free, left) <= self.batch:
+            self.keep([tuple(self.chosen) + rest for rest in combinations(range(depth, n_sites), left)])
+            return
+
+        # sulfate this site first, then leave it bare
+        for on in [1, 0]:
+            for g in self.site_groups[depth]:
+                self.count[g][0] += on
+                self.count[g][1] -= 1
+
+            done = self.done_at[depth]
+            saved = [self.count[g] for g in done]
+            new_hit = hit
+            for g in done:
+                new_hit = new_hit | self.hits[g][self.count[g][0]]
+                self.count[g] = None
+
+            if on:
+                self.chosen.append(depth)
+            self.place(depth+1, left-on, new_hit)
+            if on:
+                self.chosen.pop()
+
+            for g, c in zip(done, saved):
+                self.count[g] = c
+            for g in self.site_groups[depth]:
+                self.count[g][0] -= on
+                self.count[g][1] += 1
+
+# function for ranking the sulfate placements of a chain, over every placement of its acetyl groups
+def rank_sulfation(gag_class, backbone, n_so3, n_ac, rows, loss=0, top=10, best=None):
+	# residues that can carry an acetyl group
+	ac_res = [r for r, ms in enumerate(backbone) if 'Ac' in modlocs[gag_class][ms]]
+	if n_ac > len(ac_res):
+		print "The backbone " + backbone + " cannot hold " + str(n_ac) + " acetyl groups."
+		sys.exit()
+	
+	# placements of every acetylation compete for one list
+	if best is None:
+		best = TopList(top)
+	
+	for acetylated in combinations(ac_res, n_ac):
+		SulfationSearch(gag_class, backbone, n_so3, rows, loss, acetylated).rank(best)
+	
+	# return
+	return [(score, search.label(placed)) for score, (search, placed) in best.items()]
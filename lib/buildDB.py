@@ -0,0 +1,1367 @@
+#!/usr/bin/python
+
+# builds the Fragments and ChildFragments tables of GAGfragDB for every HS/heparin, CS/DS and KS precursor
+# in memory, sharded over worker processes, then writes them, and any new cross-ring formulae, in one transaction
+
+# imports
+import sqlite3 as sq
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp # for generating shards in parallel
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gagfinder'))
+from formula import * # for converting chemical formulae to dictionaries and vice versa
+from species import *
+from migrateDB import indexes, retired # indexes that are dropped before the fragments are written and created again afterwards
+
+# function for making dictionary of formula/composition
+def makeDict (type, D=0, U=0, X=0, N=0, A=0, S=0):
+	if type == 'formula':
+		dc      = {'C':0, 'H':0, 'O':0, 'N':0, 'S':0}
+		dc['C'] = D*fm['dHexA']['C'] + U*fm['HexA']['C'] + X*fm['Hex']['C'] + N*fm['HexN']['C'] + A*fm['Ac']['C']
+		dc['H'] = D*fm['dHexA']['H'] + U*fm['HexA']['H'] + X*fm['Hex']['H'] + N*fm['HexN']['H'] + A*fm['Ac']['H'] - ((D+U+X+N-1)*fm['H2O']['H'])
+		dc['O'] = D*fm['dHexA']['O'] + U*fm['HexA']['O'] + X*fm['Hex']['O'] + N*fm['HexN']['O'] + A*fm['Ac']['O'] + S*fm['SO3']['O'] - ((D+U+X+N-1)*fm['H2O']['O'])
+		dc['N'] = N*fm['HexN']['N']
+		dc['S'] = S*fm['SO3']['S']
+	else: # type is composition
+		dc = {'D':D, 'U':U, 'X':X, 'N':N, 'A':A, 'S':S}
+	
+	# return
+	return dc
+
+# fragments of one shard of precursors, by composition, without GAGfragDB ids
+class FragmentShard(object):
+
+    def __init__(self, formulae):
+        self.formulae = set(formulae) # formula values in GAGfragDB or added by this shard
+        self.fragments = set()
+        self.new = [] # (composition, formula, weight) of each new fragment or formula, in order
+        self.children = [] # (precursor map id, composition) of each child fragment
+
+    def add(self, mapId, cstr, f, w=None):
+        fstr = dict2fmla(f, 'formula')
+
+        # only the first sighting of a formula or fragment can give it an id
+        if fstr not in self.formulae or cstr not in self.fragments:
+            self.formulae.add(fstr)
+            self.fragments.add(cstr)
+            self.new.append((cstr, fstr, w))
+
+        self.children.append((mapId, cstr))
+
+    def result(self):
+        return [self.new, self.children]
+
+# fragment tables of GAGfragDB, merged from shards in precursor order so ids do not depend on the sharding
+class FragmentTables(object):
+
+    def __init__(self, conn):
+        self.conn = conn
+
+        # formulae already in GAGfragDB, by value
+        self.formulae = dict((value, id) for id, value in conn.execute('SELECT id, value FROM Formulae;'))
+        self.next_fm = conn.execute('SELECT COALESCE(MAX(id), 0) FROM Formulae;').fetchone()[0] + 1
+
+        self.fragments = {} # fragment ids, by composition
+        self.n_children = 0
+
+    def merge(self, result):
+        new, children = result
+        new_formulae = []
+        new_fragments = []
+        for cstr, fstr, w in new:
+            # glycosidic formulae have to be in GAGfragDB already, cross-ring ones are added with their weight
+            if fstr not in self.formulae:
+                if w is None:
+                    print "\nFormula " + fstr + " of fragment " + cstr + " is not in GAGfragDB."
+                    sys.exit()
+
+                self.formulae[fstr] = self.next_fm
+                new_formulae.append((self.next_fm, fstr, w))
+                self.next_fm += 1
+
+            if cstr not in self.fragments:
+                self.fragments[cstr] = len(self.fragments) + 1
+                new_fragments.append((self.fragments[cstr], cstr, self.formulae[fstr]))
+
+        # bulk-load the shard
+        self.conn.executemany('INSERT INTO Formulae (id, value, monoMass) VALUES (?,?,?);', new_formulae)
+        self.conn.executemany('INSERT INTO Fragments (id, value, fmId) VALUES (?,?,?);', new_fragments)
+        self.conn.executemany('INSERT INTO ChildFragments (cpId, frId) VALUES (?,?);', ((mapId, self.fragments[cstr]) for mapId, cstr in children))
+
+        self.n_children += len(children)
+
+# function for adding the glycosidic and cross-ring fragments of a HS/heparin precursor
+def hs_frags(mapId, fmla, add):
+	# convert formula to dictionary
+	cp = fmla2dict(fmla, 'composition')
+	
+	# get precursor info
+	n_pre   = cp['D'] + cp['U'] + cp['N']
+	
+	# initialize variable that denotes length of fragment
+	nn = 1
+	
+	########################
+	# GLYCOSIDIC FRAGMENTS #
+	########################
+	
+	# loop through all fragment sizes smaller than full molecule
+	while nn < n_pre:
+		if nn % 2 == 0: # equal number of HexA/dHexA and HexN
+			eq = nn/2
+			
+			for j in range(max(0, cp['A'] - cp['N'] + eq), (min(cp['A'], eq)+1)): # go through Ac possibilities
+				for k in range(max(0, cp['S'] - (3*cp['N'] + cp['D'] + cp['U']) + (eq*4)),(min(cp['S'],(eq*4)-j)+1)): # go through SO3 possibilities
+					for l in range(max(0, eq-cp['U']),cp['D']+1): # go through dHexA possibilities
+						# chemical formula
+						f = makeDict('formula', D=l, U=eq-l, X=0, N=eq, A=j, S=k)
+						
+						# composition
+						cp2 = makeDict('composition', D=l, U=eq-l, X=0, N=eq, A=j, S=k)
+						
+						# add fragment as a child
+						add(mapId, dict2fmla(cp2, 'composition'), f)
+		else: # unequal number of dHexA/HexA and HexN
+			sm = nn/2     # smaller number
+			bg = (nn/2)+1 # bigger number
+			
+			# HexN > HexA
+			for j in range((max(0, cp['A'] - cp['N'] + bg)),(min(cp['A'],bg)+1)): # go through Ac possibilities
+				for k in range(max(0, cp['S'] - (3*cp['N'] + cp['D'] + cp['U']) + (bg*3 + sm)),(min(cp['S'],(bg*3 + sm)-j)+1)): # go through SO3 possibilities
+					# chemical formula
+					f = makeDict('formula', D=0, U=sm, X=0, N=bg, A=j, S=k)
+					
+					# composition
+					cp2 = makeDict('composition', D=0, U=sm, X=0, N=bg, A=j, S=k)
+					
+					# add fragment as a child
+					add(mapId, dict2fmla(cp2, 'composition'), f)
+			
+			# HexA > HexN
+			for j in range((max(0, cp['A'] - cp['N'] + sm)),(min(cp['A'],sm)+1)): # go through Ac possibilities
+				for k in range(max(0, cp['S'] - (3*cp['N'] + cp['D'] + cp['U']) + (sm*3 + bg)),(min(cp['S'],(sm*3 + bg)-j)+1)): # go through SO3 possibilities
+					for l in range(max(0, bg-cp['U']),cp['D']+1): # go through dHexA possibilities
+						# chemical formula
+						f = makeDict('formula', D=l, U=bg-l, X=0, N=sm, A=j, S=k)
+						
+						# composition
+						cp2 = makeDict('composition', D=l, U=bg-l, X=0, N=sm, A=j, S=k)
+						
+						# add fragment as a child
+						add(mapId, dict2fmla(cp2, 'composition'), f)
+		
+		nn += 1
+
+	########################
+	# CROSS-RING FRAGMENTS #
+	########################
+	nn = 1
+	
+	# loop through all fragment sizes smaller than full molecule
+	while nn < n_pre:
+		if cp['D'] == 0: # no dHexA in the molecule
+			if nn % 2 == 0: # equal number of HexA and HexN in fragment
+				eq = nn/2
+				
+				if n_pre % 2 == 0: # equal number of HexA and HexN in precursor
+					for x in ['HexA', 'HexN']: # cycle through the monosaccharides to be added to
+						# get letters for the formula
+						if x == 'HexA':
+							fval = 'U'
+						else:
+							fval = 'N'
+						
+						for y in ['NR', 'RE']: # cycle through the ends
+							for z in xmod['HS'][x][y]: # cycle through the cross-ring cleavage possibilities
+								ext = xmod['HS'][x][y][z]
+								for j in range(max(0, cp['A'] - cp['N'] + eq + ext['Ac']), min(cp['A'], eq + ext['Ac'])+1): # go through Ac possibilities
+									for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U']) + (eq*4) + ext['SO3']), min(cp['S'], (eq*4) + ext['SO3'] - j)+1): # go through SO3 possibilities
+										# chemical formula
+										f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+										
+										# add necessary x-ring values
+										for sym in 'CHONS':
+											f[sym] += xfm[x][y][z][sym]
+										
+										# remove one water
+										f['H'] -= 2
+										f['O'] -= 1
+										
+										# monoisotopic weight
+										w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+										
+										# composition
+										cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+										
+										# add fragment as a child
+										add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+				else: # unequal number of HexA and HexN in precursor
+					# get ends
+					if cp['U'] > cp['N']:
+						x    = 'HexA'
+						fval = 'U'
+					else:
+						x    = 'HexN'
+						fval = 'N'
+					
+					# see if we're only looking at fragments that cut into ends or not
+					if nn < (n_pre-1): # fragments don't cut into ends just yet
+						for x in ['HexA', 'HexN']: # cycle through the monosaccharides to be added to
+							# get letters for the formula
+							if x == 'HexA':
+								fval = 'U'
+							else:
+								fval = 'N'
+							
+							for y in ['NR', 'RE']: # cycle through the ends
+								for z in xmod['HS'][x][y]: # cycle through the cross-ring cleavage possibilities
+									ext = xmod['HS'][x][y][z]
+									for j in range(max(0, cp['A'] - cp['N'] + eq + ext['Ac']), min(cp['A'], eq + ext['Ac'])+1): # go through Ac possibilities
+										for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U']) + (eq*4) + ext['SO3']), min(cp['S'], (eq*4) + ext['SO3'] - j)+1): # go through SO3 possibilities
+											# chemical formula
+											f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+											
+											# add necessary x-ring values
+											for sym in 'CHONS':
+												f[sym] += xfm[x][y][z][sym]
+											
+											# remove one water
+											f['H'] -= 2
+											f['O'] -= 1
+											
+											# monoisotopic weight
+											w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+											
+											# composition
+											cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+											
+											# add fragment as a child
+											add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+					else: # fragments cut into ends
+						# get letters for the formula
+						if cp['U'] > cp['N']:
+							x    = 'HexA'
+							fval = 'U'
+						else:
+							x    = 'HexN'
+							fval = 'N'
+						
+						for y in ['NR', 'RE']: # cycle through the ends
+							for z in xmod['HS'][x][y]: # cycle through the cross-ring cleavage possibilities
+								ext = xmod['HS'][x][y][z]
+								for j in range(max(0, cp['A'] - cp['N'] + eq + ext['Ac']), min(cp['A'], eq + ext['Ac'])+1): # go through Ac possibilities
+									for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U']) + (eq*4) + ext['SO3']), min(cp['S'], (eq*4) + ext['SO3'] - j)+1): # go through SO3 possibilities
+										# chemical formula
+										f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+										
+										# add necessary x-ring values
+										for sym in 'CHONS':
+											f[sym] += xfm[x][y][z][sym]
+										
+										# remove one water
+										f['H'] -= 2
+										f['O'] -= 1
+										
+										# monoisotopic weight
+										w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+										
+										# composition
+										cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+										
+										# add fragment as a child
+										add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+			else: # unequal number of HexA and HexN in fragment
+				sm = nn/2     # smaller number
+				bg = (nn/2)+1 # bigger number
+				
+				for mas in ['HexA', 'HexN']: # get which monosaccharide there is more of
+					if mas == 'HexA':
+						x    = 'HexN'
+						fval = 'N'
+						nU   = bg
+						nN   = sm
+					else:
+						x    = 'HexA'
+						fval = 'U'
+						nU   = sm
+						nN   = bg
+					
+					for y in ['NR', 'RE']: # cycle through the ends
+						for z in xmod['HS'][x][y]: # cycle through the cross-ring cleavage possibilities
+							ext = xmod['HS'][x][y][z]
+							for j in range(max(0, cp['A'] - cp['N'] + nN + ext['Ac']), min(cp['A'], nN + ext['Ac'])+1): # go through Ac possibilities
+								for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U']) + nU + (3*nN) + ext['SO3']), min(cp['S'], nU + (3*nN) + ext['SO3'] - j)+1): # go through SO3 possibilities
+									# chemical formula
+									f = makeDict('formula', D=0, U=nU, X=0, N=nN, A=j, S=k)
+									
+									# add necessary x-ring values
+									for sym in 'CHONS':
+										f[sym] += xfm[x][y][z][sym]
+									
+									# remove one water
+									f['H'] -= 2
+									f['O'] -= 1
+									
+									# monoisotopic weight
+									w = nU*wt['monoHexA'] + nN*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+									
+									# composition
+									cp2 = makeDict('composition', D=0, U=nU, X=0, N=nN, A=j, S=k)
+									
+									# add fragment as a child
+									add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+		else: # one dHexA in the molecule
+			if nn % 2 == 0: # equal number of dHexA/HexA and HexN in fragment
+				eq = nn/2
+				
+				## add fragments that include dHexA first
+				# includes a full dHexA
+				for z in xmod['HS']['HexA']['NR']: # cycle through the cross-ring cleavage possibilities
+					ext = xmod['HS']['HexA']['NR'][z]
+					for j in range(max(0, cp['A'] - cp['N'] + eq + ext['Ac']), min(cp['A'], eq + ext['Ac'])+1): # go through Ac possibilities
+						for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U'] + cp['D']) + (4*eq) + ext['SO3']), min(cp['S'], (4*eq) + ext['SO3'] - j)+1): # go through SO3 possibilities
+							# chemical formula
+							f = makeDict('formula', D=1, U=(eq-1), X=0, N=eq, A=j, S=k)
+							
+							# add necessary x-ring values
+							for sym in 'CHONS':
+								f[sym] += xfm['HexA']['NR'][z][sym]
+							
+							# remove one water
+							f['H'] -= 2
+							f['O'] -= 1
+							
+							# monoisotopic weight
+							w = wt['monodHexA'] + (eq-1)*wt['monoHexA'] + eq*wt['monoHexN'] + xwt['HexA']['NR'][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+							
+							# composition
+							cp2 = makeDict('composition', D=1, U=(eq-1), X=0, N=eq, A=j, S=k)
+							
+							# add fragment as a child
+							add(mapId, dict2fmla(cp2, 'composition') + '+UNR' + z, f, w)
+				
+				# cuts into dHexA
+				for z in xmod['HS']['dHexA']['RE']: # cycle through the cross-ring cleavage possibilities
+					ext = xmod['HS']['dHexA']['RE'][z]
+					for j in range(max(0, cp['A'] - cp['N'] + eq + ext['Ac']), min(cp['A'], eq + ext['Ac'])+1): # go through Ac possibilities
+						for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U'] + cp['D']) + (4*eq) + ext['SO3']), min(cp['S'], (4*eq) + ext['SO3'] - j)+1): # go through SO3 possibilities
+							# chemical formula
+							f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+							
+							# add necessary x-ring values
+							for sym in 'CHONS':
+								f[sym] += xfm['dHexA']['RE'][z][sym]
+							
+							# remove one water
+							f['H'] -= 2
+							f['O'] -= 1
+							
+							# monoisotopic weight
+							w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt['dHexA']['RE'][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+							
+							# composition
+							cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+							
+							# add fragment as a child
+							add(mapId, dict2fmla(cp2, 'composition') + '+DRE' + z, f, w)
+				
+				## add fragments that don't contain any dHexA
+				# smaller fragments that have any possibility, just like above
+				if nn < (n_pre-2):
+					for x in ['HexA', 'HexN']: # cycle through the monosaccharides to be added to
+						# get letters for the formula
+						if x == 'HexA':
+							fval = 'U'
+						else:
+							fval = 'N'
+						
+						for y in ['NR', 'RE']: # cycle through the ends
+							for z in xmod['HS'][x][y]: # cycle through the cross-ring cleavage possibilities
+								ext = xmod['HS'][x][y][z]
+								for j in range(max(0, cp['A'] - cp['N'] + eq + ext['Ac']), min(cp['A'], eq + ext['Ac'])+1): # go through Ac possibilities
+									for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U'] + cp['D']) + (eq*4) + ext['SO3']), min(cp['S'], (eq*4) + ext['SO3'] - j)+1): # go through SO3 possibilities
+										# chemical formula
+										f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+										
+										# add necessary x-ring values
+										for sym in 'CHONS':
+											f[sym] += xfm[x][y][z][sym]
+										
+										# remove one water
+										f['H'] -= 2
+										f['O'] -= 1
+										
+										# monoisotopic weight
+										w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+										
+										# composition
+										cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+										
+										# add fragment as a child
+										add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+				elif nn == (n_pre - 2): # only two more fragments to add
+					x    = 'HexN'
+					fval = 'N'
+					
+					for y in ['NR', 'RE']: # cycle through the ends
+						for z in xmod['HS'][x][y]: # cycle through the cross-ring cleavage possibilities
+							ext = xmod['HS'][x][y][z]
+							for j in range(max(0, cp['A'] - cp['N'] + eq + ext['Ac']), min(cp['A'], eq + ext['Ac'])+1): # go through Ac possibilities
+								for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U'] + cp['D']) + (eq*4) + ext['SO3']), min(cp['S'], (eq*4) + ext['SO3'] - j)+1): # go through SO3 possibilities
+									# chemical formula
+									f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+									
+									# add necessary x-ring values
+									for sym in 'CHONS':
+										f[sym] += xfm[x][y][z][sym]
+									
+									# remove one water
+									f['H'] -= 2
+									f['O'] -= 1
+									
+									# monoisotopic weight
+									w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+									
+									# composition
+									cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+									
+									# add fragment as a child
+									add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+			else: # unequal number of dHexA/HexA and HexN
+				sm = nn/2     # smaller number
+				bg = (nn/2)+1 # bigger number
+				
+				## add fragments that include dHexA first
+				# includes a full dHexA
+				for z in xmod['HS']['HexN']['NR']: # cycle through the cross-ring cleavage possibilities
+					ext = xmod['HS']['HexN']['NR'][z]
+					for j in range(max(0, cp['A'] - cp['N'] + sm + ext['Ac']), min(cp['A'], sm + ext['Ac'])+1): # go through Ac possibilities
+						for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U'] + cp['D']) + (3*sm + bg) + ext['SO3']), min(cp['S'], (3*sm + bg) + ext['SO3'] - j)+1): # go through SO3 possibilities
+							# chemical formula
+							f = makeDict('formula', D=1, U=(bg-1), X=0, N=sm, A=j, S=k)
+							
+							# add necessary x-ring values
+							for sym in 'CHONS':
+								f[sym] += xfm['HexN']['NR'][z][sym]
+							
+							# remove one water
+							f['H'] -= 2
+							f['O'] -= 1
+							
+							# monoisotopic weight
+							w = wt['monodHexA'] + (bg-1)*wt['monoHexA'] + sm*wt['monoHexN'] + xwt['HexN']['NR'][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+							
+							# composition
+							cp2 = makeDict('composition', D=1, U=(bg-1), X=0, N=sm, A=j, S=k)
+							
+							# add fragment as a child
+							add(mapId, dict2fmla(cp2, 'composition') + '+NNR' + z, f, w)
+				
+				# cuts into dHexA
+				for z in xmod['HS']['dHexA']['RE']: # cycle through the cross-ring cleavage possibilities
+					ext = xmod['HS']['dHexA']['RE'][z]
+					for j in range(max(0, cp['A'] - cp['N'] + bg + ext['Ac']), min(cp['A'], bg + ext['Ac'])+1): # go through Ac possibilities
+						for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U'] + cp['D']) + (3*bg + sm) + ext['SO3']), min(cp['S'], (3*bg + sm) + ext['SO3'] - j)+1): # go through SO3 possibilities
+							# chemical formula
+							f = makeDict('formula', D=0, U=sm, X=0, N=bg, A=j, S=k)
+							
+							# add necessary x-ring values
+							for sym in 'CHONS':
+								f[sym] += xfm['dHexA']['RE'][z][sym]
+							
+							# remove one water
+							f['H'] -= 2
+							f['O'] -= 1
+							
+							# monoisotopic weight
+							w = sm*wt['monoHexA'] + bg*wt['monoHexN'] + xwt['dHexA']['RE'][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+							
+							# composition
+							cp2 = makeDict('composition', D=0, U=sm, X=0, N=bg, A=j, S=k)
+							
+							# add fragment as a child
+							add(mapId, dict2fmla(cp2, 'composition') + '+DRE' + z, f, w)
+				
+				## add fragments that don't contain any dHexA
+				# smaller fragments that have any possibility, just like above
+				if nn < (n_pre-2):
+					for mas in ['HexA', 'HexN']: # get which monosaccharide there is more of
+						if mas == 'HexA':
+							x    = 'HexN'
+							fval = 'N'
+							nU   = bg
+							nN   = sm
+						else:
+							x    = 'HexA'
+							fval = 'U'
+							nU   = sm
+							nN   = bg
+						
+						for y in ['NR', 'RE']: # cycle through the ends
+							for z in xmod['HS'][x][y]: # cycle through the cross-ring cleavage possibilities
+								ext = xmod['HS'][x][y][z]
+								for j in range(max(0, cp['A'] - cp['N'] + nN + ext['Ac']), min(cp['A'], nN + ext['Ac'])+1): # go through Ac possibilities
+									for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U'] + cp['D']) + nU + (3*nN) + ext['SO3']), min(cp['S'], nU + (3*nN) + ext['SO3'] - j)+1): # go through SO3 possibilities
+										# chemical formula
+										f = makeDict('formula', D=0, U=nU, X=0, N=nN, A=j, S=k)
+										
+										# add necessary x-ring values
+										for sym in 'CHONS':
+											f[sym] += xfm[x][y][z][sym]
+										
+										# remove one water
+										f['H'] -= 2
+										f['O'] -= 1
+										
+										# monoisotopic weight
+										w = nU*wt['monoHexA'] + nN*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+										
+										# composition
+										cp2 = makeDict('composition', D=0, U=nU, X=0, N=nN, A=j, S=k)
+										
+										# add fragment as a child
+										add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+				elif nn == (n_pre - 2): # only two more fragments to add
+					# set up variables
+					x    = 'HexN'
+					fval = 'N'
+					nU   = bg
+					nN   = sm
+					y    = 'RE'
+					
+					for z in xmod['HS'][x][y]: # cycle through the cross-ring cleavage possibilities
+						ext = xmod['HS'][x][y][z]
+						for j in range(max(0, cp['A'] - cp['N'] + nN + ext['Ac']), min(cp['A'], nN + ext['Ac'])+1): # go through Ac possibilities
+							for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U'] + cp['D']) + nU + (3*nN) + ext['SO3']), min(cp['S'], nU + (3*nN) + ext['SO3'] - j)+1): # go through SO3 possibilities
+								# chemical formula
+								f = makeDict('formula', D=0, U=nU, X=0, N=nN, A=j, S=k)
+								
+								# add necessary x-ring values
+								for sym in 'CHONS':
+									f[sym] += xfm[x][y][z][sym]
+								
+								# remove one water
+								f['H'] -= 2
+								f['O'] -= 1
+								
+								# monoisotopic weight
+								w = nU*wt['monoHexA'] + nN*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+								
+								# composition
+								cp2 = makeDict('composition', D=0, U=nU, X=0, N=nN, A=j, S=k)
+								
+								# add fragment as a child
+								add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+					
+					# set up variables again
+					x    = 'HexA'
+					fval = 'U'
+					nU   = sm
+					nN   = bg
+					y    = 'NR'
+					
+					for z in xmod['HS'][x][y]: # cycle through the cross-ring cleavage possibilities
+						ext = xmod['HS'][x][y][z]
+						for j in range(max(0, cp['A'] - cp['N'] + nN + ext['Ac']), min(cp['A'], nN + ext['Ac'])+1): # go through Ac possibilities
+							for k in range(max(0, cp['S'] - (3*cp['N'] + cp['U'] + cp['D']) + nU + (3*nN) + ext['SO3']), min(cp['S'], nU + (3*nN) + ext['SO3'] - j)+1): # go through SO3 possibilities
+								# chemical formula
+								f = makeDict('formula', D=0, U=nU, X=0, N=nN, A=j, S=k)
+								
+								# add necessary x-ring values
+								for sym in 'CHONS':
+									f[sym] += xfm[x][y][z][sym]
+								
+								# remove one water
+								f['H'] -= 2
+								f['O'] -= 1
+								
+								# monoisotopic weight
+								w = nU*wt['monoHexA'] + nN*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+								
+								# composition
+								cp2 = makeDict('composition', D=0, U=nU, X=0, N=nN, A=j, S=k)
+								
+								# add fragment as a child
+								add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+		nn += 1
+
+# function for adding the glycosidic and cross-ring fragments of a CS/DS precursor
+def cs_frags(mapId, fmla, add):
+	# convert formula to dictionary
+	cp = fmla2dict(fmla, 'composition')
+	
+	# get precursor info
+	n_pre   = cp['D'] + cp['U'] + cp['N']
+	
+	# initialize variable that denotes length of fragment
+	nn = 1
+	
+	########################
+	# GLYCOSIDIC FRAGMENTS #
+	########################
+	
+	# loop through all fragment sizes smaller than full molecule
+	while nn < n_pre:
+		if nn % 2 == 0: # equal number of HexA/dHexA and HexN
+			eq = nn/2
+			
+			j = eq # each HexN will be acetylated
+			for k in range(max(0, cp['S'] - (2*cp['N'] + cp['D'] + cp['U']) + (eq*3)),(min(cp['S'],(eq*3))+1)): # go through SO3 possibilities
+				for l in range(max(0, eq-cp['U']),cp['D']+1): # go through dHexA possibilities
+					# chemical formula
+					f = makeDict('formula', D=l, U=eq-l, X=0, N=eq, A=j, S=k)
+					
+					# composition
+					cp2 = makeDict('composition', D=l, U=eq-l, X=0, N=eq, A=j, S=k)
+					
+					# add fragment as a child
+					add(mapId, dict2fmla(cp2, 'composition'), f)
+		else: # unequal number of dHexA/HexA and HexN
+			sm = nn/2     # smaller number
+			bg = (nn/2)+1 # bigger number
+			
+			# HexN > HexA
+			j = bg # each HexN will be acetylated
+			for k in range(max(0, cp['S'] - (2*cp['N'] + cp['D'] + cp['U']) + (bg*2 + sm)),(min(cp['S'],(bg*2 + sm))+1)): # go through SO3 possibilities
+				# chemical formula
+				f = makeDict('formula', D=0, U=sm, X=0, N=bg, A=j, S=k)
+				
+				# composition
+				cp2 = makeDict('composition', D=0, U=sm, X=0, N=bg, A=j, S=k)
+				
+				# add fragment as a child
+				add(mapId, dict2fmla(cp2, 'composition'), f)
+			
+			# HexA > HexN
+			j = sm  # each HexN will be acetylated
+			for k in range(max(0, cp['S'] - (2*cp['N'] + cp['D'] + cp['U']) + (sm*2 + bg)),(min(cp['S'],(sm*2 + bg))+1)): # go through SO3 possibilities
+				for l in range(max(0, bg-cp['U']),cp['D']+1): # go through dHexA possibilities
+					# chemical formula
+					f = makeDict('formula', D=l, U=bg-l, X=0, N=sm, A=j, S=k)
+					
+					# composition
+					cp2 = makeDict('composition', D=l, U=bg-l, X=0, N=sm, A=j, S=k)
+					
+					# add fragment as a child
+					add(mapId, dict2fmla(cp2, 'composition'), f)
+		
+		nn += 1
+
+	########################
+	# CROSS-RING FRAGMENTS #
+	########################
+	nn = 1
+	
+	# loop through all fragment sizes smaller than full molecule
+	while nn < n_pre:
+		if cp['D'] == 0: # no dHexA in the molecule
+			if nn % 2 == 0: # equal number of HexA and HexN in fragment
+				eq = nn/2
+				
+				if n_pre % 2 == 0: # equal number of HexA and HexN in precursor
+					for x in ['HexA', 'HexN']: # cycle through the monosaccharides to be added to
+						# get letters for the formula
+						if x == 'HexA':
+							fval = 'U'
+						else:
+							fval = 'N'
+						
+						for y in ['NR', 'RE']: # cycle through the ends
+							for z in xmod['CS'][x][y]: # cycle through the cross-ring cleavage possibilities
+								ext = xmod['CS'][x][y][z]
+								j = eq + ext['Ac'] # each HexN will be acetylated
+								for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U']) + (eq*3) + ext['SO3']), min(cp['S'], (eq*3) + ext['SO3'])+1): # go through SO3 possibilities
+									# chemical formula
+									f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+									
+									# add necessary x-ring values
+									for sym in 'CHONS':
+										f[sym] += xfm[x][y][z][sym]
+									
+									# monoisotopic weight
+									w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+									
+									# composition
+									cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+									
+									# add fragment as a child
+									add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+				else: # unequal number of HexA and HexN in precursor
+					# get ends
+					if cp['U'] > cp['N']:
+						x    = 'HexA'
+						fval = 'U'
+					else:
+						x    = 'HexN'
+						fval = 'N'
+					
+					# see if we're only looking at fragments that cut into ends or not
+					if nn < (n_pre-1): # fragments don't cut into ends just yet
+						for x in ['HexA', 'HexN']: # cycle through the monosaccharides to be added to
+							# get letters for the formula
+							if x == 'HexA':
+								fval = 'U'
+							else:
+								fval = 'N'
+							
+							for y in ['NR', 'RE']: # cycle through the ends
+								for z in xmod['CS'][x][y]: # cycle through the cross-ring cleavage possibilities
+									ext = xmod['CS'][x][y][z]
+									j = eq + ext['Ac'] # each HexN will be acetylated
+									for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U']) + (eq*3) + ext['SO3']), min(cp['S'], (eq*3) + ext['SO3'])+1): # go through SO3 possibilities
+										# chemical formula
+										f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+										
+										# add necessary x-ring values
+										for sym in 'CHONS':
+											f[sym] += xfm[x][y][z][sym]
+										
+										# monoisotopic weight
+										w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+										
+										# composition
+										cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+										
+										# add fragment as a child
+										add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+					else: # fragments cut into ends
+						# get letters for the formula
+						if cp['U'] > cp['N']:
+							x    = 'HexA'
+							fval = 'U'
+						else:
+							x    = 'HexN'
+							fval = 'N'
+						
+						for y in ['NR', 'RE']: # cycle through the ends
+							for z in xmod['CS'][x][y]: # cycle through the cross-ring cleavage possibilities
+								ext = xmod['CS'][x][y][z]
+								j = eq + ext['Ac'] # each HexN will be acetylated
+								for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U']) + (eq*3) + ext['SO3']), min(cp['S'], (eq*3) + ext['SO3'])+1): # go through SO3 possibilities
+									# chemical formula
+									f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+									
+									# add necessary x-ring values
+									for sym in 'CHONS':
+										f[sym] += xfm[x][y][z][sym]
+									
+									# monoisotopic weight
+									w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+									
+									# composition
+									cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+									
+									# add fragment as a child
+									add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+			else: # unequal number of HexA and HexN in fragment
+				sm = nn/2     # smaller number
+				bg = (nn/2)+1 # bigger number
+				
+				for mas in ['HexA', 'HexN']: # get which monosaccharide there is more of
+					if mas == 'HexA':
+						x    = 'HexN'
+						fval = 'N'
+						nU   = bg
+						nN   = sm
+					else:
+						x    = 'HexA'
+						fval = 'U'
+						nU   = sm
+						nN   = bg
+					
+					for y in ['NR', 'RE']: # cycle through the ends
+						for z in xmod['CS'][x][y]: # cycle through the cross-ring cleavage possibilities
+							ext = xmod['CS'][x][y][z]
+							j = nN + ext['Ac'] # each HexN will be acetylated
+							for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U']) + nU + (2*nN) + ext['SO3']), min(cp['S'], nU + (2*nN) + ext['SO3'])+1): # go through SO3 possibilities
+								# chemical formula
+								f = makeDict('formula', D=0, U=nU, X=0, N=nN, A=j, S=k)
+								
+								# add necessary x-ring values
+								for sym in 'CHONS':
+									f[sym] += xfm[x][y][z][sym]
+								
+								# monoisotopic weight
+								w = nU*wt['monoHexA'] + nN*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+								
+								# composition
+								cp2 = makeDict('composition', D=0, U=nU, X=0, N=nN, A=j, S=k)
+								
+								# add fragment as a child
+								add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+		else: # one dHexA in the molecule
+			if nn % 2 == 0: # equal number of dHexA/HexA and HexN in fragment
+				eq = nn/2
+				
+				## add fragments that include dHexA first
+				# includes a full dHexA
+				for z in xmod['CS']['HexA']['NR']: # cycle through the cross-ring cleavage possibilities
+					ext = xmod['CS']['HexA']['NR'][z]
+					j = eq + ext['Ac'] # each HexN will be acetylated
+					for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U'] + cp['D']) + (3*eq) + ext['SO3']), min(cp['S'], (3*eq) + ext['SO3'])+1): # go through SO3 possibilities
+						# chemical formula
+						f = makeDict('formula', D=1, U=(eq-1), X=0, N=eq, A=j, S=k)
+						
+						# add necessary x-ring values
+						for sym in 'CHONS':
+							f[sym] += xfm['HexA']['NR'][z][sym]
+						
+						# monoisotopic weight
+						w = wt['monodHexA'] + (eq-1)*wt['monoHexA'] + eq*wt['monoHexN'] + xwt['HexA']['NR'][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+						
+						# composition
+						cp2 = makeDict('composition', D=1, U=(eq-1), X=0, N=eq, A=j, S=k)
+						
+						# add fragment as a child
+						add(mapId, dict2fmla(cp2, 'composition') + '+UNR' + z, f, w)
+				
+				# cuts into dHexA
+				for z in xmod['CS']['dHexA']['RE']: # cycle through the cross-ring cleavage possibilities
+					ext = xmod['CS']['dHexA']['RE'][z]
+					j = eq + ext['Ac'] # each HexN will be acetylated
+					for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U'] + cp['D']) + (3*eq) + ext['SO3']), min(cp['S'], (3*eq) + ext['SO3'])+1): # go through SO3 possibilities
+						# chemical formula
+						f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+						
+						# add necessary x-ring values
+						for sym in 'CHONS':
+							f[sym] += xfm['dHexA']['RE'][z][sym]
+						
+						# monoisotopic weight
+						w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt['dHexA']['RE'][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+						
+						# composition
+						cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+						
+						# add fragment as a child
+						add(mapId, dict2fmla(cp2, 'composition') + '+DRE' + z, f, w)
+				
+				## add fragments that don't contain any dHexA
+				# smaller fragments that have any possibility, just like above
+				if nn < (n_pre-2):
+					for x in ['HexA', 'HexN']: # cycle through the monosaccharides to be added to
+						# get letters for the formula
+						if x == 'HexA':
+							fval = 'U'
+						else:
+							fval = 'N'
+						
+						for y in ['NR', 'RE']: # cycle through the ends
+							for z in xmod['CS'][x][y]: # cycle through the cross-ring cleavage possibilities
+								ext = xmod['CS'][x][y][z]
+								j = eq + ext['Ac'] # each HexN will be acetylated
+								for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U'] + cp['D']) + (eq*3) + ext['SO3']), min(cp['S'], (eq*3) + ext['SO3'])+1): # go through SO3 possibilities
+									# chemical formula
+									f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+									
+									# add necessary x-ring values
+									for sym in 'CHONS':
+										f[sym] += xfm[x][y][z][sym]
+									
+									# monoisotopic weight
+									w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+									
+									# composition
+									cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+									
+									# add fragment as a child
+									add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+				elif nn == (n_pre - 2): # only two more fragments to add
+					x    = 'HexN'
+					fval = 'N'
+					
+					for y in ['NR', 'RE']: # cycle through the ends
+						for z in xmod['CS'][x][y]: # cycle through the cross-ring cleavage possibilities
+							ext = xmod['CS'][x][y][z]
+							j = eq + ext['Ac'] # each HexN will be acetylated
+							for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U'] + cp['D']) + (eq*3) + ext['SO3']), min(cp['S'], (eq*3) + ext['SO3'])+1): # go through SO3 possibilities
+								# chemical formula
+								f = makeDict('formula', D=0, U=eq, X=0, N=eq, A=j, S=k)
+								
+								# add necessary x-ring values
+								for sym in 'CHONS':
+									f[sym] += xfm[x][y][z][sym]
+								
+								# monoisotopic weight
+								w = eq*wt['monoHexA'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+								
+								# composition
+								cp2 = makeDict('composition', D=0, U=eq, X=0, N=eq, A=j, S=k)
+								
+								# add fragment as a child
+								add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+			else: # unequal number of dHexA/HexA and HexN
+				sm = nn/2     # smaller number
+				bg = (nn/2)+1 # bigger number
+				
+				## add fragments that include dHexA first
+				# includes a full dHexA
+				for z in xmod['CS']['HexN']['NR']: # cycle through the cross-ring cleavage possibilities
+					ext = xmod['CS']['HexN']['NR'][z]
+					j = sm + ext['Ac'] # each HexN will be acetylated
+					for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U'] + cp['D']) + (2*sm + bg) + ext['SO3']), min(cp['S'], (2*sm + bg) + ext['SO3'])+1): # go through SO3 possibilities
+						# chemical formula
+						f = makeDict('formula', D=1, U=(bg-1), X=0, N=sm, A=j, S=k)
+						
+						# add necessary x-ring values
+						for sym in 'CHONS':
+							f[sym] += xfm['HexN']['NR'][z][sym]
+						
+						# monoisotopic weight
+						w = wt['monodHexA'] + (bg-1)*wt['monoHexA'] + sm*wt['monoHexN'] + xwt['HexN']['NR'][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+						
+						# composition
+						cp2 = makeDict('composition', D=1, U=(bg-1), X=0, N=sm, A=j, S=k)
+						
+						# add fragment as a child
+						add(mapId, dict2fmla(cp2, 'composition') + '+NNR' + z, f, w)
+				
+				# cuts into dHexA
+				for z in xmod['CS']['dHexA']['RE']: # cycle through the cross-ring cleavage possibilities
+					ext = xmod['CS']['dHexA']['RE'][z]
+					j = bg # each HexN will be acetylated
+					for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U'] + cp['D']) + (2*bg + sm) + ext['SO3']), min(cp['S'], (2*bg + sm) + ext['SO3'])+1): # go through SO3 possibilities
+						# chemical formula
+						f = makeDict('formula', D=0, U=sm, X=0, N=bg, A=j, S=k)
+						
+						# add necessary x-ring values
+						for sym in 'CHONS':
+							f[sym] += xfm['dHexA']['RE'][z][sym]
+						
+						# monoisotopic weight
+						w = sm*wt['monoHexA'] + bg*wt['monoHexN'] + xwt['dHexA']['RE'][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+						
+						# composition
+						cp2 = makeDict('composition', D=0, U=sm, X=0, N=bg, A=j, S=k)
+						
+						# add fragment as a child
+						add(mapId, dict2fmla(cp2, 'composition') + '+DRE' + z, f, w)
+				
+				## add fragments that don't contain any dHexA
+				# smaller fragments that have any possibility, just like above
+				if nn < (n_pre-2):
+					for mas in ['HexA', 'HexN']: # get which monosaccharide there is more of
+						if mas == 'HexA':
+							x    = 'HexN'
+							fval = 'N'
+							nU   = bg
+							nN   = sm
+						else:
+							x    = 'HexA'
+							fval = 'U'
+							nU   = sm
+							nN   = bg
+						
+						for y in ['NR', 'RE']: # cycle through the ends
+							for z in xmod['CS'][x][y]: # cycle through the cross-ring cleavage possibilities
+								ext = xmod['CS'][x][y][z]
+								j = nN + ext['Ac'] # each HexN will be acetylated
+								for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U'] + cp['D']) + nU + (2*nN) + ext['SO3']), min(cp['S'], nU + (2*nN) + ext['SO3'])+1): # go through SO3 possibilities
+									# chemical formula
+									f = makeDict('formula', D=0, U=nU, X=0, N=nN, A=j, S=k)
+									
+									# add necessary x-ring values
+									for sym in 'CHONS':
+										f[sym] += xfm[x][y][z][sym]
+									
+									# monoisotopic weight
+									w = nU*wt['monoHexA'] + nN*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+									
+									# composition
+									cp2 = makeDict('composition', D=0, U=nU, X=0, N=nN, A=j, S=k)
+									
+									# add fragment as a child
+									add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+				elif nn == (n_pre - 2): # only two more fragments to add
+					# set up variables
+					x    = 'HexN'
+					fval = 'N'
+					nU   = bg
+					nN   = sm
+					y    = 'RE'
+					
+					for z in xmod['CS'][x][y]: # cycle through the cross-ring cleavage possibilities
+						ext = xmod['CS'][x][y][z]
+						j = nN + ext['Ac'] # each HexN will be acetylated
+						for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U'] + cp['D']) + nU + (2*nN) + ext['SO3']), min(cp['S'], nU + (2*nN) + ext['SO3'])+1): # go through SO3 possibilities
+							# chemical formula
+							f = makeDict('formula', D=0, U=nU, X=0, N=nN, A=j, S=k)
+							
+							# add necessary x-ring values
+							for sym in 'CHONS':
+								f[sym] += xfm[x][y][z][sym]
+							
+							# monoisotopic weight
+							w = nU*wt['monoHexA'] + nN*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+							
+							# composition
+							cp2 = makeDict('composition', D=0, U=nU, X=0, N=nN, A=j, S=k)
+							
+							# add fragment as a child
+							add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+					
+					# set up variables again
+					x    = 'HexA'
+					fval = 'U'
+					nU   = sm
+					nN   = bg
+					y    = 'NR'
+					
+					for z in xmod['CS'][x][y]: # cycle through the cross-ring cleavage possibilities
+						ext = xmod['CS'][x][y][z]
+						j = nN + ext['Ac'] # each HexN will be acetylated
+						for k in range(max(0, cp['S'] - (2*cp['N'] + cp['U'] + cp['D']) + nU + (2*nN) + ext['SO3']), min(cp['S'], nU + (2*nN) + ext['SO3'])+1): # go through SO3 possibilities
+							# chemical formula
+							f = makeDict('formula', D=0, U=nU, X=0, N=nN, A=j, S=k)
+							
+							# add necessary x-ring values
+							for sym in 'CHONS':
+								f[sym] += xfm[x][y][z][sym]
+							
+							# monoisotopic weight
+							w = nU*wt['monoHexA'] + nN*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+							
+							# composition
+							cp2 = makeDict('composition', D=0, U=nU, X=0, N=nN, A=j, S=k)
+							
+							# add fragment as a child
+							add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+		nn += 1
+
+# function for adding the glycosidic and cross-ring fragments of a KS precursor
+def ks_frags(mapId, fmla, add):
+	# convert formula to dictionary
+	cp = fmla2dict(fmla, 'composition')
+	
+	# get precursor info
+	n_pre   = cp['X'] + cp['N']
+	# initialize variable that denotes length of fragment
+	nn = 1
+	
+	########################
+	# GLYCOSIDIC FRAGMENTS #
+	########################
+	
+	# loop through all fragment sizes smaller than full molecule
+	while nn < n_pre:
+		if nn % 2 == 0: # equal number of Hex and HexN
+			eq = nn/2
+			
+			j = eq # each HexN will be acetylated
+			for k in range(max(0, cp['S'] - (cp['N'] + cp['X']) + nn),(min(cp['S'],nn)+1)): # go through SO3 possibilities
+				# chemical formula
+				f = makeDict('formula', D=0, U=0, X=eq, N=eq, A=j, S=k)
+				
+				# composition
+				cp2 = makeDict('composition', D=0, U=0, X=eq, N=eq, A=j, S=k)
+				
+				# add fragment as a child
+				add(mapId, dict2fmla(cp2, 'composition'), f)
+		else: # unequal number of Hex and HexN
+			sm = nn/2     # smaller number
+			bg = (nn/2)+1 # bigger number
+			
+			# HexN > Hex
+			j = bg # each HexN will be acetylated
+			for k in range(max(0, cp['S'] - (cp['N'] + cp['X']) + nn),(min(cp['S'],nn)+1)): # go through SO3 possibilities
+				# chemical formula
+				f = makeDict('formula', D=0, U=0, X=sm, N=bg, A=j, S=k)
+				
+				# composition
+				cp2 = makeDict('composition', D=0, U=0, X=sm, N=bg, A=j, S=k)
+				
+				# add fragment as a child
+				add(mapId, dict2fmla(cp2, 'composition'), f)
+			
+			# Hex > HexN
+			j = sm  # each HexN will be acetylated
+			for k in range(max(0, cp['S'] - (cp['N'] + cp['X']) + nn),(min(cp['S'],nn)+1)): # go through SO3 possibilities
+				# chemical formula
+				f = makeDict('formula', D=0, U=0, X=bg, N=sm, A=j, S=k)
+				
+				# composition
+				cp2 = makeDict('composition', D=0, U=0, X=bg, N=sm, A=j, S=k)
+				
+				# add fragment as a child
+				add(mapId, dict2fmla(cp2, 'composition'), f)
+		
+		nn += 1
+
+	########################
+	# CROSS-RING FRAGMENTS #
+	########################
+	nn = 1
+	
+	# loop through all fragment sizes smaller than full molecule
+	while nn < n_pre:
+		if nn % 2 == 0: # equal number of Hex and HexN in fragment
+			eq = nn/2
+			
+			if n_pre % 2 == 0: # equal number of Hex and HexN in precursor
+				for x in ['Hex', 'HexN']: # cycle through the monosaccharides to be added to
+					# get letters for the formula
+					if x == 'Hex':
+						fval = 'X'
+					else:
+						fval = 'N'
+					
+					for y in ['NR', 'RE']: # cycle through the ends
+						for z in xmod['KS'][x][y]: # cycle through the cross-ring cleavage possibilities
+							ext = xmod['KS'][x][y][z]
+							j = eq + ext['Ac'] # each HexN will be acetylated
+							for k in range(max(0, cp['S'] - (cp['N'] + cp['X']) + nn + ext['SO3']), min(cp['S'], nn + ext['SO3'])+1): # go through SO3 possibilities
+								# chemical formula
+								f = makeDict('formula', D=0, U=0, X=eq, N=eq, A=j, S=k)
+								
+								# add necessary x-ring values
+								for sym in 'CHONS':
+									f[sym] += xfm[x][y][z][sym]
+								
+								# remove water
+								f['H'] -= 2
+								f['O'] -= 1
+								
+								# monoisotopic weight
+								w = eq*wt['monoHex'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+								
+								# composition
+								cp2 = makeDict('composition', D=0, U=0, X=eq, N=eq, A=j, S=k)
+								
+								# add fragment as a child
+								add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+			else: # unequal number of Hex and HexN in precursor
+				# get ends
+				if cp['X'] > cp['N']:
+					x    = 'Hex'
+					fval = 'X'
+				else:
+					x    = 'HexN'
+					fval = 'N'
+				
+				# see if we're only looking at fragments that cut into ends or not
+				if nn < (n_pre-1): # fragments don't cut into ends just yet
+					for x in ['Hex', 'HexN']: # cycle through the monosaccharides to be added to
+						# get letters for the formula
+						if x == 'Hex':
+							fval = 'X'
+						else:
+							fval = 'N'
+							
+						for y in ['NR', 'RE']: # cycle through the ends
+							for z in xmod['KS'][x][y]: # cycle through the cross-ring cleavage possibilities
+								ext = xmod['KS'][x][y][z]
+								j = eq + ext['Ac'] # each HexN will be acetylated
+								for k in range(max(0, cp['S'] - (cp['N'] + cp['X']) + nn + ext['SO3']), min(cp['S'], nn + ext['SO3'])+1): # go through SO3 possibilities
+									# chemical formula
+									f = makeDict('formula', D=0, U=0, X=eq, N=eq, A=j, S=k)
+									
+									# add necessary x-ring values
+									for sym in 'CHONS':
+										f[sym] += xfm[x][y][z][sym]
+									
+									# remove water
+									f['H'] -= 2
+									f['O'] -= 1
+									
+									# monoisotopic weight
+									w = eq*wt['monoHex'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+									
+									# composition
+									cp2 = makeDict('composition', D=0, U=0, X=eq, N=eq, A=j, S=k)
+									
+									# add fragment as a child
+									add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+				else: # fragments cut into ends
+					# get letters for the formula
+					if cp['X'] > cp['N']:
+						x    = 'Hex'
+						fval = 'X'
+					else:
+						x    = 'HexN'
+						fval = 'N'
+					
+					for y in ['NR', 'RE']: # cycle through the ends
+						for z in xmod['KS'][x][y]: # cycle through the cross-ring cleavage possibilities
+							ext = xmod['KS'][x][y][z]
+							j = eq + ext['Ac'] # each HexN will be acetylated
+							for k in range(max(0, cp['S'] - (cp['N'] + cp['X']) + nn + ext['SO3']), min(cp['S'], nn + ext['SO3'])+1): # go through SO3 possibilities
+								# chemical formula
+								f = makeDict('formula', D=0, U=0, X=eq, N=eq, A=j, S=k)
+								
+								# add necessary x-ring values
+								for sym in 'CHONS':
+									f[sym] += xfm[x][y][z][sym]
+								
+								# remove water
+								f['H'] -= 2
+								f['O'] -= 1
+								
+								# monoisotopic weight
+								w = eq*wt['monoHex'] + eq*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+								
+								# composition
+								cp2 = makeDict('composition', D=0, U=0, X=eq, N=eq, A=j, S=k)
+								
+								# add fragment as a child
+								add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+		else: # unequal number of Hex and HexN in fragment
+			sm = nn/2     # smaller number
+			bg = (nn/2)+1 # bigger number
+			
+			for mas in ['Hex', 'HexN']: # get which monosaccharide there is more of
+				if mas == 'Hex':
+					x    = 'HexN'
+					fval = 'N'
+					nX   = bg
+					nN   = sm
+				else:
+					x    = 'Hex'
+					fval = 'X'
+					nX   = sm
+					nN   = bg
+				
+				for y in ['NR', 'RE']: # cycle through the ends
+					for z in xmod['KS'][x][y]: # cycle through the cross-ring cleavage possibilities
+						ext = xmod['KS'][x][y][z]
+						j = nN + ext['Ac'] # each HexN will be acetylated
+						for k in range(max(0, cp['S'] - (cp['N'] + cp['X']) + nn + ext['SO3']), min(cp['S'], nn + ext['SO3'])+1): # go through SO3 possibilities
+							# chemical formula
+							f = makeDict('formula', D=0, U=0, X=nX, N=nN, A=j, S=k)
+							
+							# add necessary x-ring values
+							for sym in 'CHONS':
+								f[sym] += xfm[x][y][z][sym]
+							
+							# remove water
+							f['H'] -= 2
+							f['O'] -= 1
+							
+							# monoisotopic weight
+							w = nX*wt['monoHex'] + nN*wt['monoHexN'] + xwt[x][y][z] + j*wt['monoAc'] + k*wt['monoSO3'] - (nn*wt['monoH2O'])
+							
+							# composition
+							cp2 = makeDict('composition', D=0, U=0, X=nX, N=nN, A=j, S=k)
+							
+							# add fragment as a child
+							add(mapId, dict2fmla(cp2, 'composition') + "+" + fval + y + z, f, w)
+		
+		nn += 1
+
+
+# fragment functions of each class number
+class_frags = {3: hs_frags, 1: cs_frags, 4: ks_frags}
+
+# formula values already in GAGfragDB, shared with the workers
+known = {}
+
+# function for handing the known formulae to a worker
+def init_worker(formulae):
+	known['formulae'] = formulae
+
+# function for generating the fragments of a shard of (class number, precursor map id, composition) rows
+def build_shard(rows):
+	shard = FragmentShard(known['formulae'])
+	for cId, mapId, fmla in rows:
+		class_frags[cId](mapId, fmla, shard.add)
+	
+	# return
+	return shard.result()
+
+# main function
+def main():
+	# initiate parser
+	parser = argparse.ArgumentParser(description='Build the fragment tables of GAGfragDB for every precursor.')
+	
+	# add arguments
+	parser.add_argument('-d', required=False, help='GAGfragDB file (optional, default GAGfragDB.db)')
+	parser.add_argument('-j', type=int, required=False, help='Number of worker processes (optional, default 1)')
+	
+	# parse arguments
+	args   = parser.parse_args()
+	dbFile = args.d
+	nProc  = args.j
+	
+	if not dbFile:
+		dbFile = 'GAGfragDB.db'
+	
+	if not os.path.isfile(dbFile):
+		print "Could not find " + dbFile + ". Try 'python buildDB.py -h'"
+		sys.exit()
+	
+	# check to make sure a sensible number of workers was asked for
+	if not nProc:
+		nProc = 1
+	elif nProc < 1:
+		print "You must enter a positive integer for the number of worker processes. Try 'python buildDB.py -h'"
+		sys.exit()
+	
+	start = time.time()
+	
+	# connect to GAGfragDB, handling the transaction by hand
+	conn = sq.connect(dbFile)
+	conn.isolation_level = None
+	
+	tables = FragmentTables(conn)
+	
+	# every precursor, one class at a time
+	rows = []
+	for cId in [3, 1, 4]:
+		rows += conn.execute('''SELECT ?, cpm.id, p.value
+		                        FROM   ClassPrecursorMap cpm, Precursors p
+		                        WHERE  cpm.pId = p.id
+		                        AND    cpm.cId = ?;''', (cId, cId)).fetchall()
+	
+	# split them into runs of precursors, several per worker so long chains even out
+	size   = max(1, -(-len(rows) // (8*nProc)))
+	shards = [rows[q:q+size] for q in range(0, len(rows), size)]
+	
+	conn.execute('BEGIN;')
+	
+	# start from empty fragment tables, without indexes to keep up to date while loading
+	for name in [q[0] for q in indexes] + retired:
+		conn.execute('DROP INDEX IF EXISTS ' + name + ';')
+	
+	conn.execute('DELETE FROM ChildFragments;')
+	conn.execute('DELETE FROM Fragments;')
+	
+	sys.stdout.write("Adding fragments of " + str(len(rows)) + " precursors in " + str(len(shards)) + " shards... ")
+	sys.stdout.flush()
+	
+	# generate the shards, getting them back in order
+	if nProc > 1:
+		pool    = mp.Pool(nProc, init_worker, (set(tables.formulae),))
+		results = pool.imap(build_shard, shards)
+	else:
+		init_worker(set(tables.formulae))
+		results = (build_shard(shard) for shard in shards)
+	
+	for result in results:
+		tables.merge(result)
+	
+	if nProc > 1:
+		pool.close()
+		pool.join()
+	
+	print "Done!"
+	
+	sys.stdout.write("Creating indexes... ")
+	sys.stdout.flush()
+	
+	for name, sql in indexes:
+		conn.execute(sql)
+	
+	# stamp this build, so that fragment libraries compiled from an earlier one are not reused
+	stamp = max(int(time.time()), conn.execute('PRAGMA user_version;').fetchone()[0] + 1)
+	conn.execute('PRAGMA user_version = %i;' % (stamp))
+	
+	conn.execute('COMMIT;')
+	conn.close()
+	
+	print "Done!"
+	print "Wrote " + str(len(tables.fragments)) + " fragments and " + str(tables.n_children) + " child fragments in %.1f seconds" % (time.time() - start)
+
+# run main
+if __name__ == '__main__':
+	main()
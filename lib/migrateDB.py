@@ -0,0 +1,168 @@
+#!/usr/bin/python
+
+# adds the indexes that GAGfinder's queries and the GAGfragDB scripts need, checks with EXPLAIN QUERY PLAN
+# that SQLite uses them, and times each query before and after
+
+import os # for checking that GAGfragDB exists
+import sys # for exiting on errors
+import time # for timing queries
+import argparse # for parsing arguments
+import sqlite3 as sq # for accessing SQLite
+
+# indexes of GAGfragDB, as (name, statement)
+indexes = [('Formulae_value',            'CREATE INDEX Formulae_value ON Formulae (value);'), # formulae by string
+           ('Fragments_value',           'CREATE INDEX Fragments_value ON Fragments (value);'), # fragments by string
+           ('ClassPrecursorMap_cId_pId', 'CREATE INDEX ClassPrecursorMap_cId_pId ON ClassPrecursorMap (cId, pId);'), # precursors of a class, covering
+           ('ChildFragments_cpId_frId',  'CREATE INDEX ChildFragments_cpId_frId ON ChildFragments (cpId, frId);')] # child fragments of a precursor, covering
+
+# indexes that the ones above replace
+retired = ['ChildFragments_cpId']
+
+# hot queries, as (name, statement, indexes the plan has to use)
+queries = [('precursors of a class', '''SELECT   cpm.id, f.value, p.value, f.monoMass
+                                        FROM     Precursors p, ClassPrecursorMap cpm, Formulae f
+                                        WHERE    p.id = cpm.pId
+                                        AND      f.id = p.fmId
+                                        AND      cpm.cId = ?
+                                        ORDER BY f.monoMass ASC, cpm.id ASC;''', ['ClassPrecursorMap_cId_pId']),
+           ('child fragments', '''SELECT   fr.value, fm.value
+                                  FROM     ChildFragments cf, Formulae fm, Fragments fr, Precursors p, ClassPrecursorMap cp
+                                  WHERE    cf.frId = fr.id
+                                  AND      cf.cpId = cp.id
+                                  AND      cp.pId = p.id
+                                  AND      fr.fmId = fm.id
+                                  AND      cf.cpId = ?;''', ['ChildFragments_cpId_frId']),
+           ('formula by value', 'SELECT id FROM Formulae WHERE value = ?;', ['Formulae_value']),
+           ('fragment by value', 'SELECT id FROM Fragments WHERE value = ?;', ['Fragments_value'])]
+
+# function for getting the parameters to time each query with
+def sample_params(conn, n):
+	classes = [(r[0],) for r in conn.execute('SELECT id FROM Classes;')]
+	cpids   = [(r[0],) for r in conn.execute('SELECT id FROM ClassPrecursorMap ORDER BY id LIMIT ?;', (n,))]
+	fmlae   = [(r[0],) for r in conn.execute('SELECT value FROM Formulae ORDER BY id DESC LIMIT ?;', (n,))]
+	frags   = [(r[0],) for r in conn.execute('SELECT value FROM Fragments ORDER BY id DESC LIMIT ?;', (n,))]
+	
+	# return
+	return {'precursors of a class': classes,
+	        'child fragments':       cpids,
+	        'formula by value':      fmlae,
+	        'fragment by value':     frags}
+
+# function for timing each query, in milliseconds per call
+def time_queries(conn, params):
+	times = {}
+	for name, sql, uses in queries:
+		start = time.time()
+		for p in params[name]:
+			conn.execute(sql, p).fetchall()
+		
+		times[name] = 1000. * (time.time() - start) / max(len(params[name]), 1)
+	
+	# return
+	return times
+
+# function for getting the plan of a query and the indexes it should but does not use
+def check_plan(conn, sql, uses, p):
+	plan = [row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, p)]
+	
+	missing = [q for q in uses if not any(q in step for step in plan)]
+	
+	# full scans of a table, rather than of an index
+	scans = [step for step in plan if step.startswith('SCAN') and 'INDEX' not in step]
+	
+	# return
+	return [plan, missing, scans]
+
+# main function
+def main():
+	# initiate parser
+	parser = argparse.ArgumentParser(description='Add the indexes that GAGfinder queries need to GAGfragDB and check that they are used.')
+	
+	# add arguments
+	parser.add_argument('-d', required=False, help='GAGfragDB file (optional, default GAGfragDB.db)')
+	parser.add_argument('-n', type=int, required=False, help='Number of parameters to time each query with (optional, default 200)')
+	
+	# parse arguments
+	args   = parser.parse_args()
+	dbFile = args.d
+	nTimes = args.n
+	
+	if not dbFile:
+		dbFile = 'GAGfragDB.db'
+	
+	if not nTimes:
+		nTimes = 200
+	
+	if not os.path.isfile(dbFile):
+		print "Could not find " + dbFile + ". Try 'python migrateDB.py -h'"
+		sys.exit()
+	
+	conn   = sq.connect(dbFile)
+	params = sample_params(conn, nTimes)
+	
+	# time the queries as they are
+	print "Timing queries before migration..."
+	before = time_queries(conn, params)
+	
+	# add the missing indexes and drop the ones they replace
+	existing = set(r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index';"))
+	
+	added = []
+	for name, sql in indexes:
+		if name not in existing:
+			conn.execute(sql)
+			added.append(name)
+	
+	for name in retired:
+		conn.execute('DROP INDEX IF EXISTS ' + name + ';')
+	
+	conn.execute('ANALYZE;')
+	conn.commit()
+	
+	if added:
+		print "Added indexes " + ", ".join(added)
+	else:
+		print "All indexes were already there"
+	
+	# check the plan of every query
+	ok = True
+	for name, sql, uses in queries:
+		if not params[name]:
+			print "\nNo rows to plan " + name + " with"
+			continue
+		
+		plan, missing, scans = check_plan(conn, sql, uses, params[name][0])
+		
+		print "\nPlan for " + name + ":"
+		for step in plan:
+			print "    " + step
+		
+		if missing or scans:
+			ok = False
+			if missing:
+				print "  does not use " + ", ".join(missing)
+			if scans:
+				print "  scans " + "; ".join(scans)
+	
+	# time them again
+	print "\nTiming queries after migration..."
+	after = time_queries(conn, params)
+	
+	print "\nquery\tcalls\tbefore (ms)\tafter (ms)\tspeedup"
+	for name, sql, uses in queries:
+		if params[name]:
+			print "%s\t%i\t%.3f\t%.3f\t%.1fx" % (name, len(params[name]), before[name], after[name], before[name] / max(after[name], 1e-6))
+		else:
+			print "%s\t0\tn/a\tn/a\tn/a" % (name)
+	
+	conn.close()
+	
+	if not ok:
+		print "\nSome queries do not use their indexes."
+		sys.exit(1)
+	
+	print "\nFinished!"
+
+# run main
+if __name__ == '__main__':
+	main()